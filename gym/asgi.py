@@ -1,3 +1,8 @@
+"""
+Punto de entrada ASGI (por ejemplo ``uvicorn gym.asgi:application``).  Las
+vistas async (búsqueda en vivo y portal del cliente) corren en el event loop;
+las sync, en el hilo de cada pedido.
+"""
 import os
 from django.core.asgi import get_asgi_application
 
@@ -0,0 +1,147 @@
+"""
+Archivos estáticos con nombre por contenido, precomprimidos y cacheables.
+
+``EstaticosComprimidos`` (el ``STORAGES["staticfiles"]`` del proyecto) es un
+``ManifestStaticFilesStorage``: ``collectstatic`` copia cada archivo a
+``STATIC_ROOT`` también con el hash de su contenido en el nombre
+(``js/editar_rutinas.3f2a….js``) y ``{% static %}`` devuelve ese nombre.  Al
+terminar escribe al lado las variantes ``.gz`` y, si está instalado el
+paquete ``brotli``, ``.br`` de los archivos de texto.
+
+``EstaticosMiddleware`` sirve ``STATIC_ROOT`` cuando ``DEBUG`` está apagado:
+elige la variante comprimida según ``Accept-Encoding`` y manda los nombres
+con hash con ``Cache-Control: immutable`` por ``ESTATICOS_DURACION`` (un
+cambio en el archivo cambia su URL).  Los nombres sin hash se revalidan con
+ETag.  Con ``DEBUG`` los sirve ``runserver`` desde ``static/`` como siempre.
+"""
+import gzip
+import mimetypes
+import posixpath
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import quote_etag
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él solo se generan las variantes .gz
+    brotli = None
+
+# Extensiones que vale la pena comprimir (las imágenes ya vienen comprimidas).
+COMPRIMIBLES = {".css", ".js", ".map", ".svg", ".json", ".txt", ".html", ".xml", ".ico"}
+# Por debajo de este tamaño la variante comprimida no ahorra nada útil.
+MINIMO_BYTES = 256
+# Codificación y extensión de cada variante, en orden de preferencia.
+VARIANTES = [("br", ".br"), ("gzip", ".gz")]
+
+
+def comprimir_gzip(datos):
+    # mtime=0: la misma entrada produce el mismo .gz en cada collectstatic.
+    return gzip.compress(datos, compresslevel=9, mtime=0)
+
+
+def comprimir_brotli(datos):
+    return brotli.compress(datos, quality=11)
+
+
+def variantes(datos):
+    """``{extensión: bytes}`` de las variantes comprimidas que ahorran espacio."""
+    resultado = {".gz": comprimir_gzip(datos)}
+    if brotli:
+        resultado[".br"] = comprimir_brotli(datos)
+    return {ext: comprimido for ext, comprimido in resultado.items() if len(comprimido) < len(datos)}
+
+
+class EstaticosComprimidos(ManifestStaticFilesStorage):
+    # Un archivo que existe pero no está en el manifiesto (agregado después
+    # de ``collectstatic``) se resuelve calculando su hash; uno que no existe
+    # sigue siendo un error.
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        nombres = set(paths) | set(self.hashed_files.values())
+        for nombre in sorted(nombres):
+            if posixpath.splitext(nombre)[1].lower() not in COMPRIMIBLES or not self.exists(nombre):
+                continue
+            with self.open(nombre) as archivo:
+                datos = archivo.read()
+            if len(datos) < MINIMO_BYTES:
+                continue
+            for ext, comprimido in variantes(datos).items():
+                Path(self.path(nombre + ext)).write_bytes(comprimido)
+
+
+class EstaticosMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefijo = settings.STATIC_URL
+        self.raiz = Path(settings.STATIC_ROOT).resolve()
+        self._con_hash = None
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        return self.estatico(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        # Solo toca el disco local (stat y abrir): no vale la pena un hilo aparte.
+        return self.estatico(request) or await self.get_response(request)
+
+    def estatico(self, request):
+        if request.method in ("GET", "HEAD") and request.path.startswith(self.prefijo):
+            return self.servir(request, request.path[len(self.prefijo):])
+        return None
+
+    def nombres_con_hash(self):
+        # Se lee una vez por proceso: después de collectstatic hay que reiniciar.
+        if self._con_hash is None:
+            storage = EstaticosComprimidos(location=self.raiz)
+            self._con_hash = set(storage.hashed_files.values())
+        return self._con_hash
+
+    def servir(self, request, nombre):
+        ruta = (self.raiz / nombre).resolve()
+        if self.raiz not in ruta.parents or not ruta.is_file():
+            return None
+        con_hash = nombre in self.nombres_con_hash()
+
+        codificacion, archivo = None, ruta
+        aceptadas = request.headers.get("Accept-Encoding", "")
+        for cod, ext in VARIANTES:
+            variante = ruta.with_name(ruta.name + ext)
+            if cod in aceptadas and variante.is_file():
+                codificacion, archivo = cod, variante
+                break
+
+        estado = archivo.stat()
+        etag = quote_etag(f"{estado.st_mtime_ns:x}-{estado.st_size:x}")
+        if not con_hash and etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(archivo, "rb"), filename=ruta.name)
+            tipo, _ = mimetypes.guess_type(ruta.name)
+            response["Content-Type"] = tipo or "application/octet-stream"
+            if codificacion:
+                response["Content-Encoding"] = codificacion
+        response["ETag"] = etag
+        response["Vary"] = "Accept-Encoding"
+        if con_hash:
+            response["Cache-Control"] = f"public, max-age={settings.ESTATICOS_DURACION}, immutable"
+        else:
+            response["Cache-Control"] = "no-cache"
+        return response
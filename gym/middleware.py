@@ -0,0 +1,140 @@
+"""
+Medición de consultas SQL por pedido.
+
+``PresupuestoConsultasMiddleware`` cuenta las consultas y el tiempo de base de
+datos de cada vista (con ``connection.execute_wrapper``), guarda las más
+lentas y:
+
+* agrega el encabezado ``Server-Timing`` (visible en las herramientas del
+  navegador);
+* compara la cantidad con ``CONSULTAS_PRESUPUESTO[<nombre de la vista>]``
+  (un número, o un dict por método HTTP con ``"*"`` como valor por defecto);
+* registra en el logger ``gym.consultas`` una muestra de los pedidos
+  (``CONSULTAS_MUESTREO``), y siempre los que exceden el presupuesto o
+  tardan más de ``CONSULTAS_LENTAS_MS`` en la base;
+* con ``CONSULTAS_ESTRICTO`` (activo al correr los tests) un pedido que
+  excede su presupuesto lanza ``PresupuestoExcedido``.
+
+Las consultas que hace una respuesta en streaming mientras se envía no se
+cuentan: para entonces el pedido ya salió del middleware.
+
+Funciona también con vistas async bajo ASGI.  Las conexiones de Django son
+por hilo y el ORM async corre en el hilo de ``sync_to_async`` del pedido, así
+que el ``execute_wrapper`` se instala (y se quita) desde ese mismo hilo.
+"""
+import heapq
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("gym.consultas")
+
+# Cantidad de consultas lentas que se informan por pedido.
+MAS_LENTAS = 3
+
+
+class PresupuestoExcedido(AssertionError):
+    """Una vista hizo más consultas que las declaradas en su presupuesto."""
+
+
+class Medicion:
+    """``execute_wrapper`` que acumula cantidad, tiempo y las más lentas."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+        self.lentas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.cantidad += 1
+            self.tiempo += duracion
+            entrada = (duracion, self.cantidad, sql)
+            if len(self.lentas) < MAS_LENTAS:
+                heapq.heappush(self.lentas, entrada)
+            else:
+                heapq.heappushpop(self.lentas, entrada)
+
+    def mas_lentas(self):
+        return [(duracion, sql) for duracion, _, sql in sorted(self.lentas, reverse=True)]
+
+
+class PresupuestoConsultasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        medicion = Medicion()
+        with self._medir(medicion):
+            response = self.get_response(request)
+        return self._evaluar(request, response, medicion)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        stack = await sync_to_async(self._medir)(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._evaluar(request, response, medicion)
+
+    def _medir(self, medicion):
+        stack = ExitStack()
+        for conexion in connections.all():
+            stack.enter_context(conexion.execute_wrapper(medicion))
+        return stack
+
+    def _evaluar(self, request, response, medicion):
+        match = getattr(request, "resolver_match", None)
+        vista = match.view_name if match else None
+        tiempo_ms = medicion.tiempo * 1000
+        response["Server-Timing"] = (
+            f'db;dur={tiempo_ms:.1f};desc="{medicion.cantidad} consultas"'
+        )
+
+        presupuesto = getattr(settings, "CONSULTAS_PRESUPUESTO", {}).get(vista)
+        if isinstance(presupuesto, dict):
+            presupuesto = presupuesto.get(request.method, presupuesto.get("*"))
+        excedido = presupuesto is not None and medicion.cantidad > presupuesto
+        lento = tiempo_ms > getattr(settings, "CONSULTAS_LENTAS_MS", 100)
+        if excedido or lento or random.random() < getattr(settings, "CONSULTAS_MUESTREO", 0):
+            self._registrar(request, vista, medicion, presupuesto, excedido or lento)
+
+        if excedido and getattr(settings, "CONSULTAS_ESTRICTO", False):
+            detalle = "\n".join(f"  {d * 1000:.1f} ms  {sql}" for d, sql in medicion.mas_lentas())
+            raise PresupuestoExcedido(
+                f"{vista}: {medicion.cantidad} consultas (presupuesto {presupuesto}) "
+                f"en {request.method} {request.path}\nMás lentas:\n{detalle}"
+            )
+        return response
+
+    def _registrar(self, request, vista, medicion, presupuesto, alerta):
+        nivel = logging.WARNING if alerta else logging.INFO
+        logger.log(
+            nivel,
+            "%s %s [%s] %d consultas (presupuesto %s), %.1f ms en la base; más lentas: %s",
+            request.method,
+            request.path,
+            vista,
+            medicion.cantidad,
+            presupuesto if presupuesto is not None else "-",
+            medicion.tiempo * 1000,
+            "; ".join(f"{d * 1000:.1f} ms {sql[:200]}" for d, sql in medicion.mas_lentas()),
+        )
@@ -0,0 +1,73 @@
+"""
+Reparto de lecturas y escrituras entre conexiones.
+
+Las vistas que solo leen se marcan con ``@solo_lectura()`` (también sirve
+como ``with solo_lectura():``).  Mientras corren, las lecturas del ORM van a
+la conexión ``BASE_LECTURA`` (el mismo archivo SQLite abierto aparte, en
+modo ``query_only``); todo lo demás, y cualquier escritura, va a
+``default``.  Con WAL los lectores no esperan a los escritores, así que el
+portal y los listados siguen respondiendo mientras la recepción registra
+pagos.
+
+Las consultas hechas a mano con ``django.db.connection`` siempre usan
+``default``, igual que las respuestas en streaming, que se generan cuando la
+vista ya terminó.
+"""
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+_solo_lectura = ContextVar("solo_lectura", default=False)
+
+
+class solo_lectura(ContextDecorator):
+    """
+    Marca el contexto actual como de solo lectura.  Decora vistas sync y
+    async: en las async la marca dura hasta que termina la corrutina, y el
+    ORM async la ve porque ``sync_to_async`` copia el contexto al hilo.
+    """
+
+    def __enter__(self):
+        self._token = _solo_lectura.set(True)
+        return self
+
+    def __exit__(self, *exc):
+        _solo_lectura.reset(self._token)
+        return False
+
+    def _recreate_cm(self):
+        # Una instancia por llamada: la vista decorada puede correr en
+        # varios pedidos a la vez.
+        return type(self)()
+
+    def __call__(self, funcion):
+        if not iscoroutinefunction(funcion):
+            return super().__call__(funcion)
+
+        @wraps(funcion)
+        async def envuelta(*args, **kwargs):
+            with self._recreate_cm():
+                return await funcion(*args, **kwargs)
+
+        return envuelta
+
+
+class LecturaEscrituraRouter:
+    def db_for_read(self, model, **hints):
+        alias = getattr(settings, "BASE_LECTURA", None)
+        if alias and _solo_lectura.get():
+            return alias
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las dos conexiones apuntan a la misma base.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent  # C:\gym
 
@@ -8,12 +9,32 @@ SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "django-insecure-1234567890-esto-es-
 
 DEBUG = True
 
+# ``manage.py test``: activa controles que solo tienen sentido en los tests.
+TESTING = "test" in sys.argv
+
+# ``collectstatic`` deja en STATIC_ROOT los archivos con hash en el nombre y
+# sus variantes .gz/.br; sin DEBUG los sirve gym.estaticos.EstaticosMiddleware
+# con caché de un año.  Los tests no corren collectstatic: usan el storage simple.
+STATIC_ROOT = BASE_DIR / "staticfiles"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if TESTING else "gym.estaticos.EstaticosComprimidos"
+        ),
+    },
+}
+ESTATICOS_DURACION = 365 * 24 * 3600
+
 ALLOWED_HOSTS = ["localhost", "127.0.0.1"]
 
 # When set to ``False`` the application will load vendor libraries from the
-# local ``static/`` directory instead of using the CDN copies.  This is useful
-# for environments without Internet access.
-USE_CDN = False
+# local ``static/vendor/`` directory instead of using the CDN copies.  This is
+# useful for environments without Internet access; the files are not in the
+# repository and have to be copied there first (``manage.py check`` lists the
+# missing ones, see gymapp/checks.py).
+USE_CDN = os.getenv("USE_CDN", "1") == "1"
 
 # Subresource integrity hashes for the CDN hosted assets.  They are kept in a
 # separate mapping so they can easily be updated without touching the
@@ -42,7 +63,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que también cuente las consultas de sesión y mensajes.
+    'gym.middleware.PresupuestoConsultasMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'gym.estaticos.EstaticosMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,15 +96,192 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'gym.wsgi.application'
 
+# SQLite afinado para varias terminales a la vez (ver gym/sqlite/base.py):
+# WAL para que las lecturas no esperen a las escrituras, espera ante locks en
+# lugar de fallar y transacciones de escritura que toman el lock al empezar.
+# Cada PRAGMA se puede cambiar con la variable de entorno SQLITE_<NOMBRE>.
+SQLITE_PRAGMAS = {
+    nombre: os.getenv(f"SQLITE_{nombre.upper()}", valor)
+    for nombre, valor in {
+        "journal_mode": "WAL",
+        "busy_timeout": "5000",          # ms esperando un lock antes de fallar
+        "synchronous": "NORMAL",         # seguro con WAL; FULL en cada commit es innecesario
+        "mmap_size": str(256 * 1024 * 1024),
+        "cache_size": "-65536",          # negativo = KiB (64 MiB por conexión)
+        "temp_store": "MEMORY",
+    }.items()
+}
+SQLITE_TRANSACTION_MODE = os.getenv("SQLITE_TRANSACTION_MODE", "IMMEDIATE")
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'gym.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'pragmas': SQLITE_PRAGMAS,
+            'transaction_mode': SQLITE_TRANSACTION_MODE,
+        },
+    },
+}
+
+# Conexión aparte para las vistas de solo lectura (ver gym/routers.py).  En
+# los tests la base es en memoria y una segunda conexión no vería los datos
+# de la transacción del test: todo va a ``default``.
+BASE_LECTURA = None if TESTING else os.getenv("BASE_LECTURA", "lectura")
+if BASE_LECTURA:
+    DATABASES[BASE_LECTURA] = {
+        'ENGINE': 'gym.sqlite',
+        'NAME': DATABASES['default']['NAME'],
+        'OPTIONS': {'pragmas': {**SQLITE_PRAGMAS, 'query_only': 'ON'}},
+        'TEST': {'MIRROR': 'default'},
     }
+DATABASE_ROUTERS = ['gym.routers.LecturaEscrituraRouter']
+
+# Caché del catálogo de ejercicios y de las filas de socios.  Local por
+# proceso; con varios procesos conviene una compartida (CACHE_BACKEND y
+# CACHE_LOCATION, por ejemplo FileBasedCache o Redis) para que las
+# invalidaciones se vean en todos enseguida.  Con la local, otro proceso
+# puede mostrar un dato de socio viejo hasta ``fragmentos.DURACION``; el
+# estado de pago no se cachea y siempre está al día.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': os.getenv("CACHE_LOCATION", "gym"),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv("CACHE_MAX_ENTRIES", "20000"))},
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = []
 
+# Tamaño de página del listado de socios (paginación por cursor).  Se puede
+# pedir otro tamaño con ``?por_pagina=`` hasta ``SOCIOS_POR_PAGINA_MAX``.
+SOCIOS_POR_PAGINA = int(os.getenv("SOCIOS_POR_PAGINA", "50"))
+SOCIOS_POR_PAGINA_MAX = 200
+
+# Cantidad de deudores listados en la barra lateral del listado de socios.
+DEUDORES_SIDEBAR_MAX = 100
+
+# Matriz de pagos (socios × meses): socios por página y meses como máximo.
+MATRIZ_SOCIOS_POR_PAGINA = 200
+MATRIZ_SOCIOS_POR_PAGINA_MAX = 1000
+MATRIZ_PAGOS_MESES_MAX = 36
+
+# Socios por pedido al marcar pagos en bloque desde el listado.
+PAGOS_MASIVOS_MAX = 500
+
+# Validez (segundos) de la cookie firmada del portal del cliente (gymapp/portal.py).
+PORTAL_CLIENTE_DURACION = int(os.getenv("PORTAL_CLIENTE_DURACION", str(7 * 24 * 3600)))
+SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "0") == "1"
+
+# Rutinas por página en el portal del cliente (historial de rutinas).
+RUTINAS_POR_PAGINA = 5
+RUTINAS_POR_PAGINA_MAX = 20
+
+# Exportaciones: filas leídas por bloque y tamaño a partir del cual el Excel
+# temporal pasa de memoria a disco.
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_SPOOL_MAX_BYTES = 5 * 1024 * 1024
+
+# Exportación de cambios (``?desde=``): la marca siguiente se retrasa estos
+# segundos para no perder transacciones que confirman durante la lectura.
+EXPORT_CAMBIOS_SOLAPAMIENTO = 300
+
+# Importación de socios: filas por transacción y errores listados en la página
+# (el comando ``importar_socios --errores`` guarda todos).
+IMPORT_LOTE = 1000
+IMPORT_ERRORES_VISIBLES = 200
+
+# Tareas en segundo plano (gymapp/tareas.py, comando ``procesar_tareas``):
+# carpeta de los archivos generados y subidos, hilos por worker, segundos
+# entre consultas con la cola vacía, segundos tras los cuales una tarea en
+# curso se da por colgada (y cada cuánto se buscan con la cola vacía) y días
+# que se guardan las terminadas.
+TAREAS_DIR = Path(os.getenv("TAREAS_DIR", BASE_DIR / "tareas"))
+TAREAS_HILOS = int(os.getenv("TAREAS_HILOS", "2"))
+TAREAS_ESPERA = 2
+TAREAS_TIEMPO_MAXIMO = 3600
+TAREAS_REVISION = 60
+TAREAS_RETENCION_DIAS = 7
+
+# Retención de versiones de rutinas (gymapp/retencion.py, comando
+# ``compactar_rutinas``): días en que se conservan todas las versiones (antes
+# queda una por estructura, semana y mes) y versiones archivadas por transacción.
+RUTINAS_RETENCION_DIAS = int(os.getenv("RUTINAS_RETENCION_DIAS", "90"))
+RUTINAS_ARCHIVO_LOTE = 500
+
+# Presupuesto de consultas SQL por vista (nombre de la URL -> máximo), incluidas
+# las de sesión y mensajes.  Ver ``gym/middleware.py``.  Ninguna debería crecer
+# con la cantidad de socios, pagos o rutinas.
+CONSULTAS_PRESUPUESTO = {
+    # Socios
+    "member_list": 6,
+    "member_rows_partial": 4,
+    "estadisticas_cache_filas": 0,
+    "add_member": 3,
+    "edit_member": 4,
+    "delete_member": 16,
+    "update_member_info": 4,
+    # Pagos
+    "toggle_payment": 8,
+    "toggle_payment_mes": 6,
+    "historial_pagos": 3,
+    "matriz_pagos": 4,
+    "marcar_pagos": 7,
+    "recaudacion": 1,
+    "reconstruir_recaudacion": 1,
+    "eliminar_pago": 5,
+    "export_members_excel": 2,
+    # En streaming: sus consultas corren después del middleware.
+    "export_cambios": 0,
+    # Tareas en segundo plano
+    "estado_tarea": 1,
+    "descargar_tarea": 1,
+    # Portal del cliente
+    "login_cliente": 1,
+    "logout_cliente": 0,
+    "mis_rutinas": 4,
+    "detalles_rutina_cliente": 2,
+    # Rutinas
+    "catalogo_ejercicios": 2,
+    "buscar_ejercicios": 2,
+    "rutina_cliente": 7,
+    "crear_rutina": 3,
+    # El POST es el flujo viejo (formset): valida el ejercicio de cada fila
+    # por separado.  El editor actual guarda con ``guardar_rutina``.
+    "editar_rutina": {"GET": 3, "POST": 20},
+    "guardar_rutina": 12,
+    # Guardado parcial: no depende de la cantidad de filas de la rutina.
+    "aplicar_cambios_rutina": 12,
+    "eliminar_rutina": 12,
+    "restaurar_rutina": 14,
+}
+# Al correr los tests, exceder un presupuesto hace fallar el test.
+CONSULTAS_ESTRICTO = TESTING
+# Fracción de pedidos que se registran en el logger ``gym.consultas``.  Los
+# que exceden el presupuesto o pasan ``CONSULTAS_LENTAS_MS`` se registran siempre.
+CONSULTAS_MUESTREO = float(os.getenv("CONSULTAS_MUESTREO", "0" if TESTING else "0.01"))
+CONSULTAS_LENTAS_MS = 100
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "gym.consultas": {
+            "handlers": ["console"],
+            "level": os.getenv("CONSULTAS_LOG_NIVEL", "INFO"),
+            "propagate": False,
+        },
+        "gym.tareas": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 LANGUAGE_CODE = 'es-ar'
 TIME_ZONE = 'America/Argentina/Buenos_Aires'
 USE_I18N = True
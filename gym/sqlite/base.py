@@ -0,0 +1,46 @@
+"""
+Backend SQLite con ajustes para producción.
+
+Igual al backend de Django, con dos opciones más en ``OPTIONS``:
+
+* ``pragmas``: dict ``{nombre: valor}`` que se ejecuta como ``PRAGMA`` en
+  cada conexión nueva (WAL, ``busy_timeout``, ``mmap_size``, ...);
+* ``transaction_mode``: modo del ``BEGIN`` de ``transaction.atomic``.  Con
+  ``IMMEDIATE`` la transacción toma el lock de escritura al empezar y
+  espera (``busy_timeout``) si otro lo tiene; con el ``BEGIN`` diferido por
+  defecto, una transacción que lee y después escribe falla enseguida con
+  "database is locked" si otra escribió en el medio.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+NOMBRE_PRAGMA = re.compile(r"^[a-z_]+$")
+VALOR_PRAGMA = re.compile(r"^-?\w+$")
+MODOS_TRANSACCION = {"DEFERRED", "IMMEDIATE", "EXCLUSIVE"}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop("pragmas", None) or {}
+        self.transaction_mode = params.pop("transaction_mode", None)
+        for nombre, valor in self.pragmas.items():
+            if not NOMBRE_PRAGMA.match(nombre) or not VALOR_PRAGMA.match(str(valor)):
+                raise ImproperlyConfigured(f"PRAGMA inválido: {nombre} = {valor!r}")
+        if self.transaction_mode and self.transaction_mode.upper() not in MODOS_TRANSACCION:
+            raise ImproperlyConfigured(f"transaction_mode inválido: {self.transaction_mode!r}")
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for nombre, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nombre} = {valor}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f"BEGIN {self.transaction_mode.upper()}")
+        else:
+            super()._start_transaction_under_autocommit()
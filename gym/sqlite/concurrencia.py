@@ -0,0 +1,108 @@
+"""
+Carga concurrente contra un archivo SQLite, para comprobar los ajustes de
+``gym/sqlite/base.py`` (ver el comando ``prueba_concurrencia`` y los tests).
+
+Varios hilos "escritores" repiten una transacción que lee y después escribe
+(como ``get_or_create`` + ``save`` en el botón de pago) mientras otros hilos
+leen sin parar, cada uno con su propia conexión.  Se cuentan los errores
+"database is locked".
+"""
+import threading
+import time
+from copy import deepcopy
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.db.utils import load_backend
+
+
+def configuracion(archivo, ajustada=True):
+    """``settings_dict`` para ``archivo``: con los ajustes del proyecto o los de Django."""
+    config = deepcopy(connections["default"].settings_dict)
+    config["NAME"] = str(archivo)
+    if ajustada:
+        config["ENGINE"] = "gym.sqlite"
+        config["OPTIONS"] = {
+            "pragmas": dict(settings.SQLITE_PRAGMAS),
+            "transaction_mode": settings.SQLITE_TRANSACTION_MODE,
+        }
+    else:
+        config["ENGINE"] = "django.db.backends.sqlite3"
+        config["OPTIONS"] = {}
+    return config
+
+
+class _Conexion:
+    """Conexión propia del hilo, registrada en ``connections`` con ``alias``."""
+
+    def __init__(self, config, alias):
+        self.alias = alias
+        self.wrapper = load_backend(config["ENGINE"]).DatabaseWrapper(config, alias)
+
+    def __enter__(self):
+        # ``connections`` guarda las conexiones por hilo: el alias solo
+        # existe en éste.
+        connections[self.alias] = self.wrapper
+        return self.wrapper
+
+    def __exit__(self, *exc):
+        self.wrapper.close()
+        del connections[self.alias]
+
+
+def medir_concurrencia(archivo, ajustada=True, escritores=4, lectores=4, transacciones=25):
+    """
+    Corre la carga y devuelve ``{"errores", "escrituras", "lecturas",
+    "segundos"}``.  ``archivo`` tiene que ser un archivo nuevo.
+    """
+    config = configuracion(archivo, ajustada)
+    with _Conexion(config, "carga_preparacion") as conexion:
+        with conexion.cursor() as cursor:
+            cursor.execute("CREATE TABLE carga (id INTEGER PRIMARY KEY, valor INTEGER NOT NULL)")
+
+    resultado = {"errores": 0, "escrituras": 0, "lecturas": 0}
+    lock = threading.Lock()
+    escribiendo = threading.Event()
+    escribiendo.set()
+
+    def sumar(clave):
+        with lock:
+            resultado[clave] += 1
+
+    def escritor(numero):
+        alias = f"carga_escritor_{numero}"
+        with _Conexion(config, alias) as conexion:
+            for _ in range(transacciones):
+                try:
+                    with transaction.atomic(using=alias), conexion.cursor() as cursor:
+                        cursor.execute("SELECT COALESCE(MAX(valor), 0) FROM carga")
+                        (ultimo,) = cursor.fetchone()
+                        time.sleep(0.001)  # trabajo de la vista entre la lectura y la escritura
+                        cursor.execute("INSERT INTO carga (valor) VALUES (%s)", [ultimo + 1])
+                    sumar("escrituras")
+                except OperationalError:
+                    sumar("errores")
+
+    def lector(numero):
+        with _Conexion(config, f"carga_lector_{numero}") as conexion:
+            while escribiendo.is_set():
+                try:
+                    with conexion.cursor() as cursor:
+                        cursor.execute("SELECT COUNT(*), MAX(valor) FROM carga")
+                        cursor.fetchone()
+                    sumar("lecturas")
+                except OperationalError:
+                    sumar("errores")
+
+    hilos_escritores = [threading.Thread(target=escritor, args=(n,)) for n in range(escritores)]
+    hilos_lectores = [threading.Thread(target=lector, args=(n,)) for n in range(lectores)]
+    inicio = time.perf_counter()
+    for hilo in hilos_lectores + hilos_escritores:
+        hilo.start()
+    for hilo in hilos_escritores:
+        hilo.join()
+    escribiendo.clear()
+    for hilo in hilos_lectores:
+        hilo.join()
+    resultado["segundos"] = round(time.perf_counter() - inicio, 2)
+    return resultado
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Member, Payment
+from django.db import transaction
+
+from .models import Eliminacion, Member, Payment
 
 @admin.register(Member)
 class MemberAdmin(admin.ModelAdmin):
@@ -7,8 +9,21 @@ class MemberAdmin(admin.ModelAdmin):
     search_fields = ("nombre_apellido", "dni", "gmail", "telefono")
     list_filter = ("fecha_alta",)
 
+    # El borrado en bloque no pasa por ``Member.delete``: la baja se registra
+    # aparte.  Los pagos que arrastra se descuentan de la recaudación en la
+    # señal ``post_delete`` (ver ``signals.py``).
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            Eliminacion.registrar(queryset)
+            super().delete_queryset(request, queryset)
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ("member", "mes", "plan", "monto", "pagado", "anulado", "fecha_pago")
     list_filter = ("mes", "plan", "anulado")
     search_fields = ("member__nombre_apellido", "member__dni")
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            Eliminacion.registrar(queryset)
+            super().delete_queryset(request, queryset)
@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _instalar_indice_busqueda(using, **kwargs):
+    # SQLite descarta los triggers del índice FTS cuando una migración
+    # reconstruye gymapp_member; los volvemos a crear después de migrar.
+    from django.db import connections
+    from .busqueda import instalar_indice
+
+    instalar_indice(connections[using])
+
 
 class GymappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gymapp'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+
+        post_migrate.connect(_instalar_indice_busqueda, sender=self)
@@ -0,0 +1,216 @@
+"""
+Índice de búsqueda de socios.
+
+En SQLite se usa una tabla virtual FTS5 (``gymapp_member_fts``) con el
+tokenizador ``unicode61 remove_diacritics 2``: "perez" encuentra "Pérez" y la
+búsqueda por prefijo usa el índice en lugar de recorrer toda la tabla.  La
+tabla se mantiene sincronizada con ``gymapp_member`` mediante triggers, así
+que también cubre ``bulk_create`` y ``update()``.
+
+En otros motores (o si SQLite no trae FTS5) se usa la columna
+``Member.busqueda``: el texto ya normalizado (sin acentos, en minúsculas)
+con un espacio delante de cada palabra, de modo que el prefijo "per" se
+busca como ``" per"``.
+"""
+import re
+import unicodedata
+
+from asgiref.sync import sync_to_async
+from django.db import OperationalError, connection
+
+from .paginacion import apaginar_por_claves, codificar_cursor, decodificar_cursor, paginar_por_claves
+
+TABLA_FTS = "gymapp_member_fts"
+CAMPOS = ("nombre_apellido", "dni", "telefono", "gmail")
+# Peso de cada columna en el ranking bm25 (mismo orden que CAMPOS).
+PESOS = (10.0, 5.0, 2.0, 1.0)
+
+SQL_CREAR_TABLA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+    {", ".join(CAMPOS)},
+    tokenize = "unicode61 remove_diacritics 2",
+    prefix = '2 3'
+)
+"""
+
+_COLUMNAS = ", ".join(CAMPOS)
+_NUEVOS = ", ".join(f"new.{c}" for c in CAMPOS)
+SQL_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON gymapp_member BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, {_COLUMNAS}) VALUES (new.id, {_NUEVOS});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON gymapp_member BEGIN
+        DELETE FROM {TABLA_FTS} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au
+    AFTER UPDATE OF {_COLUMNAS} ON gymapp_member BEGIN
+        DELETE FROM {TABLA_FTS} WHERE rowid = old.id;
+        INSERT INTO {TABLA_FTS}(rowid, {_COLUMNAS}) VALUES (new.id, {_NUEVOS});
+    END
+    """,
+]
+
+
+def plegar(texto):
+    """Minúsculas y sin acentos: "Pérez" -> "perez"."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower()
+
+
+def tokens(texto):
+    return re.findall(r"\w+", plegar(texto))
+
+
+def texto_busqueda(member):
+    """Valor de ``Member.busqueda``: cada palabra precedida por un espacio."""
+    palabras = []
+    for campo in CAMPOS:
+        palabras.extend(tokens(getattr(member, campo, "")))
+    return "".join(f" {p}" for p in palabras)
+
+
+# Si cada base (por su NAME) tiene la tabla FTS5.  Se consulta una vez por
+# proceso y no en cada búsqueda; ``instalar_indice`` y ``olvidar_indice`` la
+# actualizan.
+_TIENE_FTS = {}
+
+
+def usa_fts(conn=None):
+    """True si la tabla FTS5 existe en la conexión actual."""
+    conn = conn or connection
+    if conn.vendor != "sqlite":
+        return False
+    nombre = str(conn.settings_dict["NAME"])
+    if nombre not in _TIENE_FTS:
+        _TIENE_FTS[nombre] = TABLA_FTS in conn.introspection.table_names()
+    return _TIENE_FTS[nombre]
+
+
+def olvidar_indice(conn=None):
+    """Descarta lo que se sabe de la tabla FTS5 (por ejemplo, después de borrarla)."""
+    conn = conn or connection
+    _TIENE_FTS.pop(str(conn.settings_dict["NAME"]), None)
+
+
+def instalar_indice(conn=None):
+    """
+    Crea la tabla FTS5 y sus triggers si faltan.  Es idempotente: se llama
+    desde la migración y después de cada ``migrate``, porque SQLite borra los
+    triggers cuando Django reconstruye ``gymapp_member`` al alterar columnas.
+    Devuelve False si SQLite no tiene FTS5 (queda el fallback).
+    """
+    conn = conn or connection
+    if conn.vendor != "sqlite":
+        return False
+    olvidar_indice(conn)
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(SQL_CREAR_TABLA)
+        except OperationalError:
+            return False
+        for sql in SQL_TRIGGERS:
+            cursor.execute(sql)
+    _TIENE_FTS[str(conn.settings_dict["NAME"])] = True
+    return True
+
+
+def reconstruir_indice(conn=None):
+    """Vuelve a cargar la tabla FTS5 completa desde ``gymapp_member``."""
+    conn = conn or connection
+    if not instalar_indice(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS}")
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS}(rowid, {_COLUMNAS}) "
+            f"SELECT id, {_COLUMNAS} FROM gymapp_member"
+        )
+    return True
+
+
+def _consulta_fts(terminos):
+    # Cada término entre comillas (escapando las internas) y con "*" para
+    # que sea búsqueda por prefijo.  Varios términos se combinan con AND.
+    return " ".join('"{}"*'.format(t.replace('"', '""')) for t in terminos)
+
+
+def _buscar_fts(queryset, terminos, cursor, tamanio):
+    pesos = ", ".join(str(p) for p in PESOS)
+    sql = (
+        f"SELECT id, rango FROM ("
+        f"  SELECT rowid AS id, bm25({TABLA_FTS}, {pesos}) AS rango"
+        f"  FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s"
+        f") "
+    )
+    params = [_consulta_fts(terminos)]
+    valores = decodificar_cursor(cursor)
+    try:
+        rango, ultimo = (float(valores[0]), int(valores[1])) if valores and len(valores) == 2 else (None, None)
+    except (ValueError, TypeError):
+        # Cursor adulterado: primera página, como en ``paginacion.py``.
+        rango = None
+    if rango is not None:
+        sql += "WHERE rango > %s OR (rango = %s AND id > %s) "
+        params += [rango, rango, ultimo]
+    sql += "ORDER BY rango, id LIMIT %s"
+    params.append(tamanio + 1)
+
+    with connection.cursor() as c:
+        c.execute(sql, params)
+        encontrados = c.fetchall()
+
+    siguiente = None
+    if len(encontrados) > tamanio:
+        encontrados = encontrados[:tamanio]
+        id_ultimo, rango_ultimo = encontrados[-1]
+        siguiente = codificar_cursor([rango_ultimo, id_ultimo])
+    por_id = queryset.in_bulk([fila[0] for fila in encontrados])
+    socios = [por_id[fila[0]] for fila in encontrados if fila[0] in por_id]
+    return socios, siguiente
+
+
+def buscar_socios(q, cursor, tamanio, orden=("nombre_apellido", "id"), queryset=None):
+    """
+    Devuelve ``(socios, siguiente_cursor)`` para la búsqueda ``q``.
+
+    Con FTS5 los resultados salen ordenados por relevancia (bm25, dando más
+    peso al nombre); en el fallback, por ``orden``.  En ambos casos la
+    paginación es por cursor.  ``queryset`` permite pasar socios ya
+    anotados (por ejemplo con su estado de pago).
+    """
+    socios = _socios(queryset)
+    terminos = tokens(q)
+    if terminos and usa_fts():
+        return _buscar_fts(socios, terminos, cursor, tamanio)
+    return paginar_por_claves(_filtrar(socios, terminos), orden, cursor, tamanio)
+
+
+async def abuscar_socios(q, cursor, tamanio, orden=("nombre_apellido", "id"), queryset=None):
+    """
+    ``buscar_socios`` para las vistas async.  La paginación usa el ORM
+    async; la consulta FTS5 es SQL a mano y corre con ``sync_to_async``.
+    """
+    socios = _socios(queryset)
+    terminos = tokens(q)
+    if terminos and await sync_to_async(usa_fts)():
+        return await sync_to_async(_buscar_fts)(socios, terminos, cursor, tamanio)
+    return await apaginar_por_claves(_filtrar(socios, terminos), orden, cursor, tamanio)
+
+
+def _socios(queryset):
+    from .models import Member
+
+    return Member.objects.all() if queryset is None else queryset
+
+
+def _filtrar(socios, terminos):
+    # Fallback sin FTS5 (sin términos devuelve todos los socios).
+    for termino in terminos:
+        socios = socios.filter(busqueda__contains=f" {termino}")
+    return socios
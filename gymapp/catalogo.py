@@ -0,0 +1,214 @@
+"""
+Catálogo de ejercicios para los editores de rutinas.
+
+El catálogo se sirve como JSON desde una URL versionada
+(``/ejercicios/catalogo/?v=<version>``): mientras la versión no cambie el
+navegador lo reutiliza desde su caché sin volver a pedirlo.  La versión es un
+hash del contenido, se guarda en la caché de Django y se invalida cuando se
+guarda o borra un ``Ejercicio`` (ver ``signals.py``).
+
+Para el buscador de los editores hay además un índice en memoria
+(``IndiceEjercicios``) con los nombres sin acentos: prefijos de palabra
+ordenados (búsqueda binaria) y trigramas para coincidencias en el medio de
+la palabra o con algún error de tipeo.  Se arma una vez por proceso y se
+vuelve a armar cuando cambia la versión del catálogo.
+"""
+import hashlib
+import heapq
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .busqueda import tokens
+from .models import Ejercicio
+
+CLAVE_VERSION = "ejercicios:catalogo:version"
+CLAVE_DATOS = "ejercicios:catalogo:datos:{version}"
+# Con varios procesos y caché local, otro proceso ve el cambio como máximo
+# después de este tiempo.  Con una caché compartida la invalidación es inmediata.
+DURACION = 300
+# Las palabras más cortas solo se buscan por prefijo: con tan pocos
+# trigramas "parecido" matchea casi todo el vocabulario.
+LARGO_MINIMO_PARECIDAS = 4
+
+
+def _leer_catalogo():
+    return [
+        {"id": str(pk), "text": nombre}
+        for pk, nombre in Ejercicio.objects.order_by("nombre").values_list("id", "nombre")
+    ]
+
+
+def _calcular_version(ejercicios):
+    digest = hashlib.sha1()
+    for ej in ejercicios:
+        digest.update(f"{ej['id']}\x1f{ej['text']}\x1e".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def version_catalogo():
+    """Versión actual del catálogo (hash corto de ids y nombres)."""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        ejercicios = _leer_catalogo()
+        version = _calcular_version(ejercicios)
+        cache.set(CLAVE_DATOS.format(version=version), ejercicios, DURACION)
+        cache.set(CLAVE_VERSION, version, DURACION)
+    return version
+
+
+def catalogo():
+    """Devuelve ``(version, ejercicios)`` con ejercicios como ``{"id", "text"}``."""
+    version = version_catalogo()
+    ejercicios = cache.get(CLAVE_DATOS.format(version=version))
+    if ejercicios is None:
+        ejercicios = _leer_catalogo()
+        version = _calcular_version(ejercicios)
+        cache.set(CLAVE_DATOS.format(version=version), ejercicios, DURACION)
+        cache.set(CLAVE_VERSION, version, DURACION)
+    return version, ejercicios
+
+
+def invalidar_catalogo():
+    cache.delete(CLAVE_VERSION)
+
+
+def _trigramas(texto):
+    # Cada palabra con bordes, para que "pr" al inicio pese como trigrama.
+    grupos = set()
+    for palabra in tokens(texto):
+        palabra = f"  {palabra} "
+        grupos.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return grupos
+
+
+class IndiceEjercicios:
+    """
+    Índice de nombres de ejercicios para el typeahead.
+
+    ``buscar`` devuelve primero los nombres que empiezan con lo escrito,
+    después los que tienen cada palabra buscada como prefijo de alguna de sus
+    palabras y por último los que la tienen parecida (trigramas, para errores
+    de tipeo).  Dentro de cada grupo el orden es alfabético.
+
+    Las palabras parecidas se buscan en el vocabulario y no en los nombres,
+    que crece mucho más despacio que el catálogo.
+    """
+
+    def __init__(self, version, ejercicios):
+        self.version = version
+        nombres = sorted(
+            (" ".join(tokens(e["text"])), posicion, e)
+            for posicion, e in enumerate(ejercicios)
+        )
+        # La posición en estas listas es el orden alfabético del nombre.
+        self.ejercicios = [e for _, _, e in nombres]
+        self.nombres = [nombre for nombre, _, _ in nombres]
+        self.palabras_de = [frozenset(nombre.split()) for nombre in self.nombres]
+
+        self.apariciones = defaultdict(list)
+        for i, palabras in enumerate(self.palabras_de):
+            for palabra in palabras:
+                self.apariciones[palabra].append(i)
+        self.vocabulario = sorted(self.apariciones)
+        self.trigramas = defaultdict(list)
+        for palabra in self.vocabulario:
+            for trigrama in _trigramas(palabra):
+                self.trigramas[trigrama].append(palabra)
+
+    def _con_prefijo(self, ordenados, prefijo):
+        inicio = bisect_left(ordenados, prefijo)
+        fin = bisect_left(ordenados, prefijo + "\uffff")
+        return ordenados[inicio:fin]
+
+    def _parecidas(self, termino):
+        """Palabras del vocabulario parecidas a ``termino``, de más a menos."""
+        if len(termino) < LARGO_MINIMO_PARECIDAS:
+            return []
+        buscados = _trigramas(termino)
+        minimo = max(2, (len(buscados) + 1) // 2)
+        comunes = defaultdict(int)
+        for trigrama in buscados:
+            for palabra in self.trigramas.get(trigrama, ()):
+                comunes[palabra] += 1
+        return sorted(
+            (palabra for palabra, n in comunes.items() if n >= minimo),
+            key=lambda palabra: -comunes[palabra],
+        )
+
+    def _con_palabras(self, grupos, otras, faltan, vistos):
+        # ``grupos``: palabras del término guía en orden de preferencia.  Los
+        # ejercicios de cada grupo se recorren en orden alfabético sin armar
+        # la lista completa y se cortan apenas se junta lo que falta; el resto
+        # de los términos se verifica contra las palabras de cada candidato.
+        elegidos = []
+        for grupo in grupos:
+            anterior = None
+            for i in heapq.merge(*(self.apariciones[p] for p in grupo)):
+                if i == anterior or i in vistos:
+                    continue
+                anterior = i
+                if all(not self.palabras_de[i].isdisjoint(p) for p in otras):
+                    elegidos.append(i)
+                    vistos.add(i)
+                    if len(elegidos) == faltan:
+                        return elegidos
+        return elegidos
+
+    def _apariciones(self, palabras):
+        return sum(len(self.apariciones[p]) for p in palabras)
+
+    def buscar(self, q, limite=20):
+        """Devuelve hasta ``limite`` ejercicios ``{"id", "text"}`` para ``q``."""
+        terminos = tokens(q)
+        if not terminos:
+            return self.ejercicios[:limite]
+
+        frase = " ".join(terminos)
+        inicio = bisect_left(self.nombres, frase)
+        elegidos = [
+            i for i in range(inicio, min(inicio + limite, len(self.nombres)))
+            if self.nombres[i].startswith(frase)
+        ]
+        vistos = set(elegidos)
+
+        prefijos = [self._con_prefijo(self.vocabulario, t) for t in terminos]
+        if len(elegidos) < limite and all(prefijos):
+            # Guía: el término con menos apariciones.
+            guia = min(range(len(terminos)), key=lambda n: self._apariciones(prefijos[n]))
+            otras = [set(p) for n, p in enumerate(prefijos) if n != guia]
+            elegidos += self._con_palabras(
+                [prefijos[guia]], otras, limite - len(elegidos), vistos
+            )
+
+        if len(elegidos) < limite:
+            parecidas = [self._parecidas(t) for t in terminos]
+            aproximadas = [set(p).union(a) for p, a in zip(prefijos, parecidas)]
+            if all(aproximadas):
+                guia = min(range(len(terminos)), key=lambda n: self._apariciones(aproximadas[n]))
+                otras = [a for n, a in enumerate(aproximadas) if n != guia]
+                # Primero las palabras con el prefijo exacto, después las
+                # parecidas una por una, de la más parecida a la menos.
+                grupos = [prefijos[guia]] + [[p] for p in parecidas[guia]]
+                elegidos += self._con_palabras(grupos, otras, limite - len(elegidos), vistos)
+        return [self.ejercicios[i] for i in elegidos]
+
+
+_indice = None
+_lock_indice = threading.Lock()
+
+
+def indice_ejercicios():
+    """Índice del catálogo vigente; se reconstruye si cambió la versión."""
+    global _indice
+    version = version_catalogo()
+    indice = _indice
+    if indice is None or indice.version != version:
+        with _lock_indice:
+            if _indice is None or _indice.version != version:
+                version, ejercicios = catalogo()
+                _indice = IndiceEjercicios(version, ejercicios)
+            indice = _indice
+    return indice
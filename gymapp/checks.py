@@ -0,0 +1,32 @@
+"""
+Chequeos de configuración (``manage.py check``).
+"""
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.checks import Error, Tags, register
+
+# Librerías que las plantillas cargan de ``static/`` con ``USE_CDN = False``.
+# No están en el repositorio: hay que copiarlas antes de desplegar.
+ARCHIVOS_VENDOR = (
+    "vendor/tabulator/tabulator.min.css",
+    "vendor/tabulator/tabulator.min.js",
+)
+
+
+@register(Tags.staticfiles)
+def revisar_vendor(app_configs, **kwargs):
+    """
+    Sin CDN, un ``{% static %}`` de una librería que falta es un error 500
+    con el storage con manifiesto: mejor enterarse al desplegar.
+    """
+    if getattr(settings, "USE_CDN", True):
+        return []
+    return [
+        Error(
+            f"USE_CDN = False pero falta el archivo estático {archivo!r}.",
+            hint="Copiá la librería a static/vendor/ o activá USE_CDN.",
+            id="gymapp.E001",
+        )
+        for archivo in ARCHIVOS_VENDOR
+        if not finders.find(archivo)
+    ]
@@ -0,0 +1,157 @@
+"""
+Estructuras de rutina: qué muestra el editor para cada ``Rutina.ESTRUCTURAS``.
+
+Cada estructura es una plantilla y una lista de secciones (tablas del
+editor).  Una sección toma filas de la parte inicial (``calentamiento``) o de
+la principal y puede:
+
+* tener ``categorias`` fijas: una fila por categoría, con el primer detalle
+  de esa categoría (sin distinguir mayúsculas) o vacía;
+* tener una ``etiqueta``: solo sus filas, que se guardan con esa categoría
+  (así "Potencia" y "Accesorios" de deportista vuelven a su bloque);
+* o tomar todas las filas de su parte.
+
+``minimo`` completa con filas vacías y ``maximo`` recorta.  ``columnas`` son
+los campos de cada fila que se pasan a la plantilla.
+
+El contexto se arma con una sola consulta de detalles que se reparte en
+memoria entre las secciones: agregar una estructura es agregar una entrada
+en ``ESTRUCTURAS`` (y su plantilla si no sirve una existente), sin código en
+la vista ni consultas nuevas.
+"""
+# Grupos musculares del editor general.
+CATEGORIAS = [
+    "Pectorales", "Espalda", "Deltoides", "Bíceps", "Tríceps",
+    "Cuádriceps", "Isquiotibiales", "Pantorrilla", "Abdomen",
+    "Trapecios", "Antebrazos",
+]
+
+# Columna del editor -> campo de ``DetalleRutina``.
+CAMPOS = {
+    "series": "series",
+    "reps": "repeticiones",
+    "kilos": "peso",
+    "rir": "rir",
+    "notas": "notas",
+}
+CON_RIR = ("ejercicio", "series", "reps", "kilos", "rir", "notas")
+SIN_RIR = ("ejercicio", "series", "reps", "kilos", "notas")
+
+
+def _normalizar(categoria):
+    return (categoria or "").strip().lower()
+
+
+class Seccion:
+    def __init__(self, clave, columnas, calentamiento=False, categorias=(), etiqueta="",
+                 minimo=0, maximo=None, variable=None):
+        self.clave = clave
+        self.columnas = columnas
+        self.calentamiento = calentamiento
+        self.categorias = list(categorias)
+        self.etiqueta = etiqueta
+        self.minimo = minimo
+        self.maximo = maximo
+        # Variable de la plantilla con las filas.
+        self.variable = variable or f"filas_{clave}"
+
+    def filas(self, detalles):
+        """Filas de la sección a partir de los detalles de su parte, ya en orden."""
+        if self.categorias:
+            por_categoria = {}
+            for detalle in detalles:
+                por_categoria.setdefault(_normalizar(detalle.categoria), detalle)
+            filas = [
+                self.fila(por_categoria.get(_normalizar(categoria)), categoria)
+                for categoria in self.categorias
+            ]
+        else:
+            if self.etiqueta:
+                etiqueta = _normalizar(self.etiqueta)
+                detalles = [d for d in detalles if _normalizar(d.categoria) == etiqueta]
+            filas = [self.fila(detalle) for detalle in detalles[:self.maximo]]
+        filas.extend(self.fila(None) for _ in range(self.minimo - len(filas)))
+        return filas
+
+    def fila(self, detalle, categoria=None):
+        fila = {"id": detalle.id if detalle else None, "pos": detalle.posicion if detalle else None}
+        if categoria is not None:
+            fila["categoria"] = categoria
+        fila["ejercicio_id"] = (detalle.ejercicio_id if detalle else None) or ""
+        fila["ejercicio_nombre"] = detalle.ejercicio.nombre if detalle and detalle.ejercicio else ""
+        for columna in self.columnas:
+            if columna in CAMPOS:
+                fila[columna] = (getattr(detalle, CAMPOS[columna]) if detalle else "") or ""
+        return fila
+
+
+class Estructura:
+    def __init__(self, plantilla, secciones):
+        self.plantilla = plantilla
+        self.secciones = secciones
+
+    def contexto(self, detalles):
+        """
+        Variables de la plantilla para ``detalles`` (todas las filas de la
+        rutina en orden, con ``ejercicio`` ya cargado).
+        """
+        partes = {True: [], False: []}
+        for posicion, detalle in enumerate(detalles):
+            # Posición en la versión: la usa el guardado parcial (``parches.py``).
+            detalle.posicion = posicion
+            partes[bool(detalle.es_calentamiento)].append(detalle)
+        contexto = {
+            # Compatibilidad con las plantillas viejas.
+            "detalles": partes[False],
+            "calentamiento": partes[True],
+            # Filas de la versión: las que el editor no muestra se borran al guardar.
+            "filas_base": len(detalles),
+        }
+        for seccion in self.secciones:
+            contexto[seccion.variable] = seccion.filas(partes[seccion.calentamiento])
+        return contexto
+
+    def etiqueta(self, bloque):
+        """Categoría con la que se guardan las filas sin categoría del ``bloque``."""
+        for seccion in self.secciones:
+            if seccion.clave == bloque:
+                return seccion.etiqueta
+        return ""
+
+
+ESTRUCTURAS = {
+    "hipertrofia": Estructura("gymapp/editar_rutina.html", [
+        Seccion("principal", CON_RIR, variable="filas"),
+    ]),
+    "fuerza_base": Estructura("gymapp/editar_rutina_fuerza_base.html", [
+        # Sin filas, el editor crea 3 vacías (``data-minimo``).
+        Seccion("calentamiento", CON_RIR, calentamiento=True),
+        Seccion("principal", CON_RIR, categorias=[
+            "Cadena anterior", "Tracciones", "Cadena posterior", "Empujes",
+        ]),
+    ]),
+    "acondicionamiento": Estructura("gymapp/editar_rutina_acondicionamiento.html", [
+        Seccion("calentamiento", SIN_RIR, calentamiento=True, minimo=3),
+        Seccion("principal", SIN_RIR, categorias=[
+            "Cadena anterior", "Tracciones", "Cadena posterior", "Empujes",
+            "Variabilidad de movimiento",
+        ]),
+    ]),
+    "iniciacion": Estructura("gymapp/editar_rutina_iniciacion.html", [
+        Seccion("calentamiento", CON_RIR, calentamiento=True, minimo=5, maximo=5),
+        Seccion("principal", CON_RIR, minimo=2, maximo=2),
+    ]),
+    "deportista": Estructura("gymapp/editar_rutina_deportista.html", [
+        Seccion("calentamiento", SIN_RIR, calentamiento=True, minimo=3),
+        Seccion("fuerza", SIN_RIR, categorias=[
+            "Cadena anterior", "Cadena posterior", "Empujes o Tracciones",
+        ]),
+        Seccion("potencia", SIN_RIR, etiqueta="Potencia", minimo=3, maximo=6),
+        Seccion("accesorios", SIN_RIR, etiqueta="Accesorios", minimo=3, maximo=6),
+    ]),
+}
+
+
+def estructura(clave):
+    """La estructura de ``clave``; las desconocidas usan el editor general."""
+    return ESTRUCTURAS.get(clave, ESTRUCTURAS["hipertrofia"])
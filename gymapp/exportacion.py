@@ -0,0 +1,107 @@
+"""
+Exportación de socios con memoria acotada.
+
+Las filas se leen con ``.iterator()`` por bloques y se escriben a medida que
+llegan: el CSV se envía directamente en un ``StreamingHttpResponse`` (opcional
+comprimido con gzip) y el Excel usa el modo *write-only* de openpyxl, que
+vuelca cada fila a disco en vez de guardar la planilla entera en memoria.
+"""
+import csv
+import io
+import tempfile
+import zlib
+
+import openpyxl
+from django.conf import settings
+
+from .models import Member
+
+# (encabezado, campo) en el orden de las columnas exportadas.
+COLUMNAS_SOCIOS = [
+    ("Nombre y Apellido", "nombre_apellido"),
+    ("DNI", "dni"),
+    ("Gmail", "gmail"),
+    ("Teléfono", "telefono"),
+    ("Dirección", "direccion"),
+    ("Edad", "edad"),
+    ("Historial Deportivo", "historial_deportivo"),
+    ("Experiencias Gimnasios", "experiencias_gimnasios"),
+    ("Historial Lesivo", "historial_lesivo"),
+    ("Enfermedades", "enfermedades"),
+    ("Objetivos", "objetivos"),
+    ("Frecuencia Semana", "frecuencia_semana"),
+]
+
+FORMATOS = {
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "socios.xlsx"),
+    "csv": ("text/csv; charset=utf-8", "socios.csv"),
+    "csv.gz": ("application/gzip", "socios.csv.gz"),
+}
+
+# Tamaño aproximado de cada bloque enviado al cliente en el streaming.
+TAMANIO_BLOQUE = 64 * 1024
+
+
+def filas_socios(queryset=None, chunk_size=None):
+    """Itera las filas a exportar sin materializar el queryset completo."""
+    chunk_size = chunk_size or getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    queryset = Member.objects.all() if queryset is None else queryset
+    campos = [campo for _, campo in COLUMNAS_SOCIOS]
+    for fila in queryset.order_by("id").values_list(*campos).iterator(chunk_size=chunk_size):
+        yield [valor if valor is not None else "" for valor in fila]
+
+
+def encabezados_socios():
+    return [titulo for titulo, _ in COLUMNAS_SOCIOS]
+
+
+def escribir_xlsx(destino, filas, encabezados, titulo="Socios"):
+    """Escribe ``filas`` en ``destino`` (ruta o archivo binario) en modo write-only."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=titulo)
+    ws.append(encabezados)
+    for fila in filas:
+        ws.append(fila)
+    wb.save(destino)
+
+
+def xlsx_en_archivo_temporal(filas, encabezados, titulo="Socios"):
+    """
+    Devuelve un archivo temporal (en memoria hasta ``EXPORT_SPOOL_MAX_BYTES``
+    y después en disco) con la planilla, posicionado al principio.
+    """
+    limite = getattr(settings, "EXPORT_SPOOL_MAX_BYTES", 5 * 1024 * 1024)
+    archivo = tempfile.SpooledTemporaryFile(max_size=limite, suffix=".xlsx")
+    escribir_xlsx(archivo, filas, encabezados, titulo)
+    archivo.seek(0)
+    return archivo
+
+
+def _bloques_csv(filas, encabezados, bom=True):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if bom:
+        # BOM para que Excel abra el CSV como UTF-8.
+        buffer.write("\ufeff")
+    writer.writerow(encabezados)
+    for fila in filas:
+        writer.writerow(fila)
+        if buffer.tell() >= TAMANIO_BLOQUE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def generar_csv(filas, encabezados, comprimir=False):
+    """Generador de bytes del CSV, opcionalmente comprimido en formato gzip."""
+    if not comprimir:
+        yield from _bloques_csv(filas, encabezados)
+        return
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloque in _bloques_csv(filas, encabezados, bom=False):
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
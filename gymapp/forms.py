@@ -30,6 +30,34 @@ class MemberForm(forms.ModelForm):
         return gmail
 
 
+class MemberImportForm(MemberForm):
+    """
+    ``MemberForm`` para la importación (ver ``importacion.py``): un DNI que
+    ya existe no es un error sino una actualización, así que no se consulta
+    la base en cada fila.
+    """
+
+    def _post_clean(self):
+        # Ni unicidad ni ``Member.full_clean()``: sin ``clean()`` en el modelo,
+        # este solo repetiría los validadores que ya corrieron los campos
+        # del formulario (largo, email, edad), y era la mitad del tiempo.
+        pass
+
+
+class ImportarSociosForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo",
+        help_text="Excel (.xlsx) o CSV con los encabezados de la exportación; DNI y nombre son obligatorios.",
+        widget=forms.ClearableFileInput(attrs={"accept": ".xlsx,.csv,.gz"}),
+    )
+    simular = forms.BooleanField(label="Solo validar, sin guardar", required=False)
+    segundo_plano = forms.BooleanField(
+        label="En segundo plano",
+        required=False,
+        help_text="Para archivos grandes: se procesa aparte y el informe queda en la página de la tarea.",
+    )
+
+
 class MemberInfoForm(forms.ModelForm):
     class Meta:
         model = Member
@@ -130,6 +158,14 @@ class DetalleRutinaPayloadForm(forms.Form):
     sensaciones = forms.CharField(required=False, max_length=2000)
     notas = forms.CharField(required=False, max_length=2000)
     es_calentamiento = forms.BooleanField(required=False)
+    # Tabla del editor de la que viene la fila (``data-bloque``).
+    bloque = forms.CharField(required=False, max_length=30)
+
+    def __init__(self, *args, ejercicios_validos=None, **kwargs):
+        # ``ejercicios_validos``: ids ya consultados en bloque (ver
+        # ``validar_filas_payload``).  Sin él, cada fila consulta la base.
+        self.ejercicios_validos = ejercicios_validos
+        super().__init__(*args, **kwargs)
 
     def clean_categoria(self):
         categoria = self.cleaned_data.get("categoria") or ""
@@ -171,7 +207,11 @@ class DetalleRutinaPayloadForm(forms.Form):
         elegido = ejercicio_id or ejercicio_alt
 
         if elegido:
-            if not Ejercicio.objects.filter(id=elegido).exists():
+            if self.ejercicios_validos is not None:
+                existe = elegido in self.ejercicios_validos
+            else:
+                existe = Ejercicio.objects.filter(id=elegido).exists()
+            if not existe:
                 # Asociar el error al campo provisto originalmente
                 campo_error = "ejercicio_id" if ejercicio_id else "ejercicio"
                 self.add_error(campo_error, "El ejercicio seleccionado no existe.")
@@ -180,3 +220,93 @@ class DetalleRutinaPayloadForm(forms.Form):
         else:
             cleaned["ejercicio_id"] = None
         return cleaned
+
+
+# Campo del editor -> campo de ``DetalleRutina`` (los que se llaman distinto).
+CAMPOS_PAYLOAD = {"reps": "repeticiones", "kilos": "peso"}
+CAMPOS_FILA = (
+    "categoria", "series", "reps", "kilos", "descanso", "rir", "sensaciones", "notas",
+)
+
+
+def contenido_payload(datos, categoria=""):
+    """
+    Fila validada del editor (``cleaned_data``) como campos de
+    ``DetalleRutina``.  ``categoria`` se usa si la fila no trae una.
+    """
+    contenido = {
+        CAMPOS_PAYLOAD.get(campo, campo): datos.get(campo, "") or ""
+        for campo in CAMPOS_FILA
+    }
+    contenido["categoria"] = contenido["categoria"] or categoria
+    contenido["ejercicio_id"] = datos.get("ejercicio_id")
+    contenido["es_calentamiento"] = bool(datos.get("es_calentamiento"))
+    return contenido
+
+
+def payload_detalle(detalle):
+    """Un ``DetalleRutina`` con los nombres de campo del editor."""
+    datos = {campo: getattr(detalle, CAMPOS_PAYLOAD.get(campo, campo)) for campo in CAMPOS_FILA}
+    datos["ejercicio_id"] = detalle.ejercicio_id
+    datos["es_calentamiento"] = detalle.es_calentamiento
+    return datos
+
+
+def _fila_vacia(fila):
+    valores = [
+        fila.get("categoria"),
+        fila.get("ejercicio_id") or fila.get("ejercicio"),
+        fila.get("series"),
+        fila.get("reps"),
+        fila.get("kilos"),
+        fila.get("descanso"),
+        fila.get("rir"),
+        fila.get("sensaciones"),
+        fila.get("notas"),
+    ]
+    return all((valor is None or str(valor).strip() == "") for valor in valores)
+
+
+def validar_filas_payload(filas):
+    """
+    Valida todas las filas del editor con una sola consulta de ejercicios.
+
+    Devuelve ``(filas_limpias, errores, ejercicios)``: los ``cleaned_data``
+    de las filas válidas (se saltean las vacías), los mensajes
+    "Fila N: ..." y el mapa ``{id: Ejercicio}`` de los ejercicios usados, para
+    no volver a consultarlos al guardar.
+    """
+    campo_id = forms.IntegerField()
+    pendientes = []
+    errores = []
+    ids = set()
+    for idx, fila in enumerate(filas, start=1):
+        if not isinstance(fila, dict):
+            errores.append((idx, f"Fila {idx}: formato inválido."))
+            continue
+        if _fila_vacia(fila):
+            continue
+        pendientes.append((idx, fila))
+        for clave in ("ejercicio_id", "ejercicio"):
+            try:
+                valor = campo_id.to_python(fila.get(clave))
+            except forms.ValidationError:
+                continue
+            if valor:
+                ids.add(valor)
+
+    ejercicios = Ejercicio.objects.in_bulk(ids) if ids else {}
+    validos = set(ejercicios)
+
+    filas_limpias = []
+    for idx, fila in pendientes:
+        form = DetalleRutinaPayloadForm(fila, ejercicios_validos=validos)
+        if form.is_valid():
+            filas_limpias.append(form.cleaned_data)
+        else:
+            mensajes = []
+            for field_errors in form.errors.values():
+                mensajes.extend(field_errors)
+            errores.append((idx, f"Fila {idx}: {' | '.join(mensajes)}"))
+    errores.sort()
+    return filas_limpias, [mensaje for _, mensaje in errores], ejercicios
@@ -0,0 +1,124 @@
+"""
+Caché de filas de socios ya renderizadas.
+
+Cada socio tiene una versión en la caché (``socio:<id>:version``) que se
+renueva cuando se guarda o borra el socio (ver ``signals.py``; la
+importación llama a ``invalidar_socios``).
+La versión se renueva al confirmar la transacción (``on_commit``): si no,
+un listado concurrente podría leer el estado anterior y guardarlo bajo la
+versión nueva.
+El HTML de cada fila se guarda bajo una clave que incluye esa versión, así
+que los listados solo renderizan las filas de socios que cambiaron; las
+filas viejas quedan inaccesibles y vencen solas.
+
+Con la caché por defecto (local a cada proceso) una invalidación solo se ve
+en el proceso que la hizo; los demás sirven la fila vieja hasta que vence
+(``DURACION``).  Eso es aceptable para los datos del socio, pero no para el
+estado de pago, que cambia a cada rato desde cualquier terminal: lo que
+depende de los pagos no se guarda en la caché.  La fila lleva un marcador
+que se reemplaza en cada pedido por una plantilla chica (``variable``).
+Lo mismo con el token CSRF de los formularios: se guarda un marcador que se
+reemplaza por el token de cada pedido al armar la página.
+
+Los aciertos y fallos se cuentan en la caché y se consultan en
+``/estadisticas/cache-filas/``.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CLAVE_VERSION = "socio:{id}:version"
+CLAVE_FILA = "socio:{id}:fila:{plantilla}:{version}:{extra}"
+CLAVE_ACIERTOS = "socio:filas:aciertos"
+CLAVE_FALLOS = "socio:filas:fallos"
+MARCADOR_CSRF = "__csrf_fila_socio__"
+MARCADOR_VARIABLE = "__parte_variable_fila_socio__"
+# Igual que el catálogo: con caché local por proceso, otro proceso ve un
+# cambio como máximo después de este tiempo.
+DURACION = 300
+
+
+def invalidar_socios(ids):
+    """Renueva la versión de los socios ``ids``: sus filas se vuelven a renderizar."""
+    cache.set_many({CLAVE_VERSION.format(id=pk): uuid.uuid4().hex for pk in ids}, DURACION)
+
+
+def _versiones(ids):
+    claves = {pk: CLAVE_VERSION.format(id=pk) for pk in ids}
+    guardadas = cache.get_many(claves.values())
+    versiones, nuevas = {}, {}
+    for pk, clave in claves.items():
+        version = guardadas.get(clave)
+        if version is None:
+            version = nuevas[clave] = uuid.uuid4().hex
+        versiones[pk] = version
+    if nuevas:
+        cache.set_many(nuevas, DURACION)
+    return versiones
+
+
+def _contar(aciertos, fallos):
+    for clave, cantidad in ((CLAVE_ACIERTOS, aciertos), (CLAVE_FALLOS, fallos)):
+        if cantidad:
+            cache.add(clave, 0, None)
+            try:
+                cache.incr(clave, cantidad)
+            except ValueError:
+                # Se desalojó entre el add y el incr.
+                cache.set(clave, cantidad, None)
+
+
+def renderizar_filas(request, socios, plantilla, contexto=None, extra="", variable=None):
+    """
+    HTML de una fila por socio con ``plantilla`` (que recibe ``member`` y
+    ``contexto``).  ``extra`` se agrega a la clave cuando la fila depende de
+    algo más que el socio.  ``variable`` es una plantilla que se renderiza en
+    cada pedido, sin caché, en el lugar de ``{{ parte_variable }}`` (por
+    ejemplo el estado de pago).  Devuelve ``(filas, aciertos, fallos)``.
+    """
+    versiones = _versiones([socio.id for socio in socios])
+    claves = {
+        socio.id: CLAVE_FILA.format(id=socio.id, plantilla=plantilla, version=versiones[socio.id], extra=extra)
+        for socio in socios
+    }
+    guardadas = cache.get_many(claves.values())
+
+    filas, nuevas = [], {}
+    for socio in socios:
+        clave = claves[socio.id]
+        html = guardadas.get(clave)
+        if html is None:
+            html = nuevas[clave] = render_to_string(
+                plantilla,
+                {**(contexto or {}), "member": socio, "csrf_token": MARCADOR_CSRF,
+                 "parte_variable": MARCADOR_VARIABLE},
+            )
+        if variable:
+            html = html.replace(MARCADOR_VARIABLE, render_to_string(
+                variable, {**(contexto or {}), "member": socio, "csrf_token": MARCADOR_CSRF},
+            ))
+        filas.append(html)
+    if nuevas:
+        cache.set_many(nuevas, DURACION)
+
+    aciertos = len(socios) - len(nuevas)
+    _contar(aciertos, len(nuevas))
+    if any(MARCADOR_CSRF in html for html in filas):
+        token = get_token(request)
+        filas = [html.replace(MARCADOR_CSRF, token) for html in filas]
+    return [mark_safe(html) for html in filas], aciertos, len(nuevas)
+
+
+def estadisticas():
+    valores = cache.get_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+    aciertos = valores.get(CLAVE_ACIERTOS, 0)
+    fallos = valores.get(CLAVE_FALLOS, 0)
+    total = aciertos + fallos
+    return {
+        "aciertos": aciertos,
+        "fallos": fallos,
+        "tasa_aciertos": round(aciertos / total, 4) if total else None,
+    }
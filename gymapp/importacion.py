@@ -0,0 +1,220 @@
+"""
+Importación de socios desde Excel o CSV (el formato de la exportación).
+
+Las filas se leen a medida que llegan (openpyxl en modo *read-only*, o
+``csv`` sobre el archivo, también comprimido con gzip) y se validan con las
+reglas de ``MemberForm``, incluido ``clean_gmail``.  Las válidas se guardan
+por lotes, cada uno en su transacción y con un único upsert por ``dni``
+(``INSERT ... ON CONFLICT (dni) DO UPDATE``); las inválidas van al informe
+con su número de fila y sus errores.  Un error no frena la importación.
+
+Solo se pisan las columnas que trae el archivo: una planilla con DNI, nombre
+y teléfono no borra el resto de la ficha de los socios que ya existen.
+
+El upsert es una sola sentencia preparada (``executemany``): armar el
+``bulk_create`` equivalente le costaba al ORM tres veces más que a SQLite
+guardar las filas.  No pasa por ``Member.save()`` ni por sus señales:
+``busqueda``, ``fecha_alta`` y ``fecha_modificacion`` se calculan acá y se
+invalidan las filas cacheadas de los socios actualizados.  El índice FTS5
+se mantiene solo (triggers).
+"""
+import csv
+import gzip
+import io
+import zipfile
+from datetime import date
+from types import SimpleNamespace
+
+import openpyxl
+from django.conf import settings
+from django.db import connection, transaction
+from django.forms import modelform_factory
+from django.utils import timezone
+
+from .busqueda import CAMPOS as CAMPOS_BUSQUEDA, texto_busqueda, tokens
+from .exportacion import COLUMNAS_SOCIOS
+from .forms import MemberImportForm
+from .fragmentos import invalidar_socios
+from .models import Member
+
+OBLIGATORIAS = ("dni", "nombre_apellido")
+
+
+def _clave(titulo):
+    # "Teléfono" -> "telefono", "Nombre y Apellido" -> "nombre_y_apellido".
+    return "_".join(tokens(str(titulo or "")))
+
+
+# Encabezado normalizado -> campo: los títulos de la exportación y los
+# nombres de los campos.
+ALIAS = {_clave(titulo): campo for titulo, campo in COLUMNAS_SOCIOS}
+ALIAS.update({campo: campo for _, campo in COLUMNAS_SOCIOS})
+
+
+class ErrorImportacion(ValueError):
+    """El archivo no se puede importar: formato desconocido o faltan columnas."""
+
+
+class Informe:
+    """Resultado de una importación: cantidades y errores por fila."""
+
+    def __init__(self, columnas, ignoradas):
+        self.columnas = columnas
+        self.ignoradas = ignoradas
+        self.filas = 0
+        self.creados = 0
+        self.actualizados = 0
+        # (número de fila en el archivo, DNI, mensaje)
+        self.errores = []
+
+
+def leer_filas(archivo, nombre):
+    """Itera las filas de un ``.xlsx``, ``.csv`` o ``.csv.gz``, encabezado incluido."""
+    nombre = nombre.lower()
+    if nombre.endswith(".xlsx"):
+        try:
+            wb = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, KeyError) as error:
+            raise ErrorImportacion("El archivo no es un Excel (.xlsx) válido.") from error
+        try:
+            yield from wb.worksheets[0].iter_rows(values_only=True)
+        finally:
+            wb.close()
+        return
+    if not nombre.endswith((".csv", ".csv.gz")):
+        raise ErrorImportacion("El archivo debe ser .xlsx, .csv o .csv.gz.")
+    binario = getattr(archivo, "file", archivo)
+    if nombre.endswith(".gz"):
+        binario = gzip.GzipFile(fileobj=binario)
+    try:
+        # utf-8-sig: la exportación (y Excel) escriben el BOM al principio.
+        yield from csv.reader(io.TextIOWrapper(binario, encoding="utf-8-sig", newline=""))
+    except (UnicodeDecodeError, gzip.BadGzipFile, csv.Error) as error:
+        raise ErrorImportacion(f"No se pudo leer el CSV (¿está en UTF-8?): {error}") from error
+
+
+class _Validador:
+    """
+    Un único ``MemberImportForm`` para todas las filas: construir uno por
+    fila (copia profunda de campos y widgets) se llevaba la mitad del tiempo.
+    """
+
+    def __init__(self, columnas):
+        self.form = modelform_factory(Member, form=MemberImportForm, fields=columnas)()
+        self.form.is_bound = True
+
+    def validar(self, datos):
+        """``(cleaned_data, None)`` o ``(None, mensaje de error)``."""
+        form = self.form
+        form.data = datos
+        form._errors = None
+        if form.is_valid():
+            return form.cleaned_data, None
+        return None, "; ".join(f"{campo}: {' '.join(errores)}" for campo, errores in form.errors.items())
+
+
+def _texto(valor):
+    if valor is None:
+        return ""
+    # Excel guarda DNI y teléfonos como números: 30123456.0 -> "30123456".
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def importar_socios(filas, lote=None, simular=False):
+    """
+    Crea o actualiza (por ``dni``) los socios de ``filas``: un iterable de
+    listas cuya primera fila es el encabezado.  Con ``simular`` solo valida.
+    Devuelve un ``Informe``; lanza ``ErrorImportacion`` si el encabezado no
+    sirve.
+    """
+    lote = lote or getattr(settings, "IMPORT_LOTE", 1000)
+    filas = iter(filas)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        raise ErrorImportacion("El archivo está vacío.")
+    posiciones = {}
+    ignoradas = []
+    for posicion, titulo in enumerate(encabezado):
+        campo = ALIAS.get(_clave(titulo))
+        if campo and campo not in posiciones:
+            posiciones[campo] = posicion
+        elif titulo not in (None, ""):
+            ignoradas.append(str(titulo))
+    faltan = [campo for campo in OBLIGATORIAS if campo not in posiciones]
+    if faltan:
+        raise ErrorImportacion("Faltan las columnas: " + ", ".join(faltan) + ".")
+
+    columnas = list(posiciones)
+    informe = Informe(columnas, ignoradas)
+    validador = _Validador(columnas)
+    vistos = {}
+    pendientes = []
+    # La fila 1 es el encabezado.
+    for numero, fila in enumerate(filas, start=2):
+        datos = {campo: _texto(fila[i]) if i < len(fila) else "" for campo, i in posiciones.items()}
+        if not any(datos.values()):
+            continue
+        informe.filas += 1
+        limpios, error = validador.validar(datos)
+        if error:
+            informe.errores.append((numero, datos["dni"], error))
+            continue
+        dni = limpios["dni"]
+        if dni in vistos:
+            informe.errores.append((numero, dni, f"dni: repetido en el archivo (fila {vistos[dni]})."))
+            continue
+        vistos[dni] = numero
+        pendientes.append(limpios)
+        if len(pendientes) >= lote:
+            _guardar(pendientes, columnas, informe, simular)
+            pendientes = []
+    if pendientes:
+        _guardar(pendientes, columnas, informe, simular)
+    return informe
+
+
+def _guardar(lote, columnas, informe, simular):
+    dnis = [datos["dni"] for datos in lote]
+    existentes = {
+        socio.dni: socio
+        for socio in Member.objects.filter(dni__in=dnis).only("id", *CAMPOS_BUSQUEDA)
+    }
+    informe.actualizados += len(existentes)
+    informe.creados += len(lote) - len(existentes)
+    if simular:
+        return
+
+    campos = [campo for campo in Member._meta.concrete_fields if not campo.primary_key]
+    # Sin instancias de Member: los datos ya vienen limpios del formulario.
+    valores_nuevo = {campo.attname: campo.get_default() for campo in campos}
+    valores_nuevo["fecha_alta"] = str(date.today())
+    valores_nuevo["fecha_modificacion"] = connection.ops.adapt_datetimefield_value(timezone.now())
+    filas = []
+    for datos in lote:
+        valores = dict(valores_nuevo)
+        previo = existentes.get(datos["dni"])
+        if previo:
+            # Las columnas que no vienen en el archivo conservan su valor (ver arriba).
+            valores.update((campo, getattr(previo, campo)) for campo in CAMPOS_BUSQUEDA)
+        valores.update(datos)
+        valores["busqueda"] = texto_busqueda(SimpleNamespace(**valores))
+        filas.append([valores[campo.attname] for campo in campos])
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_sql_upsert(campos, columnas), filas)
+    ids = [socio.id for socio in existentes.values()]
+    transaction.on_commit(lambda: invalidar_socios(ids))
+
+
+def _sql_upsert(campos, columnas):
+    # En el conflicto se pisan solo las columnas del archivo (y las calculadas).
+    q = connection.ops.quote_name
+    pisar = [Member._meta.get_field(c).column for c in columnas if c != "dni"]
+    pisar += ["busqueda", "fecha_modificacion"]
+    return (
+        f"INSERT INTO {q(Member._meta.db_table)} ({', '.join(q(c.column) for c in campos)}) "
+        f"VALUES ({', '.join(['%s'] * len(campos))}) "
+        f"ON CONFLICT ({q('dni')}) DO UPDATE SET "
+        + ", ".join(f"{q(c)} = excluded.{q(c)}" for c in pisar)
+    )
@@ -0,0 +1,34 @@
+"""
+Base de datos descartable para los comandos que miden vistas
+(``benchmark_vistas``, ``auditar_estaticos``): una base de test en un archivo
+temporal, con la conexión de lectura (``gym/routers.py``) apuntando a ella.
+La base real nunca se toca.
+"""
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, connections
+
+
+@contextmanager
+def base_temporal(nombre="temporal"):
+    with tempfile.TemporaryDirectory() as carpeta:
+        connection.settings_dict.setdefault("TEST", {})
+        nombre_original = connection.settings_dict["TEST"].get("NAME")
+        connection.settings_dict["TEST"]["NAME"] = str(Path(carpeta) / f"{nombre}.sqlite3")
+        nombre_real = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        lectura = connections[settings.BASE_LECTURA] if settings.BASE_LECTURA else None
+        if lectura:
+            nombre_lectura = lectura.settings_dict["NAME"]
+            lectura.close()
+            lectura.settings_dict["NAME"] = nombre_real
+        try:
+            yield nombre_real
+        finally:
+            if lectura:
+                lectura.close()
+                lectura.settings_dict["NAME"] = nombre_lectura
+            connection.creation.destroy_test_db(nombre_real, verbosity=0)
+            connection.settings_dict["TEST"]["NAME"] = nombre_original
@@ -0,0 +1,171 @@
+import json
+from html.parser import HTMLParser
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from gym.estaticos import comprimir_gzip, variantes
+from gymapp.management.base_temporal import base_temporal
+from gymapp.models import DetalleRutina, Ejercicio, Member, Rutina
+
+
+class _Referencias(HTMLParser):
+    """Estáticos que pide una página y bytes de JavaScript en línea."""
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+        self.js_en_linea = 0
+        self._en_script = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "script":
+            if attrs.get("src"):
+                self.urls.append(attrs["src"])
+            else:
+                self._en_script = True
+        elif tag == "link" and "stylesheet" in (attrs.get("rel") or "") and attrs.get("href"):
+            self.urls.append(attrs["href"])
+        elif tag == "img" and attrs.get("src"):
+            self.urls.append(attrs["src"])
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._en_script = False
+
+    def handle_data(self, data):
+        if self._en_script:
+            self.js_en_linea += len(data.encode())
+
+
+def _archivo(nombre):
+    ruta = finders.find(nombre)
+    if ruta:
+        return Path(ruta)
+    # Con nombre con hash, después de collectstatic.
+    if settings.STATIC_ROOT and staticfiles_storage.exists(nombre):
+        return Path(staticfiles_storage.path(nombre))
+    return None
+
+
+def _peso_estatico(nombre):
+    """``(bytes, bytes de la mejor variante comprimida)`` o ``None`` si no existe."""
+    ruta = _archivo(nombre)
+    if ruta is None:
+        return None
+    datos = ruta.read_bytes()
+    comprimidas = variantes(datos) if ruta.suffix in (".css", ".js", ".svg") else {}
+    return len(datos), min([len(datos), *map(len, comprimidas.values())])
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el peso de las páginas del editor de rutinas y del listado: HTML, "
+        "JavaScript en línea y estáticos, antes (sin caché) y después (estáticos "
+        "con hash y comprimidos, cacheados en las visitas siguientes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--salida", default="", help="Guardar el resultado en este JSON.")
+        parser.add_argument(
+            "--comparar", default="",
+            help="JSON de una corrida anterior (por ejemplo de otro commit): muestra la variación por página.",
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with base_temporal("auditoria"):
+                paginas = [self._medir(nombre, url) for nombre, url in self._paginas()]
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{'página':<28}{'HTML':>9}{'JS línea':>10}{'estáticos':>11}{'comprim.':>10}"
+            f"{'antes/visita':>14}{'después 1ª':>12}{'siguientes':>12}"
+        )
+        for p in paginas:
+            self.stdout.write(
+                f"{p['pagina']:<28}{p['html']:>9}{p['js_en_linea']:>10}{p['estaticos']:>11}"
+                f"{p['estaticos_comprimidos']:>10}{p['antes_por_visita']:>14}"
+                f"{p['despues_primera']:>12}{p['despues_siguientes']:>12}"
+            )
+        externos = dict.fromkeys(url for p in paginas for url in p["externos"])
+        faltantes = dict.fromkeys(url for p in paginas for url in p["faltantes"])
+        if externos:
+            self.stdout.write("Externos (no contados): " + ", ".join(externos))
+        if faltantes:
+            self.stdout.write(self.style.WARNING("No encontrados: " + ", ".join(faltantes)))
+
+        if options["salida"]:
+            Path(options["salida"]).write_text(json.dumps(paginas, indent=2, ensure_ascii=False), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+        if options["comparar"]:
+            self._comparar(Path(options["comparar"]), paginas)
+
+    def _paginas(self):
+        member = Member.objects.create(dni="0", nombre_apellido="Socio de auditoría")
+        ejercicios = Ejercicio.objects.bulk_create(Ejercicio(nombre=f"Ejercicio {n}") for n in range(200))
+        paginas = [("member_list", reverse("member_list"))]
+        for estructura, _ in Rutina.ESTRUCTURAS:
+            rutina = Rutina.objects.create(member=member, estructura=estructura)
+            DetalleRutina.objects.create(rutina=rutina, ejercicio=ejercicios[0], es_calentamiento=True)
+            DetalleRutina.objects.create(rutina=rutina, ejercicio=ejercicios[1], categoria="Empujes")
+            paginas.append((f"editar_rutina ({estructura})", reverse("editar_rutina", args=[rutina.id])))
+        return paginas
+
+    def _medir(self, nombre, url):
+        response = Client().get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code} en {url}")
+        html = response.content
+        referencias = _Referencias()
+        referencias.feed(html.decode())
+
+        estaticos = comprimidos = 0
+        externos, faltantes = [], []
+        for ref in dict.fromkeys(referencias.urls):
+            if not ref.startswith(settings.STATIC_URL):
+                externos.append(ref)
+                continue
+            peso = _peso_estatico(ref[len(settings.STATIC_URL):])
+            if peso is None:
+                faltantes.append(ref)
+                continue
+            estaticos += peso[0]
+            comprimidos += peso[1]
+        return {
+            "pagina": nombre,
+            "html": len(html),
+            "html_gzip": len(comprimir_gzip(html)),
+            "js_en_linea": referencias.js_en_linea,
+            "estaticos": estaticos,
+            "estaticos_comprimidos": comprimidos,
+            # Sin hash ni compresión el navegador vuelve a pedir todo en cada visita.
+            "antes_por_visita": len(html) + estaticos,
+            "despues_primera": len(html) + comprimidos,
+            # Con hash y caché de un año solo viaja el HTML.
+            "despues_siguientes": len(html),
+            "externos": externos,
+            "faltantes": faltantes,
+        }
+
+    def _comparar(self, archivo, actuales):
+        anteriores = {p["pagina"]: p for p in json.loads(archivo.read_text(encoding="utf-8"))}
+        self.stdout.write(f"Comparación con {archivo}:")
+        for p in actuales:
+            previa = anteriores.get(p["pagina"])
+            if not previa:
+                continue
+            self.stdout.write(
+                f"  {p['pagina']:<28} HTML {previa['html']} → {p['html']}  "
+                f"JS en línea {previa['js_en_linea']} → {p['js_en_linea']}  "
+                f"por visita {previa['antes_por_visita']} → {p['despues_siguientes']} bytes"
+            )
@@ -0,0 +1,194 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+from datetime import date
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from gymapp import portal
+from gymapp.management.base_temporal import base_temporal
+from gymapp.models import Member, Rutina
+
+
+def _commit_actual():
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return salida.stdout.strip()
+
+
+def _consumir(response):
+    # Las exportaciones se envían en streaming: se mide hasta el último byte.
+    if response.streaming:
+        return sum(len(bloque) for bloque in response.streaming_content)
+    return len(response.content)
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo de las vistas principales sobre bases sintéticas de "
+        "distintos tamaños (sembrar_datos) y guarda los resultados en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socios", default="1000,10000",
+            help="Tamaños a medir, en socios, separados por coma.",
+        )
+        parser.add_argument("--repeticiones", type=int, default=20)
+        parser.add_argument("--calentamiento", type=int, default=2)
+        parser.add_argument(
+            "--salida", default="",
+            help="Archivo JSON de resultados (por defecto benchmark-<commit>.json).",
+        )
+        parser.add_argument(
+            "--sembrar", default="",
+            help="Opciones extra para sembrar_datos, por ejemplo \"--meses 24 --rutinas 5\".",
+        )
+        parser.add_argument(
+            "--comparar", default="",
+            help="JSON de una corrida anterior: muestra la variación de la mediana por vista.",
+        )
+
+    def handle(self, *args, **options):
+        tamanios = [int(t) for t in options["socios"].split(",") if t.strip()]
+        commit = _commit_actual()
+        resultado = {
+            "commit": commit,
+            "fecha": date.today().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "motor": connection.vendor,
+            "repeticiones": options["repeticiones"],
+            "resultados": [],
+        }
+
+        setup_test_environment()
+        try:
+            for socios in tamanios:
+                resultado["resultados"].extend(self._medir_tamanio(socios, options))
+        finally:
+            teardown_test_environment()
+
+        salida = Path(options["salida"] or f"benchmark-{commit or 'sin-commit'}.json")
+        salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {salida}"))
+        if options["comparar"]:
+            self._comparar(Path(options["comparar"]), resultado)
+
+    def _comparar(self, archivo, actual):
+        anterior = json.loads(archivo.read_text(encoding="utf-8"))
+        previas = {(r["socios"], r["vista"]): r for r in anterior["resultados"]}
+        self.stdout.write(f"Comparación con {anterior.get('commit') or archivo}:")
+        for fila in actual["resultados"]:
+            previa = previas.get((fila["socios"], fila["vista"]))
+            if not previa:
+                continue
+            variacion = (fila["ms_mediana"] - previa["ms_mediana"]) / previa["ms_mediana"] * 100
+            texto = (
+                f"  {fila['socios']:>7} {fila['vista']:<28} {previa['ms_mediana']:8.1f} → "
+                f"{fila['ms_mediana']:8.1f} ms ({variacion:+.0f}%)  "
+                f"consultas {previa['consultas']} → {fila['consultas']}"
+            )
+            empeoro = variacion > 10 or fila["consultas"] > previa["consultas"]
+            self.stdout.write(self.style.WARNING(texto) if empeoro else texto)
+
+    def _medir_tamanio(self, socios, options):
+        # Cada tamaño usa una base de test propia en un archivo temporal.
+        with base_temporal(f"bench_{socios}"):
+            self.stdout.write(f"Sembrando {socios} socios…")
+            extra = options["sembrar"].split()
+            call_command("sembrar_datos", "--socios", str(socios), *extra, stdout=self.stdout)
+            filas = []
+            for vista, pedir in self._casos():
+                medicion = self._medir(pedir, options["repeticiones"], options["calentamiento"])
+                medicion.update({"socios": socios, "vista": vista})
+                filas.append(medicion)
+                self.stdout.write(
+                    f"  {vista:<28} mediana {medicion['ms_mediana']:8.1f} ms  "
+                    f"p95 {medicion['ms_p95']:8.1f} ms  {medicion['consultas']:4d} consultas"
+                )
+            return filas
+
+    def _casos(self):
+        client = Client()
+        # El socio con más historia (el alta más vieja) y su última rutina.
+        socio = Member.objects.order_by("fecha_alta", "id").first()
+        rutina = Rutina.objects.filter(member=socio).order_by("-fecha_creacion", "-id").first()
+        filas = [
+            {
+                "categoria": d.categoria,
+                "ejercicio_id": d.ejercicio_id,
+                "series": d.series,
+                "reps": d.repeticiones,
+                "kilos": d.peso,
+            }
+            for d in rutina.detalles_en_orden()
+        ]
+        payload = json.dumps({"semana_id": str(rutina.semana), "filas": filas})
+        xhr = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+        # El portal pide la cookie firmada del socio, como tras ingresar con el DNI.
+        cliente = Client()
+        cliente.cookies[portal.COOKIE] = portal.firmar(socio)
+        return [
+            ("member_list", lambda: client.get(reverse("member_list"))),
+            ("member_list?q", lambda: client.get(reverse("member_list"), {"q": "gonz"})),
+            ("member_rows_partial", lambda: client.get(reverse("member_rows_partial"), **xhr)),
+            ("historial_pagos", lambda: client.get(reverse("historial_pagos", args=[socio.id]))),
+            ("matriz_pagos", lambda: client.get(reverse("matriz_pagos"), {"por_pagina": 1000})),
+            ("editar_rutina", lambda: client.get(reverse("editar_rutina", args=[rutina.id]))),
+            ("guardar_rutina", lambda: client.post(
+                reverse("guardar_rutina", args=[rutina.id]), {"payload": payload}
+            )),
+            ("mis_rutinas", lambda: cliente.get(reverse("mis_rutinas", args=[socio.id]))),
+            ("export_members_excel", lambda: client.get(reverse("export_members_excel"))),
+            ("export_members_excel?csv", lambda: client.get(
+                reverse("export_members_excel"), {"formato": "csv"}
+            )),
+        ]
+
+    def _medir(self, pedir, repeticiones, calentamiento):
+        for _ in range(calentamiento):
+            _consumir(pedir())
+        tiempos = []
+        consultas = 0
+        bytes_respuesta = 0
+        for _ in range(repeticiones):
+            with ExitStack() as stack:
+                # Todas las conexiones: las vistas de solo lectura usan otra.
+                capturas = [stack.enter_context(CaptureQueriesContext(c)) for c in connections.all()]
+                inicio = time.perf_counter()
+                response = pedir()
+                bytes_respuesta = _consumir(response)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            consultas = sum(len(captura) for captura in capturas)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{response.status_code} en {response.request['PATH_INFO']}")
+        return {
+            "ms_min": round(min(tiempos), 2),
+            "ms_mediana": round(statistics.median(tiempos), 2),
+            "ms_p95": round(_percentil(tiempos, 95), 2),
+            "ms_promedio": round(statistics.fmean(tiempos), 2),
+            "consultas": consultas,
+            "bytes": bytes_respuesta,
+        }
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gymapp.retencion import archivar, versiones_a_archivar
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva las versiones viejas de las rutinas según la política de "
+        "retención: todas las de los últimos días y, antes, una por socio, "
+        "estructura, semana y mes.  Las archivadas se pueden restaurar desde "
+        "las rutinas del socio."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=None, help="Días que se conservan completos (RUTINAS_RETENCION_DIAS).")
+        parser.add_argument("--lote", type=int, default=None, help="Versiones por transacción (RUTINAS_ARCHIVO_LOTE).")
+        parser.add_argument("--socio", type=int, default=None, help="Solo las rutinas de este socio (id).")
+        parser.add_argument("--simular", action="store_true", help="Contar las versiones sin archivar nada.")
+
+    def handle(self, *args, **options):
+        lote = max(1, options["lote"] or settings.RUTINAS_ARCHIVO_LOTE)
+        ids = versiones_a_archivar(dias=options["dias"], member_id=options["socio"])
+        if options["simular"]:
+            self.stdout.write(f"Se archivarían {len(ids)} versiones.")
+            return
+        archivadas = borradas = 0
+        for inicio in range(0, len(ids), lote):
+            cantidad, filas = archivar(ids[inicio:inicio + lote])
+            archivadas += cantidad
+            borradas += filas
+            self.stdout.write(f"{archivadas}/{len(ids)} versiones archivadas…")
+        self.stdout.write(self.style.SUCCESS(
+            f"{archivadas} versiones archivadas, {borradas} filas sin uso borradas."
+        ))
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from gymapp import portal
+from gymapp.management.base_temporal import base_temporal
+from gymapp.management.commands.benchmark_vistas import _percentil
+from gymapp.models import Member
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara bajo carga concurrente la búsqueda en vivo y el portal del "
+        "cliente servidos por WSGI (un hilo por pedido) y por ASGI (vistas async "
+        "en un event loop), sobre una base sintética (sembrar_datos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socios", type=int, default=2000)
+        parser.add_argument("--pedidos", type=int, default=300, help="Por vista y despliegue.")
+        parser.add_argument(
+            "--concurrencia", type=int, default=16,
+            help="Pedidos simultáneos: hilos en WSGI, tareas en ASGI.",
+        )
+        parser.add_argument("--salida", default="", help="Guardar el resultado en este JSON.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            # Sin la muestra de consultas al log: ensuciaría la salida.
+            with base_temporal("asgi"), override_settings(CONSULTAS_MUESTREO=0):
+                call_command("sembrar_datos", "--socios", str(options["socios"]), stdout=self.stdout)
+                resultados = self._comparar(options["pedidos"], options["concurrencia"])
+                connections.close_all()
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f"{'vista':<24}{'despliegue':>11}{'pedidos/s':>11}{'p50 ms':>9}{'p95 ms':>9}")
+        for r in resultados:
+            self.stdout.write(
+                f"{r['vista']:<24}{r['despliegue']:>11}{r['pedidos_s']:>11.1f}"
+                f"{r['ms_p50']:>9.1f}{r['ms_p95']:>9.1f}"
+            )
+        if options["salida"]:
+            Path(options["salida"]).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+
+    def _comparar(self, pedidos, concurrencia):
+        socio = Member.objects.order_by("fecha_alta", "id").first()
+        cookie = portal.firmar(socio)
+        casos = [
+            ("member_rows_partial?q", reverse("member_rows_partial"), {"q": "gonz"}, None),
+            ("mis_rutinas", reverse("mis_rutinas", args=[socio.id]), {}, cookie),
+        ]
+        resultados = []
+        for vista, url, datos, firma in casos:
+            for despliegue, medir in (("wsgi", self._wsgi), ("asgi", self._asgi)):
+                inicio = time.perf_counter()
+                tiempos = medir(url, datos, firma, pedidos, concurrencia)
+                total = time.perf_counter() - inicio
+                resultados.append({
+                    "vista": vista,
+                    "despliegue": despliegue,
+                    "pedidos": pedidos,
+                    "concurrencia": concurrencia,
+                    "pedidos_s": round(pedidos / total, 1),
+                    "ms_p50": round(statistics.median(tiempos), 2),
+                    "ms_p95": round(_percentil(tiempos, 95), 2),
+                })
+        return resultados
+
+    def _wsgi(self, url, datos, firma, pedidos, concurrencia):
+        # Como gunicorn con hilos: cada hilo atiende un pedido por vez con su
+        # propio cliente (y su propia conexión a la base).
+        locales = threading.local()
+
+        def pedir(_):
+            if not hasattr(locales, "client"):
+                locales.client = Client()
+                if firma:
+                    locales.client.cookies[portal.COOKIE] = firma
+            inicio = time.perf_counter()
+            response = locales.client.get(url, datos)
+            _verificar(response, url)
+            return (time.perf_counter() - inicio) * 1000
+
+        with ThreadPoolExecutor(max_workers=concurrencia) as hilos:
+            return list(hilos.map(pedir, range(pedidos)))
+
+    def _asgi(self, url, datos, firma, pedidos, concurrencia):
+        client = AsyncClient()
+        if firma:
+            client.cookies[portal.COOKIE] = firma
+
+        async def pedir(limite):
+            async with limite:
+                inicio = time.perf_counter()
+                # Igual que ASGIHandler: el código sync de cada pedido (ORM
+                # incluido) corre en un hilo propio del pedido.
+                async with ThreadSensitiveContext():
+                    response = await client.get(url, datos)
+                _verificar(response, url)
+                return (time.perf_counter() - inicio) * 1000
+
+        async def todos():
+            limite = asyncio.Semaphore(concurrencia)
+            return await asyncio.gather(*(pedir(limite) for _ in range(pedidos)))
+
+        return asyncio.run(todos())
+
+
+def _verificar(response, url):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.status_code} en {url}")
@@ -0,0 +1,55 @@
+import csv
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gymapp.importacion import ErrorImportacion, importar_socios, leer_filas
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa socios desde un Excel (.xlsx) o CSV (.csv, .csv.gz) con los "
+        "encabezados de la exportación: crea los DNI nuevos y actualiza los existentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo")
+        parser.add_argument("--lote", type=int, default=None, help="Socios por transacción (IMPORT_LOTE).")
+        parser.add_argument("--simular", action="store_true", help="Validar sin guardar.")
+        parser.add_argument("--errores", default="", help="Guardar las filas con error en este CSV.")
+
+    def handle(self, *args, **options):
+        ruta = Path(options["archivo"])
+        if not ruta.is_file():
+            raise CommandError(f"No existe {ruta}.")
+        inicio = time.perf_counter()
+        with ruta.open("rb") as archivo:
+            try:
+                informe = importar_socios(
+                    leer_filas(archivo, ruta.name), lote=options["lote"], simular=options["simular"],
+                )
+            except ErrorImportacion as error:
+                raise CommandError(str(error))
+        segundos = time.perf_counter() - inicio
+
+        if informe.ignoradas:
+            self.stdout.write(self.style.WARNING("Columnas ignoradas: " + ", ".join(informe.ignoradas)))
+        for numero, dni, mensaje in informe.errores[:20]:
+            self.stdout.write(self.style.ERROR(f"  fila {numero} (DNI {dni or '-'}): {mensaje}"))
+        if len(informe.errores) > 20:
+            self.stdout.write(self.style.ERROR(f"  … y {len(informe.errores) - 20} errores más."))
+        if options["errores"] and informe.errores:
+            with open(options["errores"], "w", newline="", encoding="utf-8-sig") as salida:
+                writer = csv.writer(salida)
+                writer.writerow(["Fila", "DNI", "Errores"])
+                writer.writerows(informe.errores)
+            self.stdout.write(f"Errores en {options['errores']}")
+
+        if options["simular"]:
+            texto = f"Se crearían {informe.creados} socios y se actualizarían {informe.actualizados}"
+        else:
+            texto = f"Se crearon {informe.creados} socios y se actualizaron {informe.actualizados}"
+        self.stdout.write(self.style.SUCCESS(
+            f"{texto}; {len(informe.errores)} filas con error de {informe.filas} ({segundos:.1f} s)."
+        ))
@@ -0,0 +1,34 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra de django_session las sesiones vencidas y las que dejó el portal del "
+        "cliente (solo cliente_id, sin usuario); el portal ahora usa una cookie firmada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=1000, help="Sesiones por lote.")
+        parser.add_argument("--simular", action="store_true", help="Contar sin borrar.")
+
+    def handle(self, *args, **options):
+        vencidas = Session.objects.filter(expire_date__lt=timezone.now())
+        cantidad_vencidas = vencidas.count()
+        if not options["simular"]:
+            vencidas.delete()
+
+        del_portal = []
+        for sesion in Session.objects.only("session_key", "session_data").iterator(chunk_size=options["lote"]):
+            datos = sesion.get_decoded()
+            if "cliente_id" in datos and "_auth_user_id" not in datos:
+                del_portal.append(sesion.session_key)
+        if not options["simular"]:
+            for inicio in range(0, len(del_portal), options["lote"]):
+                Session.objects.filter(session_key__in=del_portal[inicio:inicio + options["lote"]]).delete()
+
+        verbo = "Se borrarían" if options["simular"] else "Se borraron"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verbo} {cantidad_vencidas} sesiones vencidas y {len(del_portal)} del portal del cliente."
+        ))
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from gymapp.tareas import ejecutar, limpiar_terminadas, recuperar_colgadas, tomar
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de tareas en segundo plano (exportaciones, importaciones, "
+        "reconstrucción de la recaudación): toma las pendientes de la tabla "
+        "Tarea y las ejecuta en varios hilos.  Se pueden correr varios a la vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=None, help="Tareas a la vez (TAREAS_HILOS).")
+        parser.add_argument(
+            "--una-vez", action="store_true",
+            help="Procesar las pendientes y terminar (para cron), en vez de quedar esperando.",
+        )
+
+    def handle(self, *args, **options):
+        hilos = max(1, options["hilos"] or settings.TAREAS_HILOS)
+        self._recuperar()
+        borradas = limpiar_terminadas()
+        if borradas:
+            self.stdout.write(f"{borradas} tareas viejas borradas.")
+
+        parar = threading.Event()
+        if hilos == 1:
+            # En el hilo principal: usa la misma conexión que quien llama (tests, cron).
+            self._trabajar(parar, options["una_vez"])
+            return
+        trabajadores = [
+            threading.Thread(target=self._trabajar_en_hilo, args=(parar, options["una_vez"]), daemon=True)
+            for _ in range(hilos)
+        ]
+        for trabajador in trabajadores:
+            trabajador.start()
+        try:
+            for trabajador in trabajadores:
+                while trabajador.is_alive():
+                    trabajador.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Terminando las tareas en curso…")
+            parar.set()
+            for trabajador in trabajadores:
+                trabajador.join()
+
+    def _trabajar_en_hilo(self, parar, una_vez):
+        try:
+            self._trabajar(parar, una_vez)
+        finally:
+            connections.close_all()
+
+    def _recuperar(self):
+        recuperadas = recuperar_colgadas()
+        if recuperadas:
+            self.stdout.write(self.style.WARNING(f"{recuperadas} tareas colgadas vuelven a la cola."))
+        return recuperadas
+
+    def _trabajar(self, parar, una_vez):
+        revisada = time.monotonic()
+        while not parar.is_set():
+            tarea = tomar()
+            if tarea is None:
+                if una_vez:
+                    return
+                # Con la cola vacía se revisan, cada tanto, las tareas de otro
+                # worker que se cortó mientras este sigue corriendo.
+                if time.monotonic() - revisada >= settings.TAREAS_REVISION:
+                    revisada = time.monotonic()
+                    if self._recuperar():
+                        continue
+                parar.wait(settings.TAREAS_ESPERA)
+                continue
+            ejecutar(tarea)
+            if tarea.estado == tarea.ERROR:
+                self.stdout.write(self.style.ERROR(f"{tarea}: {tarea.error}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{tarea} ({tarea.terminada - tarea.iniciada})"))
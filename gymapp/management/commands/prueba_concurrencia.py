@@ -0,0 +1,34 @@
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from gym.sqlite.concurrencia import medir_concurrencia
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara errores \"database is locked\" bajo carga concurrente entre la "
+        "configuración SQLite por defecto de Django y la del proyecto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--escritores", type=int, default=4)
+        parser.add_argument("--lectores", type=int, default=4)
+        parser.add_argument("--transacciones", type=int, default=25, help="Por escritor.")
+
+    def handle(self, *args, **options):
+        parametros = {
+            "escritores": options["escritores"],
+            "lectores": options["lectores"],
+            "transacciones": options["transacciones"],
+        }
+        with tempfile.TemporaryDirectory() as carpeta:
+            for nombre, ajustada in (("Django por defecto", False), ("gym.sqlite", True)):
+                archivo = Path(carpeta) / f"{'ajustada' if ajustada else 'defecto'}.sqlite3"
+                r = medir_concurrencia(archivo, ajustada=ajustada, **parametros)
+                texto = (
+                    f"{nombre:<20} {r['errores']:5d} errores  {r['escrituras']:5d} escrituras  "
+                    f"{r['lecturas']:7d} lecturas  {r['segundos']:.2f} s"
+                )
+                self.stdout.write(self.style.ERROR(texto) if r["errores"] else self.style.SUCCESS(texto))
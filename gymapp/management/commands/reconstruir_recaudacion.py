@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from gymapp.recaudacion import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = "Rehace el resumen de recaudación por mes y plan a partir de todos los pagos."
+
+    def handle(self, *args, **options):
+        filas = reconstruir_resumenes()
+        self.stdout.write(self.style.SUCCESS(f"Resumen de recaudación reconstruido ({filas} filas)."))
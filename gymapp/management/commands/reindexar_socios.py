@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from gymapp.busqueda import reconstruir_indice, texto_busqueda
+from gymapp.models import Member
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de socios (FTS5 y columna de fallback)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=1000, help="Socios por lote.")
+
+    def handle(self, *args, **options):
+        lote = []
+        total = 0
+        for socio in Member.objects.only("id", "nombre_apellido", "dni", "telefono", "gmail").iterator(
+            chunk_size=options["lote"]
+        ):
+            socio.busqueda = texto_busqueda(socio)
+            lote.append(socio)
+            if len(lote) >= options["lote"]:
+                Member.objects.bulk_update(lote, ["busqueda"])
+                total += len(lote)
+                lote = []
+        if lote:
+            Member.objects.bulk_update(lote, ["busqueda"])
+            total += len(lote)
+
+        if reconstruir_indice():
+            self.stdout.write(self.style.SUCCESS(f"Índice FTS5 reconstruido ({total} socios)."))
+        else:
+            self.stdout.write(f"Columna de búsqueda actualizada ({total} socios); FTS5 no disponible.")
@@ -0,0 +1,206 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from gymapp.busqueda import reconstruir_indice, texto_busqueda
+from gymapp.models import Ejercicio, Eliminacion, Member, Payment, Rutina
+from gymapp.recaudacion import reconstruir_resumenes
+from gymapp.versionado import borrar_filas_huerfanas, guardar_filas_en_lote
+
+NOMBRES = [
+    "Juan", "María", "Lucía", "Martín", "Sofía", "Mateo", "Valentina", "Tomás",
+    "Camila", "Joaquín", "Agustina", "Nicolás", "Florencia", "Santiago", "Julieta",
+    "Benjamín", "Martina", "Facundo", "Paula", "Ramiro", "Ángeles", "Iñaki",
+]
+APELLIDOS = [
+    "González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez",
+    "Pérez", "García", "Sánchez", "Romero", "Sosa", "Álvarez", "Torres", "Ruiz",
+    "Ramírez", "Flores", "Benítez", "Acosta", "Medina", "Herrera", "Suárez",
+]
+CATEGORIAS = [
+    "Pectorales", "Espalda", "Deltoides", "Bíceps", "Tríceps", "Cuádriceps",
+    "Isquiotibiales", "Pantorrilla", "Abdomen",
+]
+ESTRUCTURAS = [clave for clave, _ in Rutina.ESTRUCTURAS]
+PLANES = list(Payment.PRECIOS)
+
+
+def _meses_atras(hoy, cantidad):
+    anio, mes = hoy.year, hoy.month - cantidad
+    while mes < 1:
+        mes += 12
+        anio -= 1
+    return date(anio, mes, 1)
+
+
+def _siguiente_mes(mes):
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera socios, pagos y rutinas sintéticos con inserciones en bloque, "
+        "para medir cómo escalan las vistas (ver benchmark_vistas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socios", type=int, default=50000)
+        parser.add_argument(
+            "--meses", type=int, default=40,
+            help="Antigüedad máxima de un socio en meses (un pago por mes: ~socios × meses/2 pagos).",
+        )
+        parser.add_argument("--rutinas", type=int, default=10, help="Rutinas (versiones) por socio.")
+        parser.add_argument("--filas", type=int, default=8, help="Filas por rutina.")
+        parser.add_argument("--semilla", type=int, default=1)
+        parser.add_argument("--lote", type=int, default=2000, help="Socios por lote.")
+        parser.add_argument(
+            "--borrar", action="store_true",
+            help="Borra antes todos los socios (y sus pagos y rutinas).",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["semilla"])
+        inicio = time.perf_counter()
+
+        if options["borrar"]:
+            # Baja de cada socio para la exportación de cambios; sus pagos se
+            # van con él.
+            Eliminacion.registrar(Member.objects.all())
+            Payment.objects.all().delete()
+            Member.objects.all().delete()
+            borrar_filas_huerfanas()
+        if not Ejercicio.objects.exists():
+            call_command("loaddata", "ejercicios_unique", verbosity=0)
+        self.ejercicios = list(Ejercicio.objects.values_list("id", flat=True))
+        if not self.ejercicios:
+            raise CommandError("No hay ejercicios cargados.")
+
+        # Los DNI sintéticos arrancan en 90.000.000 para no chocar con reales.
+        ultimo = (
+            Member.objects.filter(dni__regex=r"^9\d{7}$")
+            .order_by("-dni").values_list("dni", flat=True).first()
+        )
+        base_dni = int(ultimo) + 1 if ultimo else 90_000_000
+        totales = {"socios": 0, "pagos": 0, "rutinas": 0, "filas": 0}
+        for desde in range(0, options["socios"], options["lote"]):
+            cantidad = min(options["lote"], options["socios"] - desde)
+            with transaction.atomic():
+                parcial = self._sembrar_lote(base_dni + desde, cantidad, options)
+            for clave, valor in parcial.items():
+                totales[clave] += valor
+            self.stdout.write(f"  {desde + cantidad}/{options['socios']} socios", ending="\r")
+            self.stdout.flush()
+
+        # El índice FTS se mantiene con triggers; se reconstruye igual para
+        # dejarlo compacto después de una carga grande.
+        reconstruir_indice()
+        # Los pagos se insertan sin señales: el resumen se arma al final.
+        reconstruir_resumenes()
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo en {segundos:.1f} s: {totales['socios']} socios, {totales['pagos']} pagos, "
+            f"{totales['rutinas']} rutinas, {totales['filas']} filas nuevas."
+        ))
+
+    def _sembrar_lote(self, primer_dni, cantidad, options):
+        rng = self.rng
+        hoy = date.today().replace(day=1)
+
+        socios = []
+        altas = []
+        for n in range(cantidad):
+            nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+            dni = str(primer_dni + n)
+            socio = Member(
+                dni=dni,
+                nombre_apellido=nombre,
+                telefono=f"11{rng.randrange(10**7, 10**8)}",
+                gmail=f"socio{dni}@example.com",
+                edad=rng.randint(14, 75),
+                frecuencia_semana=str(rng.randint(2, 5)),
+            )
+            # bulk_create no llama a save(): la columna de búsqueda se arma acá.
+            socio.busqueda = texto_busqueda(socio)
+            socios.append(socio)
+            altas.append(_meses_atras(hoy, rng.randint(0, options["meses"] - 1)))
+        socios = Member.objects.bulk_create(socios)
+
+        # fecha_alta es auto_now_add: se corrige con un UPDATE por mes de alta.
+        por_alta = {}
+        for socio, alta in zip(socios, altas):
+            por_alta.setdefault(alta, []).append(socio.id)
+        for alta, ids in por_alta.items():
+            Member.objects.filter(id__in=ids).update(fecha_alta=alta)
+
+        pagos = []
+        for socio, alta in zip(socios, altas):
+            mes = alta
+            plan = rng.choice(PLANES)
+            while mes <= hoy:
+                # La mayoría paga; algunos deben y unos pocos pagos se anulan.
+                if rng.random() < 0.9:
+                    pagos.append(Payment(
+                        member_id=socio.id,
+                        mes=mes,
+                        pagado=True,
+                        anulado=rng.random() < 0.02,
+                        plan=plan,
+                        monto=Payment.PRECIOS[plan],
+                    ))
+                mes = _siguiente_mes(mes)
+        Payment.objects.bulk_create(pagos, batch_size=5000)
+
+        rutinas = []
+        for socio in socios:
+            estructura = rng.choice(ESTRUCTURAS)
+            for semana in range(options["rutinas"]):
+                rutinas.append(Rutina(member_id=socio.id, estructura=estructura, semana=semana % 8 + 1))
+        rutinas = Rutina.objects.bulk_create(rutinas, batch_size=5000)
+        self._fechar_rutinas(rutinas, options["rutinas"])
+
+        # Cada versión cambia una o dos filas de la anterior, como en el editor.
+        versiones = []
+        filas = []
+        for i, rutina in enumerate(rutinas):
+            if i % options["rutinas"] == 0:
+                filas = [self._fila_al_azar() for _ in range(options["filas"])]
+            else:
+                filas = list(filas)
+                for _ in range(rng.randint(1, 2)):
+                    if filas:
+                        filas[rng.randrange(len(filas))] = self._fila_al_azar()
+            versiones.append((rutina, filas))
+        nuevas = guardar_filas_en_lote(versiones, tamanio_lote=5000)
+
+        return {"socios": len(socios), "pagos": len(pagos), "rutinas": len(rutinas), "filas": nuevas}
+
+    def _fechar_rutinas(self, rutinas, por_socio):
+        # fecha_creacion también es auto_now_add: una versión por semana
+        # hacia atrás, con un UPDATE por semana.
+        ahora = timezone.now()
+        por_semana = {}
+        for i, rutina in enumerate(rutinas):
+            atras = por_socio - 1 - i % por_socio
+            por_semana.setdefault(atras, []).append(rutina.id)
+        for atras, ids in por_semana.items():
+            Rutina.objects.filter(id__in=ids).update(fecha_creacion=ahora - timedelta(weeks=atras))
+
+    def _fila_al_azar(self):
+        rng = self.rng
+        return {
+            "categoria": rng.choice(CATEGORIAS),
+            "ejercicio_id": rng.choice(self.ejercicios),
+            "series": str(rng.randint(2, 5)),
+            "repeticiones": rng.choice(["6", "8", "10", "12", "8-10", "10-12"]),
+            "peso": str(rng.randrange(0, 120, 5)) if rng.random() < 0.7 else "",
+            "descanso": rng.choice(["60s", "90s", "2m", ""]),
+            "rir": rng.choice(["1", "2", "3", ""]),
+            "sensaciones": "",
+            "notas": "",
+            "es_calentamiento": rng.random() < 0.15,
+        }
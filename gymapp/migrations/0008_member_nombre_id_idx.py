@@ -0,0 +1,22 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0007_rutina_semana'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rutina',
+            name='estructura',
+            field=models.CharField(choices=[('hipertrofia', 'Hipertrofia'), ('fuerza_base', 'Fuerza base'), ('deportista', 'Deportista avanzado'), ('acondicionamiento', 'Acondicionamiento físico'), ('iniciacion', 'Iniciación')], max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['nombre_apellido', 'id'], name='member_nombre_id_idx'),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:33
+
+import re
+import unicodedata
+
+from django.db import OperationalError, migrations, models
+
+# Copia congelada de ``gymapp.busqueda`` al momento de esta migración: el
+# módulo puede cambiar después y la migración tiene que seguir haciendo lo
+# mismo.  El caché de ``busqueda.usa_fts`` lo actualiza el ``post_migrate``
+# de ``apps.py``.
+CAMPOS = ("nombre_apellido", "dni", "telefono", "gmail")
+
+SQL_CREAR_TABLA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS gymapp_member_fts USING fts5(
+    nombre_apellido, dni, telefono, gmail,
+    tokenize = "unicode61 remove_diacritics 2",
+    prefix = '2 3'
+)
+"""
+
+SQL_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS gymapp_member_fts_ai AFTER INSERT ON gymapp_member BEGIN
+        INSERT INTO gymapp_member_fts(rowid, nombre_apellido, dni, telefono, gmail)
+        VALUES (new.id, new.nombre_apellido, new.dni, new.telefono, new.gmail);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS gymapp_member_fts_ad AFTER DELETE ON gymapp_member BEGIN
+        DELETE FROM gymapp_member_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS gymapp_member_fts_au
+    AFTER UPDATE OF nombre_apellido, dni, telefono, gmail ON gymapp_member BEGIN
+        DELETE FROM gymapp_member_fts WHERE rowid = old.id;
+        INSERT INTO gymapp_member_fts(rowid, nombre_apellido, dni, telefono, gmail)
+        VALUES (new.id, new.nombre_apellido, new.dni, new.telefono, new.gmail);
+    END
+    """,
+]
+
+SQL_CARGAR = [
+    "DELETE FROM gymapp_member_fts",
+    "INSERT INTO gymapp_member_fts(rowid, nombre_apellido, dni, telefono, gmail) "
+    "SELECT id, nombre_apellido, dni, telefono, gmail FROM gymapp_member",
+]
+
+
+def texto_busqueda(socio):
+    palabras = []
+    for campo in CAMPOS:
+        texto = unicodedata.normalize("NFKD", getattr(socio, campo) or "")
+        texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+        palabras.extend(re.findall(r"\w+", texto))
+    return "".join(f" {p}" for p in palabras)
+
+
+def crear_indice(connection):
+    # Sin FTS5 en SQLite queda el fallback sobre ``Member.busqueda``.
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(SQL_CREAR_TABLA)
+        except OperationalError:
+            return
+        for sql in SQL_TRIGGERS + SQL_CARGAR:
+            cursor.execute(sql)
+
+
+def poblar_busqueda(apps, schema_editor):
+    Member = apps.get_model("gymapp", "Member")
+    socios = list(Member.objects.using(schema_editor.connection.alias).all())
+    for socio in socios:
+        socio.busqueda = texto_busqueda(socio)
+    Member.objects.using(schema_editor.connection.alias).bulk_update(
+        socios, ["busqueda"], batch_size=500
+    )
+    crear_indice(schema_editor.connection)
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sufijo in ("ai", "ad", "au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS gymapp_member_fts_{sufijo}")
+        cursor.execute("DROP TABLE IF EXISTS gymapp_member_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0008_member_nombre_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='busqueda',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(poblar_busqueda, borrar_indice),
+    ]
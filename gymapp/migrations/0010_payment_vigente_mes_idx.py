@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0009_member_busqueda_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('anulado', False), ('pagado', True)), fields=['mes', 'member'], name='payment_vigente_mes_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0010_payment_vigente_mes_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rutina',
+            index=models.Index(fields=['member', '-fecha_creacion', '-id'], name='rutina_member_fecha_idx'),
+        ),
+    ]
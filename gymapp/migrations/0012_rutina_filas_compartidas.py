@@ -0,0 +1,141 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:44
+
+import hashlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Copia congelada de ``gymapp.versionado`` al momento de esta migración: la
+# huella de una fila tiene que ser la misma que calcula ``guardar_filas``,
+# pero la migración no puede depender de cómo cambie el módulo después.
+CAMPOS_CONTENIDO = (
+    "categoria",
+    "ejercicio_id",
+    "series",
+    "repeticiones",
+    "peso",
+    "descanso",
+    "rir",
+    "sensaciones",
+    "notas",
+    "es_calentamiento",
+)
+
+
+def huella_detalle(detalle):
+    digest = hashlib.sha1()
+    for campo in CAMPOS_CONTENIDO:
+        valor = getattr(detalle, campo)
+        if campo == "es_calentamiento":
+            valor = bool(valor)
+        elif campo == "ejercicio_id":
+            valor = int(valor) if valor else None
+        else:
+            valor = "" if valor is None else str(valor)
+        digest.update(f"{valor}\x1f".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def compartir_filas(apps, schema_editor):
+    """
+    Calcula la huella de cada fila existente, arma las posiciones de cada
+    rutina y deja una sola fila por contenido (las copias idénticas que
+    dejaron las versiones anteriores se borran).
+    """
+    alias = schema_editor.connection.alias
+    DetalleRutina = apps.get_model("gymapp", "DetalleRutina")
+    FilaRutina = apps.get_model("gymapp", "FilaRutina")
+
+    canonicas = {}
+    duplicadas = []
+    posiciones = []
+    huellas = []
+    orden = {}
+    detalles = DetalleRutina.objects.using(alias).order_by("rutina_id", "id")
+    for detalle in detalles.iterator(chunk_size=2000):
+        huella = huella_detalle(detalle)
+        if huella in canonicas:
+            duplicadas.append(detalle.id)
+        else:
+            canonicas[huella] = detalle.id
+            detalle.huella = huella
+            huellas.append(detalle)
+        if detalle.rutina_id is not None:
+            posicion = orden.get(detalle.rutina_id, 0)
+            orden[detalle.rutina_id] = posicion + 1
+            posiciones.append(FilaRutina(
+                rutina_id=detalle.rutina_id, detalle_id=canonicas[huella], orden=posicion,
+            ))
+        if len(posiciones) >= 2000:
+            FilaRutina.objects.using(alias).bulk_create(posiciones)
+            posiciones = []
+        if len(huellas) >= 2000:
+            DetalleRutina.objects.using(alias).bulk_update(huellas, ["huella"])
+            huellas = []
+    FilaRutina.objects.using(alias).bulk_create(posiciones)
+    DetalleRutina.objects.using(alias).bulk_update(huellas, ["huella"])
+    for inicio in range(0, len(duplicadas), 500):
+        DetalleRutina.objects.using(alias).filter(id__in=duplicadas[inicio:inicio + 500]).delete()
+
+
+def separar_filas(apps, schema_editor):
+    """Vuelve a una fila propia por rutina (esquema anterior)."""
+    alias = schema_editor.connection.alias
+    DetalleRutina = apps.get_model("gymapp", "DetalleRutina")
+    FilaRutina = apps.get_model("gymapp", "FilaRutina")
+
+    usadas = set()
+    posiciones = FilaRutina.objects.using(alias).select_related("detalle").order_by("rutina_id", "orden")
+    for posicion in posiciones.iterator(chunk_size=2000):
+        detalle = posicion.detalle
+        if detalle.id not in usadas:
+            usadas.add(detalle.id)
+            if detalle.rutina_id != posicion.rutina_id:
+                DetalleRutina.objects.using(alias).filter(id=detalle.id).update(
+                    rutina_id=posicion.rutina_id
+                )
+        else:
+            detalle.pk = None
+            detalle.rutina_id = posicion.rutina_id
+            detalle.save(using=alias)
+    # Las que quedaron sin rutina no las usa ninguna versión.
+    DetalleRutina.objects.using(alias).filter(rutina__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0011_rutina_member_fecha_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallerutina',
+            name='huella',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=40),
+        ),
+        migrations.AlterField(
+            model_name='detallerutina',
+            name='rutina',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='detalles_creados', to='gymapp.rutina'),
+        ),
+        migrations.CreateModel(
+            name='FilaRutina',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField(default=0)),
+                ('detalle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='filas', to='gymapp.detallerutina')),
+                ('rutina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='filas', to='gymapp.rutina')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='rutina',
+            name='detalles',
+            field=models.ManyToManyField(blank=True, related_name='rutinas', through='gymapp.FilaRutina', to='gymapp.detallerutina'),
+        ),
+        migrations.AddIndex(
+            model_name='filarutina',
+            index=models.Index(fields=['rutina', 'orden'], name='fila_rutina_orden_idx'),
+        ),
+        migrations.RunPython(compartir_filas, separar_filas),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:55
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def resumir_pagos(apps, schema_editor):
+    Payment = apps.get_model("gymapp", "Payment")
+    ResumenRecaudacion = apps.get_model("gymapp", "ResumenRecaudacion")
+    acumulado = defaultdict(lambda: [0, Decimal("0")])
+    agregados = (
+        Payment.objects.filter(pagado=True, anulado=False)
+        .order_by()
+        .values("mes", "plan")
+        .annotate(cantidad=Count("id"), total=Sum("monto"))
+    )
+    for fila in agregados:
+        clave = (fila["mes"].replace(day=1), fila["plan"] or "")
+        acumulado[clave][0] += fila["cantidad"]
+        acumulado[clave][1] += fila["total"] or Decimal("0")
+    ResumenRecaudacion.objects.bulk_create(
+        ResumenRecaudacion(mes=mes, plan=plan, cantidad=cantidad, total=total)
+        for (mes, plan), (cantidad, total) in acumulado.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0012_rutina_filas_compartidas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenRecaudacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('plan', models.CharField(blank=True, default='', max_length=8)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='resumenrecaudacion',
+            constraint=models.UniqueConstraint(fields=('mes', 'plan'), name='unique_resumen_mes_plan'),
+        ),
+        migrations.RunPython(resumir_pagos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0013_resumen_recaudacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabla', models.CharField(choices=[('socios', 'Socios'), ('pagos', 'Pagos')], max_length=10)),
+                ('objeto_id', models.BigIntegerField()),
+                ('clave', models.CharField(blank=True, max_length=50)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tabla', 'fecha'], name='eliminacion_tabla_fecha_idx')],
+            },
+        ),
+    ]
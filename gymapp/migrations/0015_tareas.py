@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0014_cambios_exportacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=40)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('lista', 'Lista'), ('error', 'Con error')], default='pendiente', max_length=10)),
+                ('resultado', models.JSONField(blank=True, default=dict)),
+                ('archivo', models.CharField(blank=True, max_length=200)),
+                ('nombre_archivo', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('terminada', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'id'], name='tarea_estado_idx')],
+            },
+        ),
+    ]
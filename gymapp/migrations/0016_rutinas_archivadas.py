@@ -0,0 +1,31 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0015_tareas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RutinaArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rutina_original', models.BigIntegerField()),
+                ('estructura', models.CharField(choices=[('hipertrofia', 'Hipertrofia'), ('fuerza_base', 'Fuerza base'), ('deportista', 'Deportista avanzado'), ('acondicionamiento', 'Acondicionamiento físico'), ('iniciacion', 'Iniciación')], max_length=50)),
+                ('semana', models.PositiveSmallIntegerField(default=1)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True)),
+                ('cantidad_filas', models.PositiveIntegerField(default=0)),
+                ('datos', models.JSONField(default=dict)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rutinas_archivadas', to='gymapp.member')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['member', 'fecha_creacion'], name='rutina_archivada_member_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gymapp', '0016_rutinas_archivadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rutina',
+            name='conservar',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,7 +1,39 @@
-from django.db import models
+from django.db import models, transaction
 from decimal import Decimal
+from itertools import islice
+
+def con_campos(update_fields, *campos):
+    """``update_fields`` con ``campos`` agregados (``None`` sigue siendo "todos")."""
+    if not update_fields:
+        return update_fields
+    return list(update_fields) + [campo for campo in campos if campo not in update_fields]
+
 
 # === Socios ===
+class MemberQuerySet(models.QuerySet):
+    def con_estado_pago(self, mes):
+        """
+        Anota ``pagado_mes``: si el socio tiene un pago vigente (pagado y no
+        anulado) en ``mes``.  Es un EXISTS correlacionado que usa el índice
+        parcial ``payment_vigente_mes_idx``; no arma listas de ids en Python.
+        """
+        mes = mes.replace(day=1)
+        return self.annotate(
+            pagado_mes=models.Exists(
+                Payment.objects.filter(
+                    member=models.OuterRef("pk"),
+                    mes=mes,
+                    pagado=True,
+                    anulado=False,
+                )
+            )
+        )
+
+    def deudores(self, mes):
+        """Socios sin pago vigente en ``mes``, en una sola consulta."""
+        return self.con_estado_pago(mes).filter(pagado_mes=False)
+
+
 class Member(models.Model):
     dni = models.CharField(max_length=10, unique=True)
     nombre_apellido = models.CharField(max_length=100)
@@ -16,6 +48,33 @@ class Member(models.Model):
     objetivos = models.TextField(blank=True)
     frecuencia_semana = models.CharField(max_length=50, blank=True)
     fecha_alta = models.DateField(auto_now_add=True)
+    # Última modificación: la exportación de cambios filtra por ella (ver cambios.py).
+    fecha_modificacion = models.DateTimeField(auto_now=True, db_index=True)
+    # Texto normalizado para la búsqueda cuando no hay FTS5 (ver busqueda.py).
+    busqueda = models.TextField(blank=True, default="", editable=False)
+
+    objects = MemberQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Soporta la paginación por cursor del listado de socios.
+            models.Index(fields=["nombre_apellido", "id"], name="member_nombre_id_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .busqueda import texto_busqueda
+
+        self.busqueda = texto_busqueda(self)
+        kwargs["update_fields"] = con_campos(kwargs.get("update_fields"), "busqueda", "fecha_modificacion")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # Los borrados en bloque registran la baja con ``Eliminacion.registrar``.
+        pk, dni = self.pk, self.dni
+        with transaction.atomic(savepoint=False):
+            borrados = super().delete(*args, **kwargs)
+            Eliminacion.objects.create(tabla="socios", objeto_id=pk, clave=dni)
+        return borrados
 
     def __str__(self):
         return self.nombre_apellido
@@ -39,6 +98,7 @@ class Payment(models.Model):
     pagado = models.BooleanField(default=True)
     anulado = models.BooleanField(default=False)  # para “revertir” sin borrar
     fecha_pago = models.DateField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True, db_index=True)
 
     # plan y monto. Opcionales para convivir con el botón rápido.
     plan = models.CharField(max_length=8, choices=PLAN_CHOICES, blank=True, null=True)
@@ -48,6 +108,34 @@ class Payment(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['member', 'mes'], name='unique_payment_mes')
         ]
+        indexes = [
+            # Cada fila (socio, mes) ya es el estado de pago de ese mes; este
+            # índice parcial resuelve "¿pagó en X?" y los deudores de un mes.
+            models.Index(
+                fields=['mes', 'member'],
+                name='payment_vigente_mes_idx',
+                condition=models.Q(pagado=True, anulado=False),
+            ),
+        ]
+
+    # Campos que definen el aporte de un pago a la recaudación.
+    CAMPOS_APORTE = ("mes", "pagado", "anulado", "plan", "monto")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        pago = super().from_db(db, field_names, values)
+        # Aporte con el que el pago está sumado en ResumenRecaudacion; al
+        # guardarlo se descuenta éste y se suma el nuevo (ver signals.py).
+        # Si se cargó con campos diferidos no se conoce.
+        if all(campo in pago.__dict__ for campo in cls.CAMPOS_APORTE):
+            pago._aporte_guardado = pago.aporte_recaudacion()
+        return pago
+
+    def aporte_recaudacion(self):
+        """``(mes, plan, monto)`` si el pago cuenta como cobrado, si no ``None``."""
+        if not self.pagado or self.anulado or self.mes is None:
+            return None
+        return (self.mes.replace(day=1), self.plan or "", self.monto or Decimal("0"))
 
     def save(self, *args, **kwargs):
         # Normalizar SIEMPRE al día 1 para evitar duplicados y facilitar los filtros mensuales
@@ -57,7 +145,19 @@ class Payment(models.Model):
         # Si hay plan y no hay monto manual, setear automático por plan
         if self.plan and not self.monto:
             self.monto = self.PRECIOS.get(self.plan)
-        super().save(*args, **kwargs)
+        kwargs["update_fields"] = con_campos(kwargs.get("update_fields"), "fecha_modificacion")
+        # El resumen de recaudación se actualiza en post_save: misma transacción.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # Solo el borrado de un pago: los de un socio que se borra se van con
+        # su baja, y los borrados en bloque usan ``Eliminacion.registrar``.
+        pk, clave = self.pk, f"{self.member_id}/{self.mes:%Y-%m-%d}"
+        with transaction.atomic(savepoint=False):
+            borrados = super().delete(*args, **kwargs)
+            Eliminacion.objects.create(tabla="pagos", objeto_id=pk, clave=clave)
+        return borrados
 
     def __str__(self):
         if self.mes:
@@ -65,6 +165,121 @@ class Payment(models.Model):
         return f"{self.member} - (sin mes)"
 
 
+class ResumenRecaudacion(models.Model):
+    """
+    Recaudación por mes y plan: cantidad de pagos cobrados (pagados y no
+    anulados) y la suma de sus montos.  Se mantiene en forma incremental
+    (ver ``recaudacion.py``) para que los reportes no recorran los pagos.
+    ``plan`` vacío agrupa los pagos rápidos sin plan.
+    """
+
+    mes = models.DateField()
+    plan = models.CharField(max_length=8, blank=True, default="")
+    cantidad = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["mes", "plan"], name="unique_resumen_mes_plan"),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%m-%Y} {self.plan or '-'}: {self.cantidad} / {self.total}"
+
+
+
+
+class Eliminacion(models.Model):
+    """
+    Socio o pago borrado: la exportación de cambios informa las bajas
+    posteriores a la marca pedida (ver ``cambios.py``).  ``clave`` es el DNI
+    del socio o ``<member_id>/<mes>`` del pago.
+    """
+
+    TABLAS = [
+        ("socios", "Socios"),
+        ("pagos", "Pagos"),
+    ]
+
+    tabla = models.CharField(max_length=10, choices=TABLAS)
+    objeto_id = models.BigIntegerField()
+    clave = models.CharField(max_length=50, blank=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["tabla", "fecha"], name="eliminacion_tabla_fecha_idx"),
+        ]
+
+    @classmethod
+    def registrar(cls, queryset, lote=2000):
+        """
+        Registra la baja de los socios o pagos de ``queryset`` antes de
+        borrarlos en bloque (``QuerySet.delete`` no pasa por ``delete`` del
+        modelo).  Inserta por lotes sin cargar los objetos; devuelve cuántas.
+        """
+        if queryset.model is Member:
+            tabla = "socios"
+            filas = queryset.values_list("id", "dni").iterator(chunk_size=lote)
+        else:
+            tabla = "pagos"
+            filas = (
+                (pk, f"{member_id}/{mes:%Y-%m-%d}")
+                for pk, member_id, mes in queryset.values_list("id", "member_id", "mes").iterator(chunk_size=lote)
+            )
+        total = 0
+        while bloque := [cls(tabla=tabla, objeto_id=pk, clave=clave) for pk, clave in islice(filas, lote)]:
+            cls.objects.bulk_create(bloque)
+            total += len(bloque)
+        return total
+
+    def __str__(self):
+        return f"{self.tabla} {self.objeto_id} ({self.fecha:%d-%m-%Y %H:%M})"
+
+
+# === Tareas en segundo plano ===
+class Tarea(models.Model):
+    """
+    Trabajo pesado (exportación, importación, reconstrucción del resumen)
+    que una vista encola y ejecuta el comando ``procesar_tareas`` fuera del
+    pedido.  ``archivo`` es el resultado descargable, relativo a
+    ``TAREAS_DIR``; ``resultado`` guarda el informe (ver ``tareas.py``).
+    """
+
+    PENDIENTE = "pendiente"
+    EN_CURSO = "en_curso"
+    LISTA = "lista"
+    ERROR = "error"
+    ESTADOS = [
+        (PENDIENTE, "Pendiente"),
+        (EN_CURSO, "En curso"),
+        (LISTA, "Lista"),
+        (ERROR, "Con error"),
+    ]
+
+    tipo = models.CharField(max_length=40)
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=10, choices=ESTADOS, default=PENDIENTE)
+    resultado = models.JSONField(default=dict, blank=True)
+    archivo = models.CharField(max_length=200, blank=True)
+    nombre_archivo = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # El worker busca la pendiente más vieja.
+            models.Index(fields=["estado", "id"], name="tarea_estado_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.get_estado_display()})"
+
+    @property
+    def en_espera(self):
+        return self.estado in (self.PENDIENTE, self.EN_CURSO)
 
 
 # === Rutinas ===
@@ -95,12 +310,49 @@ class Rutina(models.Model):
     # primera semana.
     semana = models.PositiveSmallIntegerField(default=1)
 
+    # Versión restaurada del archivo: la política de retención no la vuelve
+    # a archivar (ver ``retencion.py``).
+    conservar = models.BooleanField(default=False)
+
+    # Filas de la rutina.  Las filas son inmutables y se comparten entre las
+    # versiones de una rutina: una versión nueva solo inserta las filas que
+    # cambiaron (ver ``versionado.py``).
+    detalles = models.ManyToManyField(
+        "DetalleRutina",
+        through="FilaRutina",
+        related_name="rutinas",
+        blank=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Historial de un socio, de la más nueva a la más vieja
+            # (paginación por cursor del portal).
+            models.Index(
+                fields=["member", "-fecha_creacion", "-id"],
+                name="rutina_member_fecha_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Rutina {self.get_estructura_display()} - {self.member.nombre_apellido} ({self.fecha_creacion.date()})"
 
+    def detalles_en_orden(self):
+        """Filas de la rutina en el orden en que se cargaron."""
+        return self.detalles.order_by("filas__orden")
+
 
 class DetalleRutina(models.Model):
-    rutina = models.ForeignKey(Rutina, on_delete=models.CASCADE, related_name="detalles")
+    # Rutina en la que se creó la fila.  Las versiones siguientes la usan a
+    # través de ``FilaRutina``; si esta rutina se borra, la fila sigue viva
+    # mientras otra versión la use.
+    rutina = models.ForeignKey(
+        Rutina,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="detalles_creados",
+    )
     categoria = models.CharField(max_length=100, blank=True)  # Ej: Espalda, Piernas
     ejercicio = models.ForeignKey(Ejercicio, on_delete=models.SET_NULL, null=True, blank=True)
     series = models.CharField(max_length=50, blank=True)
@@ -111,10 +363,47 @@ class DetalleRutina(models.Model):
     sensaciones = models.TextField(blank=True)
     notas = models.TextField(blank=True)
     es_calentamiento = models.BooleanField(default=False)
+    # Hash del contenido: dos filas iguales tienen la misma huella.
+    huella = models.CharField(max_length=40, blank=True, db_index=True, editable=False)
 
     def __str__(self):
         return f"{self.rutina} - {self.ejercicio}"
 
+    def save(self, *args, **kwargs):
+        from .versionado import huella_detalle
+
+        nueva = self._state.adding
+        self.huella = huella_detalle(self)
+        kwargs["update_fields"] = con_campos(kwargs.get("update_fields"), "huella")
+        super().save(*args, **kwargs)
+        # Crear la fila con ``rutina=`` la agrega al final de esa rutina.
+        if nueva and self.rutina_id:
+            ultima = (
+                FilaRutina.objects.filter(rutina_id=self.rutina_id)
+                .aggregate(orden=models.Max("orden"))["orden"]
+            )
+            FilaRutina.objects.create(
+                rutina_id=self.rutina_id,
+                detalle=self,
+                orden=0 if ultima is None else ultima + 1,
+            )
+
+
+class FilaRutina(models.Model):
+    """Posición de una fila (``DetalleRutina``) dentro de una versión de rutina."""
+
+    rutina = models.ForeignKey(Rutina, on_delete=models.CASCADE, related_name="filas")
+    detalle = models.ForeignKey(DetalleRutina, on_delete=models.CASCADE, related_name="filas")
+    orden = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["rutina", "orden"], name="fila_rutina_orden_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.rutina_id} #{self.orden}: {self.detalle_id}"
+
 
 class ComentarioRutina(models.Model):
     rutina = models.OneToOneField(Rutina, on_delete=models.CASCADE, related_name="comentario")
@@ -122,3 +411,30 @@ class ComentarioRutina(models.Model):
 
     def __str__(self):
         return f"Comentario de {self.rutina}"
+
+
+class RutinaArchivada(models.Model):
+    """
+    Versión vieja de una rutina que la política de retención sacó de
+    ``Rutina`` (ver ``retencion.py``).  ``datos`` guarda el comentario y el
+    contenido de cada fila como una lista con los valores de ``campos``; se
+    puede restaurar como una versión más.
+    """
+
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name="rutinas_archivadas")
+    # Id que tenía en ``Rutina``.
+    rutina_original = models.BigIntegerField()
+    estructura = models.CharField(max_length=50, choices=Rutina.ESTRUCTURAS)
+    semana = models.PositiveSmallIntegerField(default=1)
+    fecha_creacion = models.DateTimeField()
+    fecha_archivo = models.DateTimeField(auto_now_add=True)
+    cantidad_filas = models.PositiveIntegerField(default=0)
+    datos = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["member", "fecha_creacion"], name="rutina_archivada_member_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_estructura_display()} de {self.member_id} ({self.fecha_creacion:%d-%m-%Y}, archivada)"
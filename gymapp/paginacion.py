@@ -0,0 +1,136 @@
+"""
+Paginación por cursor (keyset) para los listados grandes.
+
+En lugar de ``OFFSET`` (que obliga a la base a recorrer todas las filas
+anteriores) se recuerda la clave de orden de la última fila mostrada y la
+página siguiente arranca "después" de esa clave.  Con un índice sobre los
+campos de orden el costo de cada página es constante, sin importar cuántas
+filas tenga la tabla.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+def codificar_cursor(valores):
+    """Serializa la clave de orden de una fila en un token apto para URL."""
+    crudo = json.dumps(list(valores), cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Inverso de ``codificar_cursor``.  Un cursor inválido equivale a ``None``."""
+    if not cursor:
+        return None
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode("utf-8"))
+    except (ValueError, TypeError):
+        return None
+    return valores if isinstance(valores, list) else None
+
+
+def tamanio_pagina(request, defecto=None, maximo=None):
+    """
+    Lee ``por_pagina`` del querystring, acotado entre 1 y el máximo
+    configurado (``SOCIOS_POR_PAGINA_MAX``).
+    """
+    defecto = defecto or getattr(settings, "SOCIOS_POR_PAGINA", 50)
+    maximo = maximo or getattr(settings, "SOCIOS_POR_PAGINA_MAX", 200)
+    try:
+        valor = int(request.GET.get("por_pagina", defecto))
+    except (TypeError, ValueError):
+        valor = defecto
+    return max(1, min(valor, maximo))
+
+
+def _filtro_despues_de(campos, valores):
+    """
+    Construye ``(a > va) OR (a = va AND b > vb) OR ...`` respetando el
+    sentido de cada campo ("-campo" ordena descendente).
+    """
+    filtro = Q()
+    for i, campo in enumerate(campos):
+        nombre = campo.lstrip("-")
+        operador = "lt" if campo.startswith("-") else "gt"
+        condicion = Q(**{f"{nombre}__{operador}": valores[i]})
+        for previo, valor_previo in zip(campos[:i], valores[:i]):
+            condicion &= Q(**{previo.lstrip("-"): valor_previo})
+        filtro |= condicion
+    return filtro
+
+
+def paginar_por_claves(queryset, campos, cursor, tamanio):
+    """
+    Devuelve ``(filas, siguiente_cursor)`` para la página que sigue a
+    ``cursor``.  ``campos`` define el orden y tiene que ser único (por eso
+    siempre termina en ``id``).  ``siguiente_cursor`` es ``None`` en la
+    última página.
+    """
+    campos = list(campos)
+    filas = list(_pagina(queryset, campos, cursor, tamanio))
+    return _cortar(filas, campos, tamanio)
+
+
+async def apaginar_por_claves(queryset, campos, cursor, tamanio):
+    """``paginar_por_claves`` con el ORM async, para las vistas async."""
+    campos = list(campos)
+    filas = [fila async for fila in _pagina(queryset, campos, cursor, tamanio)]
+    return _cortar(filas, campos, tamanio)
+
+
+def _valores_cursor(modelo, campos, cursor):
+    """
+    Valores del cursor convertidos al tipo de cada campo de orden.  Un cursor
+    que no corresponde a ``campos`` (adulterado o de otro listado) equivale a
+    ``None``: se vuelve a la primera página.
+    """
+    valores = decodificar_cursor(cursor)
+    if valores is None or len(valores) != len(campos):
+        return None
+    convertidos = []
+    try:
+        for campo, valor in zip(campos, valores):
+            # Los campos de orden no admiten NULL (``_filtro_despues_de`` no
+            # sabría compararlo) y un valor JSON compuesto nunca es una clave.
+            if valor is None or isinstance(valor, (list, dict)):
+                return None
+            *relaciones, nombre = campo.lstrip("-").split("__")
+            opciones = modelo._meta
+            for relacion in relaciones:
+                opciones = opciones.get_field(relacion).related_model._meta
+            convertidos.append(opciones.get_field(nombre).to_python(valor))
+    except (ValueError, TypeError, ValidationError):
+        return None
+    return convertidos
+
+
+def _pagina(queryset, campos, cursor, tamanio):
+    queryset = queryset.order_by(*campos)
+    valores = _valores_cursor(queryset.model, campos, cursor)
+    if valores is not None:
+        queryset = queryset.filter(_filtro_despues_de(campos, valores))
+    # Pedimos una fila de más para saber si hay página siguiente sin COUNT(*).
+    return queryset[: tamanio + 1]
+
+
+def _cortar(filas, campos, tamanio):
+    siguiente = None
+    if len(filas) > tamanio:
+        filas = filas[:tamanio]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(getattr(ultima, c.lstrip("-")) for c in campos)
+    return filas, siguiente
+
+
+def url_siguiente(request, cursor):
+    """URL de la página siguiente conservando el resto del querystring."""
+    if not cursor:
+        return ""
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    return f"{request.path}?{params.urlencode()}"
@@ -0,0 +1,153 @@
+"""
+Matriz de pagos: socios × meses.
+
+En lugar de recorrer mes por mes cada socio (como ``historial_pagos``), se
+traen en una sola consulta los pagos de una página de socios dentro del
+rango pedido y la grilla se arma por índice de mes: cada fila empieza
+"llena" (sin cargo antes del alta y después del mes actual, debe en el
+resto) y solo se pisan las posiciones que tienen un pago.
+
+Cada fila se devuelve como un texto con un código por mes (ver ``CODIGOS``),
+que es compacto para enviar la grilla de todo el gimnasio.
+
+``marcar_pagos`` marca o desmarca un mes para muchos socios a la vez con un
+único upsert (``INSERT ... ON CONFLICT (member, mes) DO UPDATE``).
+"""
+from datetime import date, datetime
+
+from .models import Payment
+from .recaudacion import aplicar_cambios, diferencias
+
+# Campos que pisa el upsert según la acción.
+CAMPOS_MARCAR = ["pagado", "anulado", "fecha_modificacion"]
+CAMPOS_MARCAR_CON_PLAN = CAMPOS_MARCAR + ["plan", "monto"]
+CAMPOS_DESMARCAR = ["pagado", "fecha_modificacion"]
+
+PAGADO = "P"
+ANULADO = "A"
+DEBE = "D"
+SIN_CARGO = "-"
+
+CODIGOS = {
+    PAGADO: "pagado",
+    ANULADO: "anulado",
+    DEBE: "debe",
+    SIN_CARGO: "sin cargo",
+}
+
+
+def indice_mes(fecha):
+    """Número de mes absoluto (año * 12 + mes - 1)."""
+    return fecha.year * 12 + fecha.month - 1
+
+
+def mes_de_indice(indice):
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def leer_mes(texto):
+    """Interpreta ``MM-YYYY`` (como el historial) o ``YYYY-MM``; ``None`` si no se puede."""
+    for formato in ("%m-%Y", "%Y-%m"):
+        try:
+            return datetime.strptime(texto or "", formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def rango_meses(desde, hasta, maximo, hoy=None):
+    """
+    Lista de meses (día 1) entre ``desde`` y ``hasta`` inclusive.  Sin
+    ``hasta`` termina en el mes actual; sin ``desde`` abarca 12 meses.  El
+    rango se recorta a los ``maximo`` meses finales.
+    """
+    hoy = (hoy or date.today()).replace(day=1)
+    fin = indice_mes(hasta or hoy)
+    inicio = indice_mes(desde) if desde else fin - 11
+    if inicio > fin:
+        inicio, fin = fin, inicio
+    inicio = max(inicio, fin - maximo + 1)
+    return [mes_de_indice(i) for i in range(inicio, fin + 1)]
+
+
+def matriz_pagos(socios, meses, hoy=None):
+    """
+    Devuelve ``{socio.id: "PPD-..."}`` para ``socios`` (con ``fecha_alta``)
+    y ``meses`` consecutivos, con una sola consulta de pagos.
+    """
+    if not socios or not meses:
+        return {}
+    hoy = (hoy or date.today()).replace(day=1)
+    primero = indice_mes(meses[0])
+    cantidad = len(meses)
+    # Meses posteriores al actual: no se deben todavía.
+    hasta_hoy = max(0, min(cantidad, indice_mes(hoy) - primero + 1))
+
+    filas = {}
+    for socio in socios:
+        alta = min(max(0, indice_mes(socio.fecha_alta) - primero), hasta_hoy)
+        fila = bytearray(SIN_CARGO * cantidad, "ascii")
+        fila[alta:hasta_hoy] = DEBE.encode("ascii") * (hasta_hoy - alta)
+        filas[socio.id] = fila
+
+    pagos = Payment.objects.filter(
+        member_id__in=list(filas),
+        mes__gte=meses[0],
+        mes__lte=meses[-1],
+    ).values_list("member_id", "mes", "pagado", "anulado")
+    for member_id, mes, pagado, anulado in pagos.iterator():
+        if anulado:
+            codigo = ANULADO
+        elif pagado:
+            codigo = PAGADO
+        else:
+            codigo = DEBE
+        filas[member_id][indice_mes(mes) - primero] = ord(codigo)
+
+    return {member_id: fila.decode("ascii") for member_id, fila in filas.items()}
+
+
+def marcar_pagos(member_ids, mes, pagado=True, plan=None):
+    """
+    Deja ``pagado`` en el pago de ``mes`` de cada socio, creándolo si no
+    existe.  Marcar registra un pago vigente (des-anula) y, con ``plan``,
+    fija plan y monto; desmarcar solo cambia ``pagado``, como el botón
+    rápido.  Devuelve los pagos resultantes.
+
+    ``bulk_create`` no pasa por ``Payment.save()`` ni por sus señales: el mes
+    y el monto se normalizan acá, el resumen de recaudación se actualiza con
+    la diferencia entre los pagos previos y los nuevos.  Hay que llamarla
+    dentro de una transacción.
+    """
+    mes = mes.replace(day=1)
+    anteriores = [
+        pago.aporte_recaudacion()
+        for pago in Payment.objects.filter(member_id__in=member_ids, mes=mes)
+    ]
+    if not pagado:
+        campos = CAMPOS_DESMARCAR
+    elif plan:
+        campos = CAMPOS_MARCAR_CON_PLAN
+    else:
+        campos = CAMPOS_MARCAR
+    monto = Payment.PRECIOS.get(plan) if pagado and plan else None
+    Payment.objects.bulk_create(
+        [
+            Payment(
+                member_id=member_id,
+                mes=mes,
+                pagado=pagado,
+                anulado=False,
+                plan=plan if pagado else None,
+                monto=monto,
+            )
+            for member_id in member_ids
+        ],
+        update_conflicts=True,
+        unique_fields=["member", "mes"],
+        update_fields=campos,
+    )
+    # SQLite no devuelve las filas del upsert: se releen en una consulta.
+    pagos = list(Payment.objects.filter(member_id__in=member_ids, mes=mes).order_by("member_id"))
+    aplicar_cambios(diferencias(anteriores, [pago.aporte_recaudacion() for pago in pagos]))
+    return pagos
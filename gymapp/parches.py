@@ -0,0 +1,161 @@
+"""
+Guardado parcial de rutinas: el editor manda solo las filas que cambiaron.
+
+Las operaciones se aplican sobre una versión base, que no cambia (ver
+``versionado.py``), así que sus filas se identifican por posición (``pos``,
+desde 0; el editor la recibe en cada fila):
+
+* ``{"op": "add", "despues_de": <pos>, "fila": {...}}``: fila nueva;
+  ``despues_de`` -1 la pone al principio y sin él va al final;
+* ``{"op": "update", "pos": <pos>, "fila": {...}}``: solo los campos que
+  cambian, el resto se toma de la fila de la base;
+* ``{"op": "remove", "pos": <pos>}``.
+
+Se leen y validan solo las filas de las operaciones; de la base alcanza con
+los ids de sus filas, en orden.  La versión nueva reutiliza esos ids y las
+filas cambiadas pasan por la deduplicación por huella.  Si alguna operación
+tiene errores no se guarda nada y se informan todos, con el índice de la
+operación.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .estructuras import estructura
+from .forms import DetalleRutinaPayloadForm, contenido_payload, payload_detalle
+from .models import ComentarioRutina, DetalleRutina, Ejercicio, FilaRutina, Rutina
+from .versionado import huella_detalle, ids_por_huella
+
+OPERACIONES = ("add", "update", "remove")
+
+
+class ErrorParche(ValueError):
+    """El pedido no se puede interpretar (no es un error de una fila)."""
+
+
+def _posicion(valor, minimo, maximo):
+    return isinstance(valor, int) and not isinstance(valor, bool) and minimo <= valor < maximo
+
+
+def aplicar_parche(base, ops, semana=None):
+    """
+    Crea la versión de ``base`` con las operaciones ``ops``.  Devuelve
+    ``(rutina nueva, filas insertadas, [])`` o ``(None, 0, errores)``; cada
+    error es ``{"op": <índice>, "mensaje": ..., "campos": {...}}``.  Sin
+    operaciones ni cambio de semana no crea nada y devuelve ``base``.
+    """
+    if not isinstance(ops, list):
+        raise ErrorParche("ops: se esperaba una lista de operaciones.")
+    if not ops and semana in (None, base.semana):
+        return base, 0, []
+    if len(ops) > DetalleRutinaPayloadForm.MAX_FILAS:
+        raise ErrorParche(f"Se aceptan hasta {DetalleRutinaPayloadForm.MAX_FILAS} operaciones por pedido.")
+
+    ids_base = list(base.filas.order_by("orden").values_list("detalle_id", flat=True))
+    errores = []
+    agregadas = defaultdict(list)  # despues_de -> [(índice, fila)]
+    cambios = {}                   # pos -> (índice, fila) o None si se borra
+    tocadas = {}                   # pos -> índice de la operación
+    for indice, op in enumerate(ops):
+        tipo = op.get("op") if isinstance(op, dict) else None
+        if tipo not in OPERACIONES:
+            errores.append({"op": indice, "mensaje": "op: se esperaba add, update o remove."})
+            continue
+        fila = op.get("fila")
+        if tipo != "remove" and not isinstance(fila, dict):
+            errores.append({"op": indice, "mensaje": "fila: se esperaba un objeto con los campos."})
+            continue
+        if tipo == "add":
+            despues_de = op.get("despues_de", len(ids_base) - 1)
+            if despues_de is None:
+                despues_de = len(ids_base) - 1
+            if not _posicion(despues_de, -1, len(ids_base)):
+                errores.append({"op": indice, "mensaje": f"despues_de: posición inválida ({despues_de!r})."})
+                continue
+            agregadas[despues_de].append((indice, fila))
+            continue
+        pos = op.get("pos")
+        if not _posicion(pos, 0, len(ids_base)):
+            errores.append({"op": indice, "mensaje": f"pos: posición inválida ({pos!r})."})
+        elif pos in tocadas:
+            errores.append({"op": indice, "mensaje": f"pos: la fila {pos} ya cambia en la operación {tocadas[pos]}."})
+        else:
+            tocadas[pos] = indice
+            cambios[pos] = (indice, fila) if tipo == "update" else None
+
+    # Solo se leen las filas de la base que se actualizan.
+    previas = DetalleRutina.objects.in_bulk(
+        {ids_base[pos] for pos, cambio in cambios.items() if cambio}
+    )
+    a_validar = [item for items in agregadas.values() for item in items]
+    for pos, cambio in cambios.items():
+        if cambio:
+            indice, fila = cambio
+            a_validar.append((indice, {**payload_detalle(previas[ids_base[pos]]), **fila}))
+    contenidos = _validar(a_validar, estructura(base.estructura), errores)
+
+    borradas = sum(1 for cambio in cambios.values() if cambio is None)
+    total = len(ids_base) - borradas + sum(len(items) for items in agregadas.values())
+    if total > DetalleRutinaPayloadForm.MAX_FILAS:
+        errores.append({
+            "op": None,
+            "mensaje": f"Se excedió el máximo de {DetalleRutinaPayloadForm.MAX_FILAS} filas permitidas.",
+        })
+    if errores:
+        return None, 0, sorted(errores, key=lambda error: -1 if error["op"] is None else error["op"])
+
+    # Orden final: ids de la base o huellas de las filas nuevas/cambiadas.
+    secuencia = [huella_detalle(contenidos[indice]) for indice, _ in agregadas[-1]]
+    for pos, detalle_id in enumerate(ids_base):
+        if pos not in cambios:
+            secuencia.append(detalle_id)
+        elif cambios[pos]:
+            secuencia.append(huella_detalle(contenidos[cambios[pos][0]]))
+        secuencia.extend(huella_detalle(contenidos[indice]) for indice, _ in agregadas[pos])
+
+    with transaction.atomic():
+        nueva = Rutina.objects.create(
+            member_id=base.member_id,
+            estructura=base.estructura,
+            semana=semana or base.semana or 1,
+        )
+        ids, insertadas = ids_por_huella({
+            huella_detalle(contenido): (nueva, contenido) for contenido in contenidos.values()
+        })
+        FilaRutina.objects.bulk_create([
+            FilaRutina(rutina=nueva, detalle_id=ids.get(item, item), orden=orden)
+            for orden, item in enumerate(secuencia)
+        ])
+        comentario = getattr(base, "comentario", None)
+        if comentario and comentario.texto:
+            ComentarioRutina.objects.create(rutina=nueva, texto=comentario.texto)
+    return nueva, insertadas, []
+
+
+def _validar(filas, editor, errores):
+    """``{índice: contenido}`` de las filas válidas; agrega a ``errores`` las demás."""
+    ids = set()
+    for _, fila in filas:
+        for clave in ("ejercicio_id", "ejercicio"):
+            try:
+                ids.add(int(fila.get(clave)))
+            except (TypeError, ValueError):
+                pass
+    validos = set(Ejercicio.objects.filter(id__in=ids).values_list("id", flat=True)) if ids else set()
+
+    contenidos = {}
+    for indice, fila in filas:
+        form = DetalleRutinaPayloadForm(fila, ejercicios_validos=validos)
+        if not form.is_valid():
+            errores.append({
+                "op": indice,
+                "mensaje": " | ".join(m for mensajes in form.errors.values() for m in mensajes),
+                "campos": {campo: list(mensajes) for campo, mensajes in form.errors.items()},
+            })
+            continue
+        contenido = contenido_payload(form.cleaned_data, editor.etiqueta(form.cleaned_data.get("bloque")))
+        if not any(contenido.values()):
+            errores.append({"op": indice, "mensaje": "La fila quedaría vacía; para sacarla usá remove."})
+            continue
+        contenidos[indice] = contenido
+    return contenidos
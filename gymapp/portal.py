@@ -0,0 +1,98 @@
+"""
+Acceso al portal del cliente sin sesiones en la base.
+
+Al ingresar con su DNI el socio recibe una cookie firmada
+(``TimestampSigner``) con su id; cada pedido al portal la verifica con la
+``SECRET_KEY`` y su antigüedad, sin consultar la base ni escribir en
+``django_session``.  El personal sigue usando las sesiones normales de
+Django: un usuario ``is_staff`` puede ver el portal de cualquier socio.
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+COOKIE = "portal_cliente"
+SALT = "gymapp.portal.cliente"
+
+
+def _firmador():
+    return signing.TimestampSigner(salt=SALT)
+
+
+def firmar(member):
+    """Valor de la cookie del portal para ``member``."""
+    return _firmador().sign(str(member.pk))
+
+
+def iniciar_portal(response, member):
+    """Deja en ``response`` la cookie del portal para ``member``."""
+    response.set_cookie(
+        COOKIE,
+        firmar(member),
+        max_age=settings.PORTAL_CLIENTE_DURACION,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite="Lax",
+    )
+    return response
+
+
+def cerrar_portal(response):
+    response.delete_cookie(COOKIE, samesite="Lax")
+    return response
+
+
+def cliente_del_pedido(request):
+    """Id del socio de la cookie del portal, o ``None`` si falta, es inválida o venció."""
+    valor = request.COOKIES.get(COOKIE)
+    if not valor:
+        return None
+    try:
+        return int(_firmador().unsign(valor, max_age=settings.PORTAL_CLIENTE_DURACION))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def es_personal(request):
+    user = getattr(request, "user", None)
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+async def aes_personal(request):
+    # ``request.user`` puede cargar la sesión y el usuario desde la base.
+    return await sync_to_async(es_personal)(request)
+
+
+def _rechazo(request):
+    if request.headers.get("x-requested-with") == "XMLHttpRequest":
+        return JsonResponse({"error": "Ingresá con tu DNI."}, status=403)
+    return redirect("login_cliente")
+
+
+def acceso_portal(vista):
+    """
+    Solo el socio ``member_id`` (con su cookie) o el personal.  El resto va
+    al ingreso; los pedidos AJAX reciben 403.  Sirve para vistas sync y async.
+    """
+    # La cookie se verifica primero: el cliente no dispara la carga de la
+    # sesión (ni una consulta) que implica mirar ``request.user``.
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envuelta_async(request, member_id, *args, **kwargs):
+            if cliente_del_pedido(request) != member_id and not await aes_personal(request):
+                return _rechazo(request)
+            return await vista(request, member_id, *args, **kwargs)
+
+        return envuelta_async
+
+    @wraps(vista)
+    def envuelta(request, member_id, *args, **kwargs):
+        if cliente_del_pedido(request) != member_id and not es_personal(request):
+            return _rechazo(request)
+        return vista(request, member_id, *args, **kwargs)
+
+    return envuelta
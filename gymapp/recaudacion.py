@@ -0,0 +1,128 @@
+"""
+Resumen de recaudación por mes y plan, mantenido en forma incremental.
+
+Cada pago cobrado (pagado y no anulado) aporta ``(mes, plan, monto)`` a una
+fila de ``ResumenRecaudacion``.  Cuando un pago cambia se aplica la
+diferencia entre su aporte anterior y el nuevo con un único upsert
+(``INSERT ... ON CONFLICT DO UPDATE SET cantidad = cantidad + ...``), así
+los reportes leen unas decenas de filas en lugar de todo el historial.
+
+Caminos que actualizan el resumen:
+
+* ``Payment.save()``: la señal ``post_save`` (ver ``signals.py``);
+* los borrados de pagos, también los que arrastra la baja de un socio: la
+  señal ``post_delete``, un upsert por pago cobrado;
+* ``pagos.marcar_pagos`` (upsert en bloque, no dispara señales).
+
+Las cargas masivas que no pasan por ahí (``sembrar_datos``) terminan con
+``reconstruir_resumenes``, que también usa el comando
+``reconstruir_recaudacion`` para corregir cualquier desvío.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import Payment, ResumenRecaudacion
+
+
+def diferencias(anteriores, nuevos):
+    """
+    Acumula ``{(mes, plan): [cantidad, total]}`` restando los aportes
+    ``anteriores`` y sumando los ``nuevos`` (``None`` no aporta).
+    """
+    cambios = defaultdict(lambda: [0, Decimal("0")])
+    for signo, aportes in ((-1, anteriores), (1, nuevos)):
+        for aporte in aportes:
+            if aporte is None:
+                continue
+            mes, plan, monto = aporte
+            cambio = cambios[(mes, plan)]
+            cambio[0] += signo
+            cambio[1] += signo * monto
+    return cambios
+
+
+def aplicar_cambios(cambios):
+    """Suma ``cambios`` al resumen con una sola consulta (ninguna si no hay)."""
+    ops = connection.ops
+    filas = [
+        (ops.adapt_datefield_value(mes), plan, cantidad, ops.adapt_decimalfield_value(total))
+        for (mes, plan), (cantidad, total) in cambios.items()
+        if cantidad or total
+    ]
+    if not filas:
+        return
+    tabla = ops.quote_name(ResumenRecaudacion._meta.db_table)
+    valores = ", ".join(["(%s, %s, %s, %s)"] * len(filas))
+    sql = (
+        f"INSERT INTO {tabla} (mes, plan, cantidad, total) VALUES {valores} "
+        "ON CONFLICT (mes, plan) DO UPDATE SET "
+        f"cantidad = {tabla}.cantidad + excluded.cantidad, total = {tabla}.total + excluded.total"
+    )
+    params = [valor for fila in filas for valor in fila]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def registrar_cambio(pago, anterior):
+    """Aplica el cambio de un pago guardado cuyo aporte previo era ``anterior``."""
+    aplicar_cambios(diferencias([anterior], [pago.aporte_recaudacion()]))
+
+
+def recalcular_mes(mes):
+    """Recalcula desde los pagos las filas de ``mes`` (cuando no se conoce el aporte previo)."""
+    mes = mes.replace(day=1)
+    with transaction.atomic():
+        ResumenRecaudacion.objects.filter(mes=mes).delete()
+        ResumenRecaudacion.objects.bulk_create(_resumir(Payment.objects.filter(mes=mes)))
+
+
+def registrar_baja(aporte):
+    """Descuenta del resumen el ``aporte`` de un pago borrado."""
+    aplicar_cambios(diferencias([aporte], []))
+
+
+def reconstruir_resumenes():
+    """Rehace el resumen completo desde los pagos.  Devuelve la cantidad de filas."""
+    with transaction.atomic():
+        ResumenRecaudacion.objects.all().delete()
+        filas = ResumenRecaudacion.objects.bulk_create(_resumir(Payment.objects.all()))
+    return len(filas)
+
+
+def _resumir(pagos):
+    agregados = (
+        pagos.filter(pagado=True, anulado=False)
+        .order_by()
+        .values("mes", "plan")
+        .annotate(cantidad=Count("id"), total=Sum("monto"))
+    )
+    # Los pagos sin plan (NULL) y con plan "" se agrupan juntos.
+    acumulado = defaultdict(lambda: [0, Decimal("0")])
+    for fila in agregados:
+        clave = (fila["mes"].replace(day=1), fila["plan"] or "")
+        acumulado[clave][0] += fila["cantidad"]
+        acumulado[clave][1] += fila["total"] or Decimal("0")
+    return [
+        ResumenRecaudacion(mes=mes, plan=plan, cantidad=cantidad, total=total)
+        for (mes, plan), (cantidad, total) in acumulado.items()
+    ]
+
+
+def resumen_por_mes(meses):
+    """
+    Filas del reporte para ``meses``: ``[{"mes", "planes": {plan: (cantidad,
+    total)}, "cantidad", "total"}]``, en orden, con una sola consulta.
+    """
+    por_mes = {mes: {"mes": mes, "planes": {}, "cantidad": 0, "total": Decimal("0")} for mes in meses}
+    filas = ResumenRecaudacion.objects.filter(
+        mes__gte=meses[0], mes__lte=meses[-1], cantidad__gt=0,
+    ).values_list("mes", "plan", "cantidad", "total")
+    for mes, plan, cantidad, total in filas:
+        fila = por_mes[mes]
+        fila["planes"][plan] = (cantidad, total)
+        fila["cantidad"] += cantidad
+        fila["total"] += total
+    return [por_mes[mes] for mes in meses]
@@ -0,0 +1,118 @@
+"""
+Retención de versiones viejas de rutinas.
+
+Cada guardado del editor crea una ``Rutina`` nueva (ver ``versionado.py``),
+así que los socios de hace años acumulan cientos de versiones, muchas casi
+iguales y guardadas con minutos de diferencia.  La política es:
+
+* se conservan todas las versiones de los últimos ``RUTINAS_RETENCION_DIAS``;
+* de las anteriores queda una por socio, estructura, semana y mes (la última
+  del mes), así que la última versión de cada socio nunca se archiva;
+* las versiones restauradas (``conservar``) no se vuelven a archivar.
+
+Las demás pasan a ``RutinaArchivada``: una fila por versión con el contenido
+de sus filas en JSON, sin ``FilaRutina`` ni ``DetalleRutina`` propias.  Se
+archiva en lotes (comando ``compactar_rutinas``) y una versión archivada se
+puede restaurar con ``restaurar``.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ComentarioRutina, Ejercicio, FilaRutina, Rutina, RutinaArchivada
+from .versionado import CAMPOS_CONTENIDO, borrar_filas_huerfanas, guardar_filas
+
+
+def versiones_a_archivar(dias=None, ahora=None, member_id=None):
+    """Ids de las rutinas que la política saca del historial, de la más nueva a la más vieja."""
+    dias = settings.RUTINAS_RETENCION_DIAS if dias is None else dias
+    limite = (ahora or timezone.now()) - timedelta(days=dias)
+    rutinas = Rutina.objects.filter(fecha_creacion__lt=limite, conservar=False)
+    if member_id is not None:
+        rutinas = rutinas.filter(member_id=member_id)
+    vistas = set()
+    ids = []
+    for rutina_id, member, estructura, semana, fecha in (
+        rutinas.order_by("member_id", "-fecha_creacion", "-id")
+        .values_list("id", "member_id", "estructura", "semana", "fecha_creacion")
+        .iterator(chunk_size=2000)
+    ):
+        fecha = timezone.localtime(fecha)
+        grupo = (member, estructura, semana, fecha.year, fecha.month)
+        if grupo in vistas:
+            ids.append(rutina_id)
+        else:
+            vistas.add(grupo)
+    return ids
+
+
+def archivar(ids):
+    """
+    Pasa las rutinas ``ids`` a ``RutinaArchivada`` y borra las filas que
+    quedan sin usar.  Las consultas no dependen de la cantidad de rutinas;
+    quien llama corta en lotes.  Devuelve ``(archivadas, filas borradas)``.
+    """
+    with transaction.atomic():
+        rutinas = list(Rutina.objects.filter(id__in=ids).select_related("comentario"))
+        filas = defaultdict(list)
+        for rutina_id, *valores in (
+            FilaRutina.objects.filter(rutina_id__in=ids)
+            .order_by("rutina_id", "orden")
+            .values_list("rutina_id", *(f"detalle__{campo}" for campo in CAMPOS_CONTENIDO))
+        ):
+            filas[rutina_id].append(valores)
+        RutinaArchivada.objects.bulk_create([
+            RutinaArchivada(
+                member_id=rutina.member_id,
+                rutina_original=rutina.id,
+                estructura=rutina.estructura,
+                semana=rutina.semana,
+                fecha_creacion=rutina.fecha_creacion,
+                cantidad_filas=len(filas[rutina.id]),
+                datos={
+                    "campos": list(CAMPOS_CONTENIDO),
+                    "filas": filas[rutina.id],
+                    "comentario": getattr(getattr(rutina, "comentario", None), "texto", ""),
+                },
+            )
+            for rutina in rutinas
+        ])
+        Rutina.objects.filter(id__in=[rutina.id for rutina in rutinas]).delete()
+        borradas = borrar_filas_huerfanas()
+    return len(rutinas), borradas
+
+
+def restaurar(archivada):
+    """
+    Vuelve a crear la versión ``archivada`` como ``Rutina``, con su fecha
+    original, y la saca del archivo.  Queda marcada para que la próxima
+    compactación no la vuelva a archivar.  Los ejercicios que ya no existen
+    quedan vacíos, como con cualquier rutina.  Devuelve la rutina creada.
+    """
+    campos = archivada.datos.get("campos", CAMPOS_CONTENIDO)
+    filas = [dict(zip(campos, valores)) for valores in archivada.datos.get("filas", [])]
+    existentes = set(Ejercicio.objects.filter(
+        id__in={fila["ejercicio_id"] for fila in filas if fila.get("ejercicio_id")}
+    ).values_list("id", flat=True))
+    for fila in filas:
+        if fila.get("ejercicio_id") not in existentes:
+            fila["ejercicio_id"] = None
+
+    with transaction.atomic():
+        rutina = Rutina.objects.create(
+            member_id=archivada.member_id,
+            estructura=archivada.estructura,
+            semana=archivada.semana,
+            conservar=True,
+        )
+        # ``fecha_creacion`` es auto_now_add: se corrige después de crearla.
+        Rutina.objects.filter(pk=rutina.pk).update(fecha_creacion=archivada.fecha_creacion)
+        rutina.fecha_creacion = archivada.fecha_creacion
+        guardar_filas(rutina, filas)
+        if archivada.datos.get("comentario"):
+            ComentarioRutina.objects.create(rutina=rutina, texto=archivada.datos["comentario"])
+        archivada.delete()
+    return rutina
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalogo import invalidar_catalogo
+from .fragmentos import invalidar_socios
+from .models import Ejercicio, Member, Payment
+from .recaudacion import recalcular_mes, registrar_baja, registrar_cambio
+
+
+@receiver([post_save, post_delete], sender=Ejercicio)
+def ejercicio_modificado(sender, **kwargs):
+    # Cualquier alta, cambio o baja genera una nueva versión del catálogo.
+    # Al confirmar: antes, otro pedido podría cachear el catálogo viejo
+    # bajo la versión nueva.
+    transaction.on_commit(invalidar_catalogo)
+
+
+
+@receiver([post_save, post_delete], sender=Member)
+def socio_modificado(sender, instance, **kwargs):
+    # También al crear: un id reutilizado no puede heredar filas cacheadas.
+    # Al confirmar, como todas las invalidaciones (ver ``fragmentos.py``).
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidar_socios([pk]))
+
+
+@receiver(post_save, sender=Payment)
+def pago_guardado(sender, instance, created, **kwargs):
+    # Las filas cacheadas de socios no incluyen el estado de pago (ver
+    # ``fragmentos.py``): un pago no las invalida.
+    if created:
+        anterior = None
+    elif hasattr(instance, "_aporte_guardado"):
+        anterior = instance._aporte_guardado
+    else:
+        # No se sabe con qué aporte estaba sumado: se recalcula su mes.
+        recalcular_mes(instance.mes)
+        instance._aporte_guardado = instance.aporte_recaudacion()
+        return
+    registrar_cambio(instance, anterior)
+    instance._aporte_guardado = instance.aporte_recaudacion()
+
+
+@receiver(post_delete, sender=Payment)
+def pago_borrado(sender, instance, **kwargs):
+    # También los pagos que se borran en cascada con su socio: con este
+    # receptor Django ya no los borra "rápido" sino cargándolos primero.
+    if hasattr(instance, "_aporte_guardado"):
+        registrar_baja(instance._aporte_guardado)
+    else:
+        # Cargado con campos diferidos: el mes ya no tiene este pago.
+        recalcular_mes(instance.mes)
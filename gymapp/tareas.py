@@ -0,0 +1,192 @@
+"""
+Tareas en segundo plano sin broker: la cola es la tabla ``Tarea``.
+
+Una vista encola (``encolar``) y responde enseguida con el id de la tarea;
+el comando ``procesar_tareas`` (uno o varios procesos, cada uno con sus
+hilos) toma las pendientes y las ejecuta.  El estado y la descarga del
+resultado se consultan en ``/tareas/<id>/``.
+
+Para tomar una tarea sin que dos workers ejecuten la misma alcanza con un
+``UPDATE ... WHERE estado = 'pendiente'``: solo uno cambia la fila, el otro
+ve 0 filas actualizadas y prueba con la siguiente.  No hace falta
+``SELECT ... FOR UPDATE`` (que SQLite no tiene).
+
+Cada tipo de tarea es una función registrada con ``@tipo_tarea(nombre)``
+que recibe la ``Tarea`` y sus parámetros y devuelve el informe (un dict
+serializable); si genera un archivo lo escribe en ``ruta_resultado``.
+"""
+import csv
+import logging
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .exportacion import FORMATOS as FORMATOS_EXPORTACION
+from .exportacion import encabezados_socios, escribir_xlsx, filas_socios, generar_csv
+from .importacion import importar_socios as importar, leer_filas
+from .models import Tarea
+from .recaudacion import reconstruir_resumenes
+
+logger = logging.getLogger("gym.tareas")
+
+TIPOS = {}
+
+
+def tipo_tarea(nombre):
+    """Registra la función que ejecuta las tareas de tipo ``nombre``."""
+    def registrar(funcion):
+        TIPOS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+def directorio(*partes):
+    ruta = Path(settings.TAREAS_DIR).joinpath(*partes)
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def encolar(tipo, **parametros):
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo!r}")
+    return Tarea.objects.create(tipo=tipo, parametros=parametros)
+
+
+def guardar_entrada(archivo):
+    """Copia un archivo subido a ``TAREAS_DIR/entrada`` y devuelve su ruta."""
+    ruta = directorio("entrada") / f"{uuid.uuid4().hex}-{Path(archivo.name).name}"
+    with ruta.open("wb") as destino:
+        for bloque in archivo.chunks():
+            destino.write(bloque)
+    return ruta
+
+
+def ruta_resultado(tarea, nombre):
+    """Ruta donde la tarea escribe su archivo, que se descarga como ``nombre``."""
+    tarea.archivo = f"{tarea.pk}-{nombre}"
+    tarea.nombre_archivo = nombre
+    return directorio() / tarea.archivo
+
+
+def archivo_resultado(tarea):
+    """Ruta del archivo de una tarea terminada (puede ya no existir)."""
+    return Path(settings.TAREAS_DIR) / tarea.archivo
+
+
+def tomar():
+    """Reserva la pendiente más vieja y la devuelve, o ``None`` si no hay."""
+    while True:
+        pk = (
+            Tarea.objects.filter(estado=Tarea.PENDIENTE)
+            .order_by("id").values_list("id", flat=True).first()
+        )
+        if pk is None:
+            return None
+        tomada = Tarea.objects.filter(pk=pk, estado=Tarea.PENDIENTE).update(
+            estado=Tarea.EN_CURSO, iniciada=timezone.now(),
+        )
+        if tomada:
+            return Tarea.objects.get(pk=pk)
+        # Otro worker la tomó entre la lectura y el UPDATE.
+
+
+def ejecutar(tarea):
+    """Ejecuta una tarea ya tomada y guarda cómo terminó."""
+    try:
+        funcion = TIPOS.get(tarea.tipo)
+        if funcion is None:
+            raise ValueError(f"Tipo de tarea desconocido: {tarea.tipo!r}")
+        tarea.resultado = funcion(tarea, **tarea.parametros) or {}
+        tarea.estado = Tarea.LISTA
+    except Exception as error:
+        logger.exception("Falló la tarea %s", tarea)
+        tarea.estado = Tarea.ERROR
+        tarea.error = str(error) or type(error).__name__
+    tarea.terminada = timezone.now()
+    tarea.save(update_fields=["estado", "resultado", "archivo", "nombre_archivo", "error", "terminada"])
+    return tarea
+
+
+def recuperar_colgadas(ahora=None):
+    """
+    Vuelve a encolar las tareas en curso desde hace más de
+    ``TAREAS_TIEMPO_MAXIMO`` segundos: su worker se cortó.  Los tipos de
+    tarea son idempotentes (la importación es un upsert, la reconstrucción
+    rehace el resumen), así que repetirlas no hace daño.
+    """
+    ahora = ahora or timezone.now()
+    return Tarea.objects.filter(
+        estado=Tarea.EN_CURSO,
+        iniciada__lt=ahora - timedelta(seconds=settings.TAREAS_TIEMPO_MAXIMO),
+    ).update(estado=Tarea.PENDIENTE, iniciada=None)
+
+
+def limpiar_terminadas(ahora=None):
+    """Borra las tareas terminadas hace más de ``TAREAS_RETENCION_DIAS`` y sus archivos."""
+    ahora = ahora or timezone.now()
+    viejas = Tarea.objects.filter(
+        estado__in=[Tarea.LISTA, Tarea.ERROR],
+        terminada__lt=ahora - timedelta(days=settings.TAREAS_RETENCION_DIAS),
+    )
+    for tarea in viejas.exclude(archivo="").only("archivo"):
+        archivo_resultado(tarea).unlink(missing_ok=True)
+    return viejas.delete()[0]
+
+
+# --- Tipos de tarea ---
+
+@tipo_tarea("exportar_socios")
+def exportar_socios(tarea, formato="xlsx"):
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato desconocido: {formato!r}")
+    ruta = ruta_resultado(tarea, FORMATOS_EXPORTACION[formato][1])
+    cantidad = 0
+
+    def contar(filas):
+        nonlocal cantidad
+        for fila in filas:
+            cantidad += 1
+            yield fila
+
+    if formato == "xlsx":
+        escribir_xlsx(ruta, contar(filas_socios()), encabezados_socios())
+    else:
+        with ruta.open("wb") as destino:
+            for bloque in generar_csv(
+                contar(filas_socios()), encabezados_socios(), comprimir=(formato == "csv.gz"),
+            ):
+                destino.write(bloque)
+    return {"socios": cantidad}
+
+
+@tipo_tarea("reconstruir_recaudacion")
+def reconstruir_recaudacion(tarea):
+    return {"filas": reconstruir_resumenes()}
+
+
+@tipo_tarea("importar_socios")
+def importar_socios(tarea, archivo, nombre, simular=False):
+    entrada = Path(archivo)
+    try:
+        with entrada.open("rb") as datos:
+            informe = importar(leer_filas(datos, nombre), simular=simular)
+    finally:
+        entrada.unlink(missing_ok=True)
+    if informe.errores:
+        # El informe completo se descarga; en la página se ven los primeros.
+        with ruta_resultado(tarea, "errores.csv").open("w", newline="", encoding="utf-8-sig") as salida:
+            writer = csv.writer(salida)
+            writer.writerow(["Fila", "DNI", "Errores"])
+            writer.writerows(informe.errores)
+    return {
+        "simulado": simular,
+        "filas": informe.filas,
+        "creados": informe.creados,
+        "actualizados": informe.actualizados,
+        "ignoradas": informe.ignoradas,
+        "cantidad_errores": len(informe.errores),
+        "errores": informe.errores[:settings.IMPORT_ERRORES_VISIBLES],
+    }
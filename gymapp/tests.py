@@ -1,19 +1,55 @@
+import csv
+import gzip
+import io
 import json
-from datetime import date
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
 
-from django.db import IntegrityError
-from django.test import TestCase
+import openpyxl
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+from gym.estaticos import EstaticosMiddleware
+from gym.middleware import PresupuestoExcedido
+from gym.routers import LecturaEscrituraRouter, solo_lectura
+from gym.sqlite.concurrencia import medir_concurrencia
 
 from .models import (
     Member,
     Rutina,
     DetalleRutina,
     Ejercicio,
+    Eliminacion,
     Payment,
     ComentarioRutina,
+    FilaRutina,
+    ResumenRecaudacion,
+    RutinaArchivada,
+    Tarea,
 )
-from .forms import DetalleRutinaPayloadForm
+from . import portal
+from .busqueda import texto_busqueda
+from .recaudacion import reconstruir_resumenes
+from .retencion import archivar, restaurar, versiones_a_archivar
+from .forms import DetalleRutinaPayloadForm, validar_filas_payload
+from .pagos import marcar_pagos
+from .estructuras import ESTRUCTURAS
+from .tareas import encolar, limpiar_terminadas, recuperar_colgadas, tomar
+from .versionado import guardar_filas
 
 
 class RutinaClienteDuplicationTest(TestCase):
@@ -72,7 +108,187 @@ class MemberListViewTest(TestCase):
         self.assertContains(response, member.nombre_apellido)
 
 
+class SQLiteConcurrenciaTest(SimpleTestCase):
+    def test_sin_bloqueos_con_escritores_y_lectores_concurrentes(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            resultado = medir_concurrencia(
+                Path(carpeta) / "carga.sqlite3", escritores=4, lectores=4, transacciones=20,
+            )
+        self.assertEqual(resultado["errores"], 0)
+        self.assertEqual(resultado["escrituras"], 80)
+        self.assertGreater(resultado["lecturas"], 0)
+
+    @override_settings(BASE_LECTURA="lectura")
+    def test_router_separa_lecturas_de_vistas_de_solo_lectura(self):
+        router = LecturaEscrituraRouter()
+        self.assertEqual(router.db_for_read(Member), "default")
+        with solo_lectura():
+            self.assertEqual(router.db_for_read(Member), "lectura")
+            self.assertEqual(router.db_for_write(Member), "default")
+        self.assertEqual(router.db_for_read(Member), "default")
+        self.assertFalse(router.allow_migrate("lectura", "gymapp"))
+
+    @override_settings(BASE_LECTURA="lectura")
+    def test_solo_lectura_en_vistas_async(self):
+        router = LecturaEscrituraRouter()
+
+        @solo_lectura()
+        async def vista():
+            return router.db_for_read(Member)
+
+        self.assertEqual(async_to_sync(vista)(), "lectura")
+        self.assertEqual(router.db_for_read(Member), "default")
+
+
+class PresupuestoConsultasTest(TestCase):
+    def setUp(self):
+        Member.objects.create(dni="1", nombre_apellido="Tester")
+
+    def test_informa_consultas_en_server_timing(self):
+        response = self.client.get(reverse("member_list"))
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ consultas"$')
+
+    @override_settings(CONSULTAS_PRESUPUESTO={"member_list": 1})
+    def test_excederlo_falla_en_modo_estricto(self):
+        with self.assertRaises(PresupuestoExcedido):
+            self.client.get(reverse("member_list"))
+
+    @override_settings(
+        CONSULTAS_PRESUPUESTO={"member_list": 1},
+        CONSULTAS_ESTRICTO=False,
+        CONSULTAS_MUESTREO=0,
+    )
+    def test_fuera_de_los_tests_solo_registra(self):
+        with self.assertLogs("gym.consultas", "WARNING") as logs:
+            response = self.client.get(reverse("member_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("[member_list]", logs.output[0])
+        self.assertIn("presupuesto 1", logs.output[0])
+
+
+class MemberListPaginationTest(TestCase):
+    def setUp(self):
+        # Dos socios con el mismo nombre para verificar el desempate por id.
+        for i, nombre in enumerate(["Ana", "Beto", "Beto", "Carla", "Dario"]):
+            Member.objects.create(dni=str(100 + i), nombre_apellido=nombre)
+
+    def _nombres(self, response):
+        return [m.nombre_apellido for m in response.context["members"]]
+
+    @override_settings(SOCIOS_POR_PAGINA=2)
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        vistos = []
+        url = reverse("member_list")
+        while url:
+            response = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+            self.assertTemplateUsed(response, "gymapp/partials/_member_list_rows.html")
+            vistos.extend(m.id for m in response.context["members"])
+            url = response.context["siguiente_url"]
+
+        esperado = list(
+            Member.objects.order_by("nombre_apellido", "id").values_list("id", flat=True)
+        )
+        self.assertEqual(vistos, esperado)
+
+    def test_por_pagina_configurable(self):
+        response = self.client.get(reverse("member_list"), {"por_pagina": "3"})
+        self.assertEqual(self._nombres(response), ["Ana", "Beto", "Beto"])
+        self.assertContains(response, 'class="cargar-mas"')
+
+    def test_partial_pagina_con_busqueda(self):
+        response = self.client.get(
+            reverse("member_rows_partial"), {"q": "beto", "por_pagina": "1"}
+        )
+        self.assertEqual(self._nombres(response), ["Beto"])
+        siguiente = response.context["siguiente_url"]
+        self.assertIn("q=beto", siguiente)
+
+        response = self.client.get(siguiente)
+        self.assertEqual(self._nombres(response), ["Beto"])
+        self.assertEqual(response.context["siguiente_url"], "")
+
+    def test_cursor_invalido_vuelve_a_la_primera_pagina(self):
+        response = self.client.get(reverse("member_list"), {"cursor": "no-es-un-cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._nombres(response)[0], "Ana")
+
+    def test_cursor_adulterado_vuelve_a_la_primera_pagina(self):
+        from .paginacion import codificar_cursor
+
+        for valores in (["a", "x"], ["a", None], [["a"], 1], ["a", 1, 2]):
+            cursor = codificar_cursor(valores)
+            for url, params in (
+                (reverse("member_list"), {"cursor": cursor}),
+                (reverse("member_rows_partial"), {"cursor": cursor}),
+                (reverse("member_list"), {"cursor": cursor, "q": "a"}),
+            ):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200, (valores, url))
+
+
+class MemberSearchIndexTest(TestCase):
+    def setUp(self):
+        self.perez = Member.objects.create(
+            dni="30111222", nombre_apellido="Juan Pérez", gmail="jperez@gmail.com"
+        )
+        self.gomez = Member.objects.create(
+            dni="30999888", nombre_apellido="Ana Gómez", telefono="11-4567-8900"
+        )
+
+    def _buscar(self, q):
+        response = self.client.get(reverse("member_list"), {"q": q})
+        return [m.id for m in response.context["members"]]
+
+    def test_busqueda_sin_acentos_y_por_prefijo(self):
+        self.assertEqual(self._buscar("perez"), [self.perez.id])
+        self.assertEqual(self._buscar("PÉR"), [self.perez.id])
+        self.assertEqual(self._buscar("gom an"), [self.gomez.id])
+        self.assertEqual(self._buscar("4567"), [self.gomez.id])
+        self.assertEqual(self._buscar("zzz"), [])
+
+    def test_indice_sigue_altas_cambios_y_bajas(self):
+        self.perez.nombre_apellido = "Juan Ibáñez"
+        self.perez.save()
+        self.assertEqual(self._buscar("ibanez"), [self.perez.id])
+        self.assertEqual(self._buscar("perez"), [])
+
+        Member.objects.bulk_create([Member(dni="5", nombre_apellido="Zoe Núñez")])
+        self.assertEqual(len(self._buscar("nunez")), 1)
+
+        self.gomez.delete()
+        self.assertEqual(self._buscar("gomez"), [])
+
+    def test_ordena_por_relevancia(self):
+        # "juan" en el nombre pesa más que en el correo.
+        otro = Member.objects.create(dni="7", nombre_apellido="Carla Ruiz", gmail="juanito@gmail.com")
+        self.assertEqual(self._buscar("juan"), [self.perez.id, otro.id])
+
+    def test_existencia_del_indice_se_consulta_una_vez(self):
+        from .busqueda import instalar_indice, olvidar_indice, usa_fts
+
+        olvidar_indice()
+        self.assertTrue(usa_fts())
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertTrue(usa_fts())
+        self.assertEqual(len(consultas), 0)
+        instalar_indice()
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertTrue(usa_fts())
+        self.assertEqual(len(consultas), 0)
+
+    def test_fallback_sin_fts(self):
+        from unittest import mock
+
+        with mock.patch("gymapp.busqueda.usa_fts", return_value=False):
+            self.assertEqual(self._buscar("perez"), [self.perez.id])
+            self.assertEqual(self._buscar("gom"), [self.gomez.id])
+
+
 class MemberRowsPartialViewTest(TestCase):
+    def setUp(self):
+        # Los ids se reusan entre tests y la caché de filas no se vacía sola.
+        cache.clear()
+
     def test_unpaid_payment_shows_debe_badge(self):
         member = Member.objects.create(dni="2", nombre_apellido="Tester 2")
         Payment.objects.create(
@@ -89,6 +305,575 @@ class MemberRowsPartialViewTest(TestCase):
             response.content.decode(),
         )
 
+    async def test_busqueda_en_vivo_por_asgi(self):
+        await Member.objects.acreate(dni="3", nombre_apellido="Lucía Gómez")
+        await Member.objects.acreate(dni="4", nombre_apellido="Pedro Ruiz")
+
+        response = await self.async_client.get(reverse("member_rows_partial"), {"q": "gomez"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Lucía Gómez")
+        self.assertNotContains(response, "Pedro Ruiz")
+        self.assertIn('desc="', response["Server-Timing"])
+
+
+class CacheFilasSociosTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = self.client_class(enforce_csrf_checks=True)
+        self.socios = [Member.objects.create(dni=str(i), nombre_apellido=f"Socio {i}") for i in range(3)]
+
+    def pedir_filas(self):
+        response = self.client.get(reverse("member_rows_partial"))
+        return response, response.content.decode()
+
+    def test_solo_renderiza_filas_que_cambiaron(self):
+        response, _ = self.pedir_filas()
+        self.assertEqual(response["X-Cache-Filas"], "aciertos=0; fallos=3")
+        response, html = self.pedir_filas()
+        self.assertEqual(response["X-Cache-Filas"], "aciertos=3; fallos=0")
+
+        # Editar un socio cambia su fila.  La versión se renueva recién al
+        # confirmar la transacción.
+        with self.captureOnCommitCallbacks() as callbacks:
+            socio = Member.objects.get(pk=self.socios[1].pk)
+            socio.nombre_apellido = "Renombrado"
+            socio.save()
+        response, html = self.pedir_filas()
+        self.assertEqual(response["X-Cache-Filas"], "aciertos=3; fallos=0")
+        for callback in callbacks:
+            callback()
+        response, html = self.pedir_filas()
+        self.assertEqual(response["X-Cache-Filas"], "aciertos=2; fallos=1")
+        self.assertIn("Renombrado", html)
+
+        self.assertEqual(
+            self.client.get(reverse("estadisticas_cache_filas")).json(),
+            {"aciertos": 8, "fallos": 4, "tasa_aciertos": round(8 / 12, 4)},
+        )
+
+    def test_estado_de_pago_fuera_de_la_cache(self):
+        self.pedir_filas()
+        # Sin invalidar nada (como otro proceso con su propia caché local),
+        # las filas cacheadas muestran el estado de pago actual.
+        with self.captureOnCommitCallbacks() as callbacks:
+            Payment.objects.create(member=self.socios[2], mes=date.today())
+            marcar_pagos([self.socios[0].id, self.socios[1].id], date.today())
+        self.assertEqual(callbacks, [])
+        response, html = self.pedir_filas()
+        self.assertEqual(response["X-Cache-Filas"], "aciertos=3; fallos=0")
+        self.assertEqual(html.count('<span class="badge bg-success">Pagado</span>'), 3)
+        self.assertNotIn("__parte_variable_fila_socio__", html)
+
+    def test_token_csrf_del_pedido_en_filas_cacheadas(self):
+        self.pedir_filas()
+        otro = self.client_class(enforce_csrf_checks=True)
+        response = otro.get(reverse("member_rows_partial"))
+        html = response.content.decode()
+        self.assertEqual(response["X-Cache-Filas"], "aciertos=3; fallos=0")
+        self.assertNotIn("__csrf_fila_socio__", html)
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', html).group(1)
+        # El token sirve para enviar el formulario de esa fila.
+        response = otro.post(
+            reverse("toggle_payment", args=[self.socios[0].id]), {"csrfmiddlewaretoken": token},
+        )
+        self.assertEqual(response.status_code, 302)
+
+
+class ExportMembersTest(TestCase):
+    def setUp(self):
+        Member.objects.create(dni="1", nombre_apellido="Ana Pérez", gmail="ana@gmail.com", edad=30)
+        Member.objects.create(dni="2", nombre_apellido="Beto")
+
+    def _contenido(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_excel_write_only(self):
+        response = self.client.get(reverse("export_members_excel"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("socios.xlsx", response["Content-Disposition"])
+
+        wb = openpyxl.load_workbook(io.BytesIO(self._contenido(response)))
+        filas = list(wb["Socios"].values)
+        self.assertEqual(filas[0][:2], ("Nombre y Apellido", "DNI"))
+        self.assertEqual(filas[1][:2], ("Ana Pérez", "1"))
+        self.assertEqual(filas[1][5], 30)
+        self.assertEqual(len(filas), 3)
+
+    def test_csv_y_csv_gz(self):
+        response = self.client.get(reverse("export_members_excel"), {"formato": "csv"})
+        texto = self._contenido(response).decode("utf-8-sig")
+        filas = list(csv.reader(io.StringIO(texto)))
+        self.assertEqual(filas[0][0], "Nombre y Apellido")
+        self.assertEqual([f[0] for f in filas[1:]], ["Ana Pérez", "Beto"])
+
+        response = self.client.get(reverse("export_members_excel"), {"formato": "csv.gz"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        texto = gzip.decompress(self._contenido(response)).decode("utf-8")
+        self.assertEqual(list(csv.reader(io.StringIO(texto)))[2][0], "Beto")
+
+
+class ExportCambiosTest(TestCase):
+    def setUp(self):
+        self.ana = Member.objects.create(dni="1", nombre_apellido="Ana")
+        self.beto = Member.objects.create(dni="2", nombre_apellido="Beto")
+        self.pago = Payment.objects.create(member=self.ana, mes=date(2024, 3, 1))
+        # Todo lo anterior quedó sincronizado ayer.
+        self.ayer = timezone.now() - timedelta(days=1)
+        Member.objects.update(fecha_modificacion=self.ayer)
+        Payment.objects.update(fecha_modificacion=self.ayer)
+        self.marca = (self.ayer + timedelta(hours=1)).isoformat()
+
+    def _jsonl(self, **params):
+        response = self.client.get(reverse("export_cambios"), params)
+        self.assertEqual(response.status_code, 200)
+        lineas = b"".join(response.streaming_content).decode().splitlines()
+        return response, [json.loads(linea) for linea in lineas]
+
+    def test_sin_marca_exporta_todo(self):
+        response, filas = self._jsonl()
+        self.assertEqual([f["dni"] for f in filas], ["1", "2"])
+        self.assertTrue(response["X-Marca-Siguiente"].endswith("Z"))
+
+    def test_solo_cambios_y_bajas_desde_la_marca(self):
+        _, filas = self._jsonl(desde=self.marca)
+        self.assertEqual(filas, [])
+
+        self.ana.telefono = "1155"
+        self.ana.save(update_fields=["telefono"])
+        self.beto.delete()
+        Member.objects.create(dni="3", nombre_apellido="Carla")
+        response, filas = self._jsonl(desde=self.marca)
+        self.assertEqual(
+            [(f["operacion"], f["dni"]) for f in filas],
+            [("cambio", "1"), ("cambio", "3"), ("baja", "2")],
+        )
+        self.assertEqual(filas[0]["telefono"], "1155")
+
+        # La marca siguiente retrocede el solapamiento: la próxima vez se repiten.
+        marca = response["X-Marca-Siguiente"]
+        self.assertEqual(len(self._jsonl(desde=marca)[1]), 3)
+        with override_settings(EXPORT_CAMBIOS_SOLAPAMIENTO=0):
+            marca = self.client.get(reverse("export_cambios"))["X-Marca-Siguiente"]
+        self.assertEqual(self._jsonl(desde=marca)[1], [])
+
+    def test_pagos_en_csv(self):
+        marcar_pagos([self.ana.id, self.beto.id], date(2024, 3, 1), plan="2")
+        Payment.objects.get(member=self.beto).delete()
+        response = self.client.get(
+            reverse("export_cambios"), {"tabla": "pagos", "formato": "csv", "desde": self.marca},
+        )
+        filas = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode("utf-8-sig"))))
+        self.assertEqual(
+            [(f["operacion"], f["member_id"], f["mes"]) for f in filas],
+            [("cambio", str(self.ana.id), "2024-03-01"), ("baja", str(self.beto.id), "2024-03-01")],
+        )
+        self.assertEqual(filas[0]["plan"], "2")
+
+    def test_bajas_en_bloque(self):
+        marcar_pagos([self.ana.id, self.beto.id], date(2024, 3, 1))
+        pagos = Payment.objects.filter(member=self.ana)
+        self.assertEqual(Eliminacion.registrar(pagos), 1)
+        # El receptor de post_delete (recaudación) carga los pagos antes de
+        # borrarlos y descuenta el cobrado: SELECT, DELETE y un upsert.
+        with self.assertNumQueries(3):
+            pagos.delete()
+        socios = Member.objects.filter(pk=self.beto.pk)
+        self.assertEqual(Eliminacion.registrar(socios), 1)
+        socios.delete()
+
+        bajas = sorted(Eliminacion.objects.values_list("tabla", "clave"))
+        self.assertEqual(bajas, [("pagos", f"{self.ana.id}/2024-03-01"), ("socios", "2")])
+
+    def test_parametros_invalidos(self):
+        for params in ({"desde": "ayer"}, {"tabla": "rutinas"}, {"formato": "xlsx"}):
+            self.assertEqual(self.client.get(reverse("export_cambios"), params).status_code, 400)
+
+
+class ImportarSociosTest(TestCase):
+    def setUp(self):
+        Member.objects.create(
+            dni="1", nombre_apellido="Ana Pérez", gmail="ana@gmail.com", historial_lesivo="Rodilla",
+        )
+
+    def _csv(self, filas):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(filas)
+        return SimpleUploadedFile("socios.csv", buffer.getvalue().encode("utf-8-sig"))
+
+    def test_crea_actualiza_y_reporta_errores_por_fila(self):
+        archivo = self._csv([
+            ["Nombre y Apellido", "DNI", "Gmail", "Edad", "Columna rara"],
+            ["Ana María Pérez", "1", "ANA@GMAIL.COM", "31", "x"],
+            ["Carlos Gómez", "2", "carlos@gmail.com", "", ""],
+            ["Sin Gmail", "3", "otro@hotmail.com", "", ""],
+            ["", "4", "", "", ""],
+            ["Repetido", "2", "", "", ""],
+        ])
+        response = self.client.post(reverse("import_members"), {"archivo": archivo})
+
+        informe = response.context["informe"]
+        self.assertEqual((informe.creados, informe.actualizados, informe.filas), (1, 1, 5))
+        self.assertEqual([(numero, dni) for numero, dni, _ in informe.errores], [(4, "3"), (5, "4"), (6, "2")])
+        self.assertIn("@gmail.com", informe.errores[0][2])
+        self.assertEqual(informe.ignoradas, ["Columna rara"])
+
+        ana = Member.objects.get(dni="1")
+        self.assertEqual((ana.nombre_apellido, ana.gmail, ana.edad), ("Ana María Pérez", "ana@gmail.com", 31))
+        # Las columnas que no trae el archivo no se pisan.
+        self.assertEqual(ana.historial_lesivo, "Rodilla")
+        carlos = Member.objects.get(dni="2")
+        self.assertEqual(carlos.fecha_alta, date.today())
+        self.assertIn(" gomez", carlos.busqueda)
+        self.assertEqual(
+            [m.dni for m in self.client.get(reverse("member_list"), {"q": "gomez"}).context["members"]],
+            ["2"],
+        )
+
+    def test_excel_simulado_no_guarda(self):
+        wb = openpyxl.Workbook()
+        wb.active.append(["DNI", "nombre_apellido", "Teléfono"])
+        wb.active.append([30123456, "Dora", 1155551234])
+        contenido = io.BytesIO()
+        wb.save(contenido)
+        archivo = SimpleUploadedFile("socios.xlsx", contenido.getvalue())
+
+        response = self.client.post(reverse("import_members"), {"archivo": archivo, "simular": "on"})
+
+        self.assertEqual(response.context["informe"].creados, 1)
+        self.assertContains(response, "Se crearían 1 socios")
+        self.assertFalse(Member.objects.filter(dni="30123456").exists())
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = Path(carpeta) / "socios.xlsx"
+            ruta.write_bytes(contenido.getvalue())
+            call_command("importar_socios", str(ruta), stdout=io.StringIO())
+        self.assertEqual(Member.objects.get(dni="30123456").telefono, "1155551234")
+
+    def test_faltan_columnas_obligatorias(self):
+        response = self.client.post(
+            reverse("import_members"), {"archivo": self._csv([["Nombre y Apellido"], ["Ana"]])},
+        )
+        self.assertIsNone(response.context["informe"])
+        self.assertFormError(response.context["form"], "archivo", "Faltan las columnas: dni.")
+
+
+class TareasTest(TestCase):
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.carpeta = Path(carpeta.name)
+        ajustes = override_settings(TAREAS_DIR=self.carpeta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        Member.objects.create(dni="1", nombre_apellido="Ana Pérez")
+
+    def _procesar(self):
+        call_command("procesar_tareas", "--una-vez", "--hilos", "1", stdout=io.StringIO())
+
+    def test_exportacion_en_segundo_plano(self):
+        response = self.client.get(
+            reverse("export_members_excel"), {"formato": "csv", "segundo_plano": "1"},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+        self.assertEqual(response.status_code, 202)
+        datos = response.json()
+        self.assertEqual(datos["estado"], "pendiente")
+        self.assertEqual(response["Location"], datos["url"])
+        descarga = reverse("descargar_tarea", args=[datos["id"]])
+        self.assertEqual(self.client.get(descarga).status_code, 404)
+        self.assertContains(self.client.get(datos["url"]), 'http-equiv="refresh"')
+
+        self._procesar()
+
+        estado = self.client.get(datos["url"], {"formato": "json"}).json()
+        self.assertEqual((estado["estado"], estado["resultado"]), ("lista", {"socios": 1}))
+        self.assertEqual(estado["descarga"], descarga)
+        response = self.client.get(descarga)
+        self.assertIn('filename="socios.csv"', response["Content-Disposition"])
+        contenido = b"".join(response.streaming_content).decode("utf-8-sig")
+        self.assertIn("Ana Pérez,1", contenido)
+        self.assertNotContains(self.client.get(datos["url"]), 'http-equiv="refresh"')
+
+    def test_importacion_y_recaudacion_en_segundo_plano(self):
+        archivo = SimpleUploadedFile(
+            "socios.csv", "DNI,Nombre y Apellido,Gmail\n2,Carlos Gómez,\n3,Sin Gmail,x@hotmail.com\n".encode(),
+        )
+        response = self.client.post(reverse("import_members"), {"archivo": archivo, "segundo_plano": "on"})
+        importacion = Tarea.objects.get(tipo="importar_socios")
+        self.assertRedirects(response, reverse("estado_tarea", args=[importacion.id]))
+        self.assertFalse(Member.objects.filter(dni="2").exists())
+        Payment.objects.create(member=Member.objects.get(dni="1"), mes=date(2025, 3, 1), plan="3")
+        ResumenRecaudacion.objects.all().delete()
+        self.client.post(reverse("reconstruir_recaudacion"))
+
+        self._procesar()
+
+        importacion.refresh_from_db()
+        self.assertEqual(importacion.estado, Tarea.LISTA)
+        self.assertEqual((importacion.resultado["creados"], importacion.resultado["cantidad_errores"]), (1, 1))
+        self.assertTrue(Member.objects.filter(dni="2").exists())
+        self.assertEqual(list((self.carpeta / "entrada").iterdir()), [])
+        response = self.client.get(reverse("estado_tarea", args=[importacion.id]))
+        self.assertContains(response, "Se crearon 1 socios")
+        self.assertContains(response, "@gmail.com")
+        errores = self.client.get(reverse("descargar_tarea", args=[importacion.id]))
+        self.assertIn(b"3,3,gmail:", b"".join(errores.streaming_content))
+        self.assertEqual(Tarea.objects.get(tipo="reconstruir_recaudacion").resultado, {"filas": 1})
+        self.assertEqual(ResumenRecaudacion.objects.get().total, Payment.PRECIOS["3"])
+
+    def test_errores_colgadas_y_limpieza(self):
+        with self.assertRaises(ValueError):
+            encolar("desconocida")
+        rota = encolar("importar_socios", archivo=str(self.carpeta / "no-existe.csv"), nombre="no-existe.csv")
+        with self.assertLogs("gym.tareas", "ERROR"):
+            self._procesar()
+        rota.refresh_from_db()
+        self.assertEqual(rota.estado, Tarea.ERROR)
+        self.assertIn("no-existe.csv", rota.error)
+        self.assertIsNone(tomar())
+
+        # Una tarea tomada por un worker que se cortó vuelve a la cola.
+        colgada = encolar("reconstruir_recaudacion")
+        self.assertEqual(tomar(), colgada)
+        self.assertIsNone(tomar())
+        self.assertEqual(recuperar_colgadas(), 0)
+        self.assertEqual(recuperar_colgadas(timezone.now() + timedelta(hours=2)), 1)
+        self.assertEqual(tomar(), colgada)
+
+        self.assertEqual(limpiar_terminadas(), 0)
+        self.assertEqual(limpiar_terminadas(timezone.now() + timedelta(days=8)), 1)
+        self.assertFalse(Tarea.objects.filter(pk=rota.pk).exists())
+
+    def test_worker_recupera_colgadas_mientras_corre(self):
+        import threading
+        from unittest import mock
+
+        from .management.commands import procesar_tareas
+
+        colgada = encolar("reconstruir_recaudacion")
+        self.assertEqual(tomar(), colgada)
+        Tarea.objects.filter(pk=colgada.pk).update(iniciada=timezone.now() - timedelta(hours=2))
+
+        parar = threading.Event()
+        ejecutar = procesar_tareas.ejecutar
+
+        def ejecutar_y_parar(tarea):
+            ejecutar(tarea)
+            parar.set()
+
+        # Si no la recupera, el worker quedaría esperando: se corta igual.
+        limite = threading.Timer(5, parar.set)
+        limite.start()
+        self.addCleanup(limite.cancel)
+        salida = io.StringIO()
+        with override_settings(TAREAS_REVISION=0, TAREAS_ESPERA=0.01), \
+                mock.patch.object(procesar_tareas, "ejecutar", ejecutar_y_parar):
+            procesar_tareas.Command(stdout=salida)._trabajar(parar, una_vez=False)
+        colgada.refresh_from_db()
+        self.assertEqual(colgada.estado, Tarea.LISTA)
+        self.assertIn("1 tareas colgadas vuelven a la cola.", salida.getvalue())
+
+
+class DeudoresTest(TestCase):
+    def setUp(self):
+        self.mes = date.today().replace(day=1)
+        self.al_dia = Member.objects.create(dni="1", nombre_apellido="Al Día")
+        self.impago = Member.objects.create(dni="2", nombre_apellido="Impago")
+        self.anulado = Member.objects.create(dni="3", nombre_apellido="Anulado")
+        self.sin_pago = Member.objects.create(dni="4", nombre_apellido="Sin Pago")
+        Payment.objects.create(member=self.al_dia, mes=self.mes)
+        Payment.objects.create(member=self.impago, mes=self.mes, pagado=False)
+        Payment.objects.create(member=self.anulado, mes=self.mes, anulado=True)
+
+    def test_deudores_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            ids = {m.id for m in Member.objects.deudores(self.mes)}
+        self.assertEqual(ids, {self.impago.id, self.anulado.id, self.sin_pago.id})
+
+    def test_deudores_de_cualquier_mes(self):
+        Payment.objects.create(member=self.sin_pago, mes=date(2024, 3, 1))
+        ids = set(Member.objects.deudores(date(2024, 3, 15)).values_list("id", flat=True))
+        self.assertEqual(ids, {self.al_dia.id, self.impago.id, self.anulado.id})
+
+    def test_vistas_de_pago_actualizan_deudores(self):
+        response = self.client.get(reverse("member_list"))
+        self.assertEqual(
+            [m.id for m in response.context["deudores"]],
+            [self.anulado.id, self.impago.id, self.sin_pago.id],
+        )
+
+        self.client.post(reverse("toggle_payment", args=[self.sin_pago.id]))
+        mes_str = self.mes.strftime("%m-%Y")
+        self.client.post(reverse("toggle_payment_mes", args=[self.impago.id, mes_str]))
+        pago = Payment.objects.get(member=self.al_dia, mes=self.mes)
+        self.client.post(reverse("eliminar_pago", args=[pago.id]))
+
+        ids = set(Member.objects.deudores(self.mes).values_list("id", flat=True))
+        self.assertEqual(ids, {self.al_dia.id, self.anulado.id})
+
+
+class MatrizPagosTest(TestCase):
+    def setUp(self):
+        self.hoy = date.today().replace(day=1)
+        self.mes_pasado = date(self.hoy.year - (self.hoy.month == 1), (self.hoy.month - 2) % 12 + 1, 1)
+        self.viejo = Member.objects.create(dni="1", nombre_apellido="Antiguo")
+        Member.objects.filter(pk=self.viejo.pk).update(fecha_alta=date(2020, 1, 1))
+        self.nuevo = Member.objects.create(dni="2", nombre_apellido="Nuevo")
+        Payment.objects.create(member=self.viejo, mes=self.mes_pasado)
+        Payment.objects.create(member=self.viejo, mes=self.hoy, anulado=True)
+        Payment.objects.create(member=self.nuevo, mes=self.hoy)
+
+    def pedir(self, **params):
+        return self.client.get(reverse("matriz_pagos"), params).json()
+
+    def test_grilla_de_los_ultimos_doce_meses(self):
+        data = self.pedir()
+        self.assertEqual(len(data["meses"]), 12)
+        self.assertEqual(data["meses"][-1], self.hoy.strftime("%m-%Y"))
+        filas = {s["id"]: s["estados"] for s in data["socios"]}
+        self.assertEqual(filas[self.viejo.id], "D" * 10 + "PA")
+        # Antes del alta el mes no se cobra.
+        self.assertEqual(filas[self.nuevo.id], "-" * 11 + "P")
+
+    def test_rango_y_meses_futuros(self):
+        desde = self.mes_pasado.strftime("%m-%Y")
+        siguiente = date(self.hoy.year + (self.hoy.month == 12), self.hoy.month % 12 + 1, 1)
+        data = self.pedir(desde=desde, hasta=siguiente.strftime("%Y-%m"), q="antiguo")
+        self.assertEqual(len(data["meses"]), 3)
+        self.assertEqual([s["estados"] for s in data["socios"]], ["PA-"])
+
+    def test_paginado_por_socio_con_consultas_constantes(self):
+        for i in range(10):
+            Member.objects.create(dni=f"9{i}", nombre_apellido=f"Socio {i:02d}")
+        with self.assertNumQueries(2):
+            data = self.pedir(por_pagina=5)
+        self.assertEqual(len(data["socios"]), 5)
+        vistos = [s["id"] for s in data["socios"]]
+        while data["siguiente"]:
+            data = self.client.get(data["siguiente"]).json()
+            vistos += [s["id"] for s in data["socios"]]
+        self.assertEqual(len(vistos), Member.objects.count())
+
+
+class MarcarPagosMasivosTest(TestCase):
+    def setUp(self):
+        self.mes = date.today().replace(day=1)
+        self.socios = [Member.objects.create(dni=str(i), nombre_apellido=f"Socio {i}") for i in range(4)]
+        # Uno ya debía el mes y otro tenía el pago anulado.
+        Payment.objects.create(member=self.socios[0], mes=self.mes, pagado=False)
+        Payment.objects.create(member=self.socios[1], mes=self.mes, anulado=True, plan="2")
+
+    def marcar(self, socios, **datos):
+        datos.setdefault("accion", "marcar")
+        return self.client.post(reverse("marcar_pagos"), {"socios": [s.id for s in socios], **datos})
+
+    def test_marca_en_bloque_con_consultas_constantes(self):
+        # Socios, pagos previos, upsert, relectura y resumen de recaudación
+        # (más el savepoint de la transacción).
+        with self.assertNumQueries(7):
+            response = self.marcar(self.socios, plan="3")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["mes"], self.mes.strftime("%m-%Y"))
+        self.assertEqual([p["member_id"] for p in data["pagos"]], [s.id for s in self.socios])
+        self.assertTrue(all(p["pagado"] and not p["anulado"] and p["plan"] == "3" for p in data["pagos"]))
+        self.assertEqual(Payment.objects.filter(mes=self.mes).count(), 4)
+        self.assertEqual(Member.objects.deudores(self.mes).count(), 0)
+        self.assertEqual(Payment.objects.get(member=self.socios[2]).monto, Payment.PRECIOS["3"])
+
+    def test_desmarcar_no_toca_plan_ni_anulado(self):
+        self.marcar(self.socios[:2], mes="2024-03")
+        response = self.marcar(self.socios[1:2], accion="desmarcar")
+        pago = Payment.objects.get(member=self.socios[1], mes=self.mes)
+        self.assertFalse(pago.pagado)
+        self.assertTrue(pago.anulado)
+        self.assertEqual(pago.plan, "2")
+        self.assertEqual(response.json()["pagos"][0]["id"], pago.id)
+        # El mes pedido con <input type="month"> también se acepta.
+        self.assertEqual(Payment.objects.filter(mes=date(2024, 3, 1), pagado=True).count(), 2)
+
+    def test_datos_invalidos(self):
+        self.assertEqual(self.marcar([]).status_code, 400)
+        self.assertEqual(self.marcar(self.socios, plan="99").status_code, 400)
+        self.assertEqual(self.marcar(self.socios, accion="borrar").status_code, 400)
+        self.assertEqual(self.client.get(reverse("marcar_pagos")).status_code, 405)
+        response = self.client.post(reverse("marcar_pagos"), {"socios": [self.socios[3].id, 9999]})
+        self.assertEqual(response.json()["no_encontrados"], [9999])
+
+
+class RecaudacionTest(TestCase):
+    def setUp(self):
+        self.mes = date.today().replace(day=1)
+        self.socios = [Member.objects.create(dni=str(i), nombre_apellido=f"Socio {i}") for i in range(3)]
+
+    def resumen(self):
+        return {
+            (r.mes, r.plan): (r.cantidad, r.total)
+            for r in ResumenRecaudacion.objects.filter(cantidad__gt=0)
+        }
+
+    def assertIgualAReconstruido(self):
+        incremental = self.resumen()
+        reconstruir_resumenes()
+        self.assertEqual(incremental, self.resumen())
+        return incremental
+
+    def test_cambios_de_pagos_actualizan_el_resumen(self):
+        Payment.objects.create(member=self.socios[0], mes=self.mes, plan="2")
+        Payment.objects.create(member=self.socios[1], mes=self.mes, plan="2")
+        self.assertEqual(self.resumen(), {(self.mes, "2"): (2, Payment.PRECIOS["2"] * 2)})
+
+        # Botón rápido, anulación y marcado en bloque con otro plan.
+        self.client.post(reverse("toggle_payment", args=[self.socios[2].id]))
+        pago = Payment.objects.get(member=self.socios[0], mes=self.mes)
+        self.client.post(reverse("eliminar_pago", args=[pago.id]))
+        self.client.post(
+            reverse("marcar_pagos"),
+            {"socios": [self.socios[0].id, self.socios[1].id], "plan": "all"},
+        )
+        resumen = self.assertIgualAReconstruido()
+        self.assertEqual(resumen[(self.mes, "all")], (2, Payment.PRECIOS["all"] * 2))
+        self.assertEqual(resumen[(self.mes, "")], (1, 0))
+        self.assertNotIn((self.mes, "2"), resumen)
+
+        self.client.post(reverse("toggle_payment", args=[self.socios[2].id]))
+        self.client.post(reverse("delete_member", args=[self.socios[1].id]))
+        resumen = self.assertIgualAReconstruido()
+        self.assertEqual(resumen, {(self.mes, "all"): (1, Payment.PRECIOS["all"])})
+
+    def test_borrados_en_bloque_descuentan_del_resumen(self):
+        for socio in self.socios:
+            Payment.objects.create(member=socio, mes=self.mes, plan="2")
+        Payment.objects.create(member=self.socios[0], mes=date(2020, 1, 1), plan="3")
+
+        Payment.objects.filter(member=self.socios[2]).delete()
+        # El socio arrastra sus dos pagos, como en la baja en bloque del admin.
+        Member.objects.filter(pk=self.socios[0].pk).delete()
+        resumen = self.assertIgualAReconstruido()
+        self.assertEqual(resumen, {(self.mes, "2"): (1, Payment.PRECIOS["2"])})
+
+    def test_reporte_lee_el_resumen(self):
+        Payment.objects.create(member=self.socios[0], mes=self.mes, plan="3")
+        Payment.objects.create(member=self.socios[1], mes=date(2020, 1, 1), plan="3")
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("recaudacion"), {"formato": "json"})
+        meses = response.json()["meses"]
+        self.assertEqual(len(meses), 12)
+        self.assertEqual(meses[-1]["cantidad"], 1)
+        self.assertEqual(meses[-1]["planes"]["3"]["cantidad"], 1)
+
+        response = self.client.get(reverse("recaudacion"), {"desde": "01-2020", "hasta": "02-2020"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cantidad_total"], 1)
+        self.assertEqual(response.context["total"], Payment.PRECIOS["3"])
+
+    def test_comando_reconstruye(self):
+        Payment.objects.create(member=self.socios[0], mes=self.mes, plan="3")
+        ResumenRecaudacion.objects.all().delete()
+        call_command("reconstruir_recaudacion", stdout=io.StringIO())
+        self.assertEqual(self.resumen(), {(self.mes, "3"): (1, Payment.PRECIOS["3"])})
+
 
 class TogglePaymentViewTest(TestCase):
     def test_toggle_payment_creates_and_toggles(self):
@@ -128,12 +913,148 @@ class LoginClienteViewTest(TestCase):
     def test_login_success(self):
         response = self.client.post(reverse("login_cliente"), {"dni": "123"})
         self.assertRedirects(response, reverse("mis_rutinas", args=[self.member.id]))
-        self.assertEqual(self.client.session["cliente_id"], self.member.id)
+        self.assertIn(portal.COOKIE, response.cookies)
+        self.assertFalse(Session.objects.exists())
 
     def test_login_invalid_dni(self):
         response = self.client.post(reverse("login_cliente"), {"dni": "999"})
         self.assertRedirects(response, reverse("login_cliente"))
-        self.assertNotIn("cliente_id", self.client.session)
+        self.assertNotIn(portal.COOKIE, response.cookies)
+
+    def test_logout_borra_la_cookie(self):
+        self.client.post(reverse("login_cliente"), {"dni": "123"})
+        self.client.post(reverse("logout_cliente"))
+        response = self.client.get(reverse("mis_rutinas", args=[self.member.id]))
+        self.assertRedirects(response, reverse("login_cliente"))
+
+
+@override_settings(RUTINAS_POR_PAGINA=3)
+class MisRutinasPortalTest(TestCase):
+    def setUp(self):
+        self.member = Member.objects.create(dni="1", nombre_apellido="Tester")
+        self.ejercicio = Ejercicio.objects.create(nombre="Peso muerto")
+        self.rutinas = []
+        for semana in range(1, 6):
+            rutina = Rutina.objects.create(member=self.member, estructura="hipertrofia", semana=semana)
+            DetalleRutina.objects.create(rutina=rutina, ejercicio=self.ejercicio, series="3")
+            self.rutinas.append(rutina)
+        self.url = reverse("mis_rutinas", args=[self.member.id])
+        self.client.post(reverse("login_cliente"), {"dni": "1"})
+
+    def test_primera_pagina_solo_encabezados(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r.id for r in response.context["rutinas"]],
+            [r.id for r in reversed(self.rutinas[2:])],
+        )
+        self.assertNotContains(response, "Peso muerto")
+        self.assertTrue(response.context["siguiente_url"])
+
+    def test_pagina_siguiente_parcial(self):
+        siguiente = self.client.get(self.url).context["siguiente_url"]
+        response = self.client.get(siguiente, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertTemplateUsed(response, "gymapp/partials/_rutinas_cliente.html")
+        self.assertTemplateNotUsed(response, "gymapp/mis_rutinas.html")
+        self.assertEqual(
+            [r.id for r in response.context["rutinas"]],
+            [self.rutinas[1].id, self.rutinas[0].id],
+        )
+        self.assertEqual(response.context["siguiente_url"], "")
+
+    def test_consultas_no_crecen_con_el_historial(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+        for _ in range(10):
+            Rutina.objects.create(member=self.member, estructura="hipertrofia")
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_detalles_de_una_rutina(self):
+        rutina = self.rutinas[0]
+        response = self.client.get(
+            reverse("detalles_rutina_cliente", args=[self.member.id, rutina.id])
+        )
+        detalles = response.json()["detalles"]
+        self.assertEqual(len(detalles), 1)
+        self.assertEqual(detalles[0]["ejercicio"], "Peso muerto")
+        self.assertEqual(detalles[0]["series"], "3")
+
+    def test_detalles_de_otra_rutina_404(self):
+        otro = Member.objects.create(dni="2", nombre_apellido="Otro")
+        ajena = Rutina.objects.create(member=otro, estructura="hipertrofia")
+        response = self.client.get(
+            reverse("detalles_rutina_cliente", args=[self.member.id, ajena.id])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_sin_cookie_vuelve_al_ingreso(self):
+        self.client.cookies.clear()
+        self.assertRedirects(self.client.get(self.url), reverse("login_cliente"))
+
+    def test_otro_socio_no_puede_ver_el_portal(self):
+        otro = Member.objects.create(dni="2", nombre_apellido="Otro")
+        response = self.client.get(reverse("mis_rutinas", args=[otro.id]))
+        self.assertRedirects(response, reverse("login_cliente"))
+        response = self.client.get(
+            reverse("detalles_rutina_cliente", args=[otro.id, self.rutinas[0].id]),
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_cookie_adulterada_o_vencida(self):
+        self.client.cookies[portal.COOKIE] = f"{self.member.id}:falsa"
+        self.assertRedirects(self.client.get(self.url), reverse("login_cliente"))
+        self.client.cookies[portal.COOKIE] = portal.firmar(self.member)
+        with override_settings(PORTAL_CLIENTE_DURACION=-1):
+            self.assertRedirects(self.client.get(self.url), reverse("login_cliente"))
+
+    async def test_portal_por_asgi(self):
+        self.async_client.cookies[portal.COOKIE] = portal.firmar(self.member)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["rutinas"]), 3)
+        self.assertIn('desc="2 consultas"', response["Server-Timing"])
+        response = await self.async_client.get(
+            reverse("detalles_rutina_cliente", args=[self.member.id, self.rutinas[0].id])
+        )
+        self.assertEqual(response.json()["detalles"][0]["ejercicio"], "Peso muerto")
+
+        self.async_client.cookies.clear()
+        response = await self.async_client.get(self.url)
+        self.assertRedirects(response, reverse("login_cliente"), fetch_redirect_response=False)
+
+    def test_personal_ve_cualquier_portal(self):
+        self.client.cookies.clear()
+        staff = User.objects.create_user("recepcion", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_login(User.objects.create_user("otro"))
+        self.assertRedirects(self.client.get(self.url), reverse("login_cliente"))
+
+
+class LimpiarSesionesTest(TestCase):
+    def _sesion(self, datos, dias=1):
+        store = SessionStore()
+        store.update(datos)
+        store.set_expiry(dias * 86400)
+        store.create()
+        return store.session_key
+
+    def test_borra_vencidas_y_del_portal(self):
+        staff = self._sesion({"_auth_user_id": "1"})
+        self._sesion({"cliente_id": 5})
+        vencida = self._sesion({"_auth_user_id": "1"})
+        Session.objects.filter(session_key=vencida).update(expire_date=date(2000, 1, 1))
+
+        salida = io.StringIO()
+        call_command("limpiar_sesiones", "--simular", stdout=salida)
+        self.assertEqual(Session.objects.count(), 3)
+        self.assertIn("1 sesiones vencidas y 1 del portal", salida.getvalue())
+
+        call_command("limpiar_sesiones", stdout=io.StringIO())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), [staff])
 
 
 class EditarRutinaViewTest(TestCase):
@@ -177,11 +1098,150 @@ class EditarRutinaViewTest(TestCase):
             ComentarioRutina.objects.filter(rutina=nueva, texto="Buen entrenamiento").exists()
         )
 
+    def test_editores_sin_javascript_en_linea(self):
+        for estructura, _ in Rutina.ESTRUCTURAS:
+            rutina = Rutina.objects.create(member=self.member, estructura=estructura)
+            response = self.client.get(reverse("editar_rutina", args=[rutina.id]))
+            self.assertContains(response, "js/editar_rutinas.js")
+            self.assertContains(response, "data-columnas=")
+            self.assertNotContains(response, "function makeSearchable")
+
+    def test_estructuras_con_una_consulta_de_filas(self):
+        self.assertEqual(set(ESTRUCTURAS), {clave for clave, _ in Rutina.ESTRUCTURAS})
+        for estructura, _ in Rutina.ESTRUCTURAS:
+            rutina = Rutina.objects.create(member=self.member, estructura=estructura)
+            for i in range(8):
+                DetalleRutina.objects.create(
+                    rutina=rutina, ejercicio=self.ejercicio, es_calentamiento=i < 3,
+                    categoria=["Cadena anterior", "Tracciones", "Potencia", ""][i % 4],
+                )
+            url = reverse("editar_rutina", args=[rutina.id])
+            self.client.get(url)  # deja la versión del catálogo en caché
+            # Rutina y filas (con su ejercicio), igual para todas las estructuras.
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertTemplateUsed(response, ESTRUCTURAS[estructura].plantilla)
+            # Posición de cada fila y URL del guardado parcial (editar_rutinas.js).
+            self.assertRegex(response.content.decode(), r'<tr[^>]* data-pos="\d+">')
+            self.assertContains(response, reverse("aplicar_cambios_rutina", args=[rutina.id]))
+            self.assertEqual(response.context["filas_base"], 8)
+
+        iniciacion = response.context
+        self.assertEqual(len(iniciacion["filas_calentamiento"]), 5)
+        self.assertEqual(len(iniciacion["filas_principal"]), 2)
+        self.assertEqual(iniciacion["filas_principal"][0]["ejercicio_nombre"], "Sentadilla")
+
+    def test_bloques_deportista_vuelven_a_su_tabla(self):
+        rutina = Rutina.objects.create(member=self.member, estructura="deportista")
+        fila = {"ejercicio_id": self.ejercicio.id, "series": "3", "reps": "5"}
+        payload = {"filas": [
+            {**fila, "bloque": "calentamiento", "es_calentamiento": True},
+            {**fila, "bloque": "fuerza", "categoria": "Cadena posterior"},
+            {**fila, "bloque": "potencia", "kilos": "20"},
+            {**fila, "bloque": "accesorios", "kilos": "8"},
+            {**fila, "bloque": "accesorios", "kilos": "10"},
+        ]}
+        self.client.post(reverse("guardar_rutina", args=[rutina.id]), {"payload": json.dumps(payload)})
+
+        nueva = self.member.rutinas.order_by("-id").first()
+        contexto = self.client.get(reverse("editar_rutina", args=[nueva.id])).context
+        self.assertEqual([f["ejercicio_id"] for f in contexto["filas_calentamiento"]], [self.ejercicio.id, "", ""])
+        self.assertEqual([f["ejercicio_id"] for f in contexto["filas_fuerza"]], ["", self.ejercicio.id, ""])
+        self.assertEqual([f["kilos"] for f in contexto["filas_potencia"]], ["20", "", ""])
+        self.assertEqual([f["kilos"] for f in contexto["filas_accesorios"]], ["8", "10", ""])
+
     def test_editar_rutina_invalid_id(self):
         response = self.client.get(reverse("editar_rutina", args=[999]))
         self.assertEqual(response.status_code, 404)
 
 
+class CatalogoEjerciciosTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sentadilla = Ejercicio.objects.create(nombre="Sentadilla")
+        self.remo = Ejercicio.objects.create(nombre="Remo")
+        self.url = reverse("catalogo_ejercicios")
+
+    def test_devuelve_catalogo_ordenado_con_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            data["ejercicios"],
+            [
+                {"id": str(self.remo.id), "text": "Remo"},
+                {"id": str(self.sentadilla.id), "text": "Sentadilla"},
+            ],
+        )
+        self.assertEqual(response["ETag"], f'"{data["version"]}"')
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+        revalidacion = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidacion.status_code, 304)
+
+    def test_url_versionada_es_inmutable(self):
+        version = self.client.get(self.url).json()["version"]
+        response = self.client.get(self.url, {"v": version})
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_version_cambia_al_modificar_ejercicios(self):
+        v1 = self.client.get(self.url).json()["version"]
+        with self.captureOnCommitCallbacks() as callbacks:
+            Ejercicio.objects.create(nombre="Press banca")
+        # Sin confirmar, la versión cacheada sigue siendo la anterior.
+        self.assertEqual(self.client.get(self.url).json()["version"], v1)
+        for callback in callbacks:
+            callback()
+        v2 = self.client.get(self.url).json()["version"]
+        self.assertNotEqual(v1, v2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.remo.delete()
+        data = self.client.get(self.url).json()
+        self.assertNotEqual(data["version"], v2)
+        self.assertNotIn(str(self.remo.id), [e["id"] for e in data["ejercicios"]])
+
+    def test_editor_no_repite_el_catalogo_en_cada_fila(self):
+        member = Member.objects.create(dni="1", nombre_apellido="Tester")
+        rutina = Rutina.objects.create(member=member, estructura="fuerza_base")
+        response = self.client.get(reverse("editar_rutina", args=[rutina.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, ">Remo</option>")
+        self.assertContains(response, 'name="catalogo-ejercicios"')
+
+
+class BuscarEjerciciosTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for nombre in ["Sentadilla búlgara", "Sentadilla", "Press banca", "Remo con barra", "Elevación lateral"]:
+            Ejercicio.objects.create(nombre=nombre)
+        self.url = reverse("buscar_ejercicios")
+
+    def buscar(self, q, **extra):
+        response = self.client.get(self.url, {"q": q, **extra})
+        self.assertEqual(response.status_code, 200)
+        return [e["text"] for e in response.json()["resultados"]]
+
+    def test_prefijo_del_nombre_primero_y_sin_acentos(self):
+        self.assertEqual(self.buscar("sent"), ["Sentadilla", "Sentadilla búlgara"])
+        self.assertEqual(self.buscar("bulgara"), ["Sentadilla búlgara"])
+        self.assertEqual(self.buscar("ELEVACION lat"), ["Elevación lateral"])
+
+    def test_palabras_en_cualquier_orden_y_errores_de_tipeo(self):
+        self.assertEqual(self.buscar("barra remo"), ["Remo con barra"])
+        self.assertEqual(self.buscar("sentadila"), ["Sentadilla", "Sentadilla búlgara"])
+        self.assertEqual(self.buscar("xyz"), [])
+
+    def test_limite(self):
+        self.assertEqual(len(self.buscar("", limite="2")), 2)
+        self.assertEqual(len(self.buscar("", limite="abc")), 5)
+
+    def test_indice_se_actualiza_con_el_catalogo(self):
+        self.assertEqual(self.buscar("hip"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ejercicio.objects.create(nombre="Hip thrust")
+        self.assertEqual(self.buscar("hip"), ["Hip thrust"])
+
+
 class PaymentModelTest(TestCase):
     def test_payment_str_and_unique(self):
         member = Member.objects.create(dni="1", nombre_apellido="Tester")
@@ -202,6 +1262,71 @@ class RutinaModelTest(TestCase):
         self.assertEqual(rutina.detalles.count(), 0)
 
 
+class VersionadoRutinaTest(TestCase):
+    def setUp(self):
+        self.member = Member.objects.create(dni="7", nombre_apellido="Versiones")
+        self.rutina = Rutina.objects.create(member=self.member, estructura="hipertrofia")
+        self.ejercicio = Ejercicio.objects.create(nombre="Remo")
+
+    def guardar(self, rutina, series):
+        filas = [
+            {"categoria": f"Cat {i}", "ejercicio_id": self.ejercicio.id, "series": s}
+            for i, s in enumerate(series)
+        ]
+        self.client.post(
+            reverse("guardar_rutina", args=[rutina.id]),
+            {"payload": json.dumps({"semana_id": "1", "filas": filas})},
+        )
+        return self.member.rutinas.order_by("-id").first()
+
+    def test_nueva_version_solo_inserta_filas_cambiadas(self):
+        v1 = self.guardar(self.rutina, ["3", "3", "3", "3"])
+        self.assertEqual(DetalleRutina.objects.count(), 4)
+
+        v2 = self.guardar(v1, ["3", "5", "3", "3"])
+        self.assertEqual(DetalleRutina.objects.count(), 5)
+        self.assertEqual([d.series for d in v2.detalles_en_orden()], ["3", "5", "3", "3"])
+        # La versión anterior no cambia.
+        self.assertEqual([d.series for d in v1.detalles_en_orden()], ["3", "3", "3", "3"])
+
+    def test_duplicar_comparte_todas_las_filas(self):
+        self.guardar(self.rutina, ["3", "4"])
+        antes = DetalleRutina.objects.count()
+        self.client.post(reverse("rutina_cliente", args=[self.member.id]))
+        nueva = self.member.rutinas.order_by("-id").first()
+        self.assertEqual(DetalleRutina.objects.count(), antes)
+        self.assertEqual([d.series for d in nueva.detalles_en_orden()], ["3", "4"])
+
+    def test_borrar_version_conserva_filas_compartidas(self):
+        v1 = self.guardar(self.rutina, ["3", "3"])
+        v2 = self.guardar(v1, ["3", "8"])
+        self.client.post(reverse("eliminar_rutina", args=[v1.id]))
+        self.assertEqual([d.series for d in v2.detalles_en_orden()], ["3", "8"])
+        self.assertEqual(DetalleRutina.objects.count(), 2)
+
+        self.client.post(reverse("delete_member", args=[self.member.id]))
+        self.assertEqual(DetalleRutina.objects.count(), 0)
+        self.assertEqual(FilaRutina.objects.count(), 0)
+
+
+class SembrarDatosTest(TestCase):
+    def test_siembra_volumenes_pedidos(self):
+        Ejercicio.objects.create(nombre="Remo")
+        Ejercicio.objects.create(nombre="Press banca")
+        call_command(
+            "sembrar_datos", "--socios", "5", "--meses", "3", "--rutinas", "3", "--filas", "4",
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(Member.objects.count(), 5)
+        self.assertEqual(Rutina.objects.count(), 15)
+        self.assertEqual(FilaRutina.objects.count(), 60)
+        self.assertTrue(Payment.objects.exists())
+        # Las versiones de un socio comparten las filas que no cambiaron.
+        self.assertLess(DetalleRutina.objects.count(), 60)
+        socio = Member.objects.order_by("id").first()
+        self.assertEqual(socio.busqueda, texto_busqueda(socio))
+
+
 class GuardarRutinaPayloadTest(TestCase):
     def setUp(self):
         self.member = Member.objects.create(dni="99", nombre_apellido="Payload Tester")
@@ -278,3 +1403,320 @@ class GuardarRutinaPayloadTest(TestCase):
         self.assertTrue(any("máximo" in mensaje.lower() for mensaje in mensajes))
         self.assertEqual(self.member.rutinas.count(), 1)
 
+    def test_valida_todas_las_filas_con_una_consulta(self):
+        otro = Ejercicio.objects.create(nombre="Remo")
+        filas = [
+            {"categoria": "Cat", "ejercicio_id": (self.ejercicio.id, otro.id)[i % 2], "series": "3"}
+            for i in range(DetalleRutinaPayloadForm.MAX_FILAS)
+        ]
+        with self.assertNumQueries(1):
+            limpias, errores, ejercicios = validar_filas_payload(filas)
+        self.assertEqual(errores, [])
+        self.assertEqual(len(limpias), DetalleRutinaPayloadForm.MAX_FILAS)
+        self.assertEqual(set(ejercicios), {self.ejercicio.id, otro.id})
+
+    def test_errores_por_fila_en_orden(self):
+        filas = [
+            "no es un dict",
+            {"categoria": "Cat", "ejercicio_id": self.ejercicio.id},
+            {},
+            {"ejercicio": "9999"},
+            {"ejercicio_id": "abc"},
+        ]
+        with self.assertNumQueries(1):
+            limpias, errores, _ = validar_filas_payload(filas)
+        self.assertEqual(len(limpias), 1)
+        self.assertEqual(errores[0], "Fila 1: formato inválido.")
+        self.assertEqual(errores[1], "Fila 4: El ejercicio seleccionado no existe.")
+        self.assertTrue(errores[2].startswith("Fila 5: "))
+
+
+class AplicarCambiosRutinaTest(TestCase):
+    def setUp(self):
+        self.member = Member.objects.create(dni="98", nombre_apellido="Parche Tester")
+        self.ejercicio = Ejercicio.objects.create(nombre="Remo")
+        self.base = self._rutina(4)
+        ComentarioRutina.objects.create(rutina=self.base, texto="Sin dolor")
+
+    def _rutina(self, filas):
+        rutina = Rutina.objects.create(member=self.member, estructura="hipertrofia", semana=3)
+        guardar_filas(rutina, [
+            {"ejercicio_id": self.ejercicio.id, "series": "3", "repeticiones": str(10 + i), "categoria": "Espalda"}
+            for i in range(filas)
+        ])
+        return rutina
+
+    def _aplicar(self, rutina, ops):
+        return self.client.post(
+            reverse("aplicar_cambios_rutina", args=[rutina.id]),
+            json.dumps({"ops": ops}), content_type="application/json",
+        )
+
+    def test_aplica_solo_los_cambios(self):
+        ids_base = list(self.base.filas.order_by("orden").values_list("detalle_id", flat=True))
+        ops = [
+            {"op": "update", "pos": 1, "fila": {"series": "5"}},
+            {"op": "remove", "pos": 2},
+            {"op": "add", "despues_de": -1, "fila": {"notas": "Movilidad", "es_calentamiento": True}},
+            {"op": "add", "fila": {"ejercicio_id": self.ejercicio.id, "reps": "12", "series": "3", "categoria": "Espalda"}},
+        ]
+        response = self._aplicar(self.base, ops)
+
+        self.assertEqual(response.status_code, 201)
+        datos = response.json()
+        nueva = Rutina.objects.get(pk=datos["id"])
+        self.assertEqual((datos["base"], datos["filas_nuevas"], nueva.semana), (self.base.id, 2, 3))
+        detalles = list(nueva.detalles_en_orden())
+        self.assertEqual(
+            [(d.notas, d.series, d.repeticiones) for d in detalles],
+            [("Movilidad", "", ""), ("", "3", "10"), ("", "5", "11"), ("", "3", "13"), ("", "3", "12")],
+        )
+        # Las filas sin cambios (y la agregada igual a una existente) se reutilizan.
+        self.assertEqual([d.id for d in detalles][1::2], [ids_base[0], ids_base[3]])
+        self.assertEqual(detalles[4].id, ids_base[2])
+        self.assertEqual(detalles[2].categoria, "Espalda")
+        self.assertEqual(nueva.comentario.texto, "Sin dolor")
+        self.assertEqual(self.base.detalles.count(), 4)
+
+    def test_consultas_no_dependen_del_tamanio(self):
+        consultas = []
+        for filas in (5, 150):
+            rutina = self._rutina(filas)
+            ops = [{"op": "update", "pos": 0, "fila": {"kilos": str(filas)}}, {"op": "remove", "pos": 3}]
+            with CaptureQueriesContext(connection) as capturadas:
+                self.assertEqual(self._aplicar(rutina, ops).status_code, 201)
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_errores_por_operacion_sin_guardar(self):
+        versiones = Rutina.objects.count()
+        response = self._aplicar(self.base, [
+            {"op": "update", "pos": 0, "fila": {"series": "4"}},
+            {"op": "remove", "pos": 9},
+            {"op": "update", "pos": 0, "fila": {"series": "6"}},
+            {"op": "add", "fila": {"ejercicio_id": 9999}},
+            {"op": "add", "fila": {}},
+            {"op": "mover", "pos": 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errores = response.json()["errores"]
+        self.assertEqual([error["op"] for error in errores], [1, 2, 3, 4, 5])
+        self.assertIn("ejercicio_id", errores[2]["campos"])
+        self.assertEqual(Rutina.objects.count(), versiones)
+
+        response = self.client.post(
+            reverse("aplicar_cambios_rutina", args=[self.base.id]), "no es json", content_type="application/json",
+        )
+        self.assertEqual(response.json(), {"error": "El cuerpo debe ser JSON."})
+        self.assertEqual(self._aplicar(self.base, []).json()["id"], self.base.id)
+
+    def test_solo_cambia_la_semana(self):
+        response = self.client.post(
+            reverse("aplicar_cambios_rutina", args=[self.base.id]),
+            json.dumps({"ops": [], "semana_id": 5}), content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        nueva = Rutina.objects.get(pk=response.json()["id"])
+        self.assertEqual(nueva.semana, 5)
+        self.assertEqual(
+            list(nueva.filas.order_by("orden").values_list("detalle_id", flat=True)),
+            list(self.base.filas.order_by("orden").values_list("detalle_id", flat=True)),
+        )
+
+
+class RetencionRutinasTest(TestCase):
+    def setUp(self):
+        self.member = Member.objects.create(dni="97", nombre_apellido="Historial Largo")
+        self.ejercicio = Ejercicio.objects.create(nombre="Sentadilla")
+        self.ahora = timezone.make_aware(datetime(2026, 6, 15, 12))
+
+    def _version(self, fecha, semana=1, filas=("10",)):
+        rutina = Rutina.objects.create(member=self.member, estructura="hipertrofia", semana=semana)
+        guardar_filas(rutina, [
+            {"ejercicio_id": self.ejercicio.id, "series": "3", "repeticiones": reps, "categoria": "Cuádriceps"}
+            for reps in filas
+        ])
+        Rutina.objects.filter(pk=rutina.pk).update(fecha_creacion=timezone.make_aware(fecha))
+        return rutina
+
+    def test_conserva_las_recientes_y_la_ultima_de_cada_mes(self):
+        self._version(datetime(2026, 6, 1))
+        self._version(datetime(2026, 6, 1, 0, 5))
+        vieja = self._version(datetime(2026, 3, 3))
+        self._version(datetime(2026, 3, 5), semana=2)
+        self._version(datetime(2026, 3, 20))
+        self._version(datetime(2026, 2, 10))
+        otro = Member.objects.create(dni="96", nombre_apellido="Otro Socio")
+        Rutina.objects.filter(pk=self._version(datetime(2026, 3, 1)).pk).update(member=otro)
+
+        self.assertEqual(versiones_a_archivar(dias=30, ahora=self.ahora), [vieja.id])
+        self.assertEqual(versiones_a_archivar(dias=30, ahora=self.ahora, member_id=otro.id), [])
+
+    def test_archivar_y_restaurar(self):
+        vieja = self._version(datetime(2026, 3, 3), filas=("8", "10"))
+        ComentarioRutina.objects.create(rutina=vieja, texto="Cuidar la rodilla")
+        nueva = self._version(datetime(2026, 3, 20), filas=("10",))
+        contenido = list(vieja.filas.order_by("orden").values_list("detalle__huella", flat=True))
+
+        self.assertEqual(archivar([vieja.id]), (1, 1))
+        self.assertFalse(Rutina.objects.filter(pk=vieja.pk).exists())
+        # La fila compartida con la versión que queda no se borra.
+        self.assertEqual(DetalleRutina.objects.filter(huella__in=contenido).count(), 1)
+        archivada = RutinaArchivada.objects.get()
+        self.assertEqual((archivada.rutina_original, archivada.cantidad_filas), (vieja.id, 2))
+
+        response = self.client.get(reverse("rutina_cliente", args=[self.member.id]))
+        self.assertContains(response, "Versiones archivadas (1)")
+        self.assertContains(response, reverse("restaurar_rutina", args=[archivada.id]))
+
+        self.assertEqual(self.client.get(reverse("restaurar_rutina", args=[archivada.id])).status_code, 405)
+        response = self.client.post(reverse("restaurar_rutina", args=[archivada.id]))
+        self.assertRedirects(response, reverse("rutina_cliente", args=[self.member.id]))
+        restaurada = self.member.rutinas.exclude(pk=nueva.pk).get()
+        self.assertEqual(restaurada.fecha_creacion, timezone.make_aware(datetime(2026, 3, 3)))
+        self.assertEqual(
+            list(restaurada.filas.order_by("orden").values_list("detalle__huella", flat=True)), contenido,
+        )
+        self.assertEqual(restaurada.comentario.texto, "Cuidar la rodilla")
+        self.assertFalse(RutinaArchivada.objects.exists())
+
+    def test_restaurada_no_se_vuelve_a_archivar(self):
+        vieja = self._version(datetime(2026, 3, 3), filas=("8",))
+        self._version(datetime(2026, 3, 20))
+        archivar([vieja.id])
+        restaurada = restaurar(RutinaArchivada.objects.get())
+        self.assertTrue(restaurada.conservar)
+
+        salida = io.StringIO()
+        call_command("compactar_rutinas", dias=30, stdout=salida)
+        self.assertIn("0 versiones archivadas", salida.getvalue())
+        self.assertTrue(Rutina.objects.filter(pk=restaurada.pk).exists())
+        self.assertFalse(RutinaArchivada.objects.exists())
+
+    def test_comando_archiva_en_lotes(self):
+        for dia in (2, 3, 4):
+            self._version(datetime(2026, 3, dia), filas=(str(dia),))
+        salida = io.StringIO()
+        call_command("compactar_rutinas", dias=30, simular=True, stdout=salida)
+        self.assertIn("Se archivarían 2 versiones", salida.getvalue())
+        self.assertEqual(RutinaArchivada.objects.count(), 0)
+
+        call_command("compactar_rutinas", dias=30, lote=1, stdout=salida)
+        self.assertIn("2 versiones archivadas, 2 filas sin uso borradas", salida.getvalue())
+        self.assertEqual(self.member.rutinas.count(), 1)
+        self.assertEqual(sorted(RutinaArchivada.objects.values_list("semana", "cantidad_filas")), [(1, 1), (1, 1)])
+
+
+class ConManifiestoMixin:
+    """Corre collectstatic en una carpeta temporal y activa el storage con manifiesto, sin DEBUG."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.carpeta = tempfile.TemporaryDirectory()
+        cls.ajustes = override_settings(
+            STATIC_ROOT=cls.carpeta.name,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "gym.estaticos.EstaticosComprimidos"},
+            },
+            DEBUG=False,
+        )
+        cls.ajustes.enable()
+        call_command("collectstatic", "--noinput", "--ignore", "admin", verbosity=0)
+        manifiesto = json.loads((Path(cls.carpeta.name) / "staticfiles.json").read_text())
+        cls.con_hash = manifiesto["paths"]["js/editar_rutinas.js"]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ajustes.disable()
+        cls.carpeta.cleanup()
+        super().tearDownClass()
+
+
+class EstaticosTest(ConManifiestoMixin, SimpleTestCase):
+    """collectstatic con hash y variantes .gz, servidas con caché larga."""
+
+    def _pedir(self, ruta, **encabezados):
+        middleware = EstaticosMiddleware(lambda request: HttpResponse(status=404))
+        return middleware(RequestFactory().get(f"/static/{ruta}", headers=encabezados))
+
+    def test_variante_gzip_igual_al_original(self):
+        carpeta = Path(self.carpeta.name)
+        self.assertNotEqual(self.con_hash, "js/editar_rutinas.js")
+        self.assertEqual(
+            gzip.decompress((carpeta / f"{self.con_hash}.gz").read_bytes()),
+            (carpeta / self.con_hash).read_bytes(),
+        )
+
+    def test_static_usa_el_nombre_con_hash(self):
+        from django.templatetags.static import static
+
+        self.assertEqual(static("js/editar_rutinas.js"), f"/static/{self.con_hash}")
+        # Un archivo que falta es un error, no una URL rota.
+        with self.assertRaises(ValueError):
+            static("vendor/no-existe.js")
+
+    def test_con_hash_comprimido_e_inmutable(self):
+        response = self._pedir(self.con_hash, accept_encoding="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/javascript")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        response.close()
+
+    def test_sin_hash_se_revalida(self):
+        response = self._pedir("js/editar_rutinas.js")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        self.assertNotIn("Content-Encoding", response)
+        response.close()
+        response = self._pedir("js/editar_rutinas.js", if_none_match=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_fuera_de_static_root_sigue_de_largo(self):
+        self.assertEqual(self._pedir("../settings.py").status_code, 404)
+        self.assertEqual(self._pedir("js/no-existe.js").status_code, 404)
+
+
+class PaginasConManifiestoTest(ConManifiestoMixin, TestCase):
+    """
+    Las páginas principales se renderizan sin DEBUG contra el manifiesto de
+    collectstatic: un ``{% static %}`` de un archivo que no está en el árbol
+    es un 500 en producción y tiene que fallar acá.
+    """
+
+    def test_paginas_principales(self):
+        member = Member.objects.create(dni="1", nombre_apellido="Ana")
+        Payment.objects.create(member=member, mes=date.today(), pagado=True)
+        rutinas = [
+            Rutina.objects.create(member=member, estructura=estructura)
+            for estructura, _ in Rutina.ESTRUCTURAS
+        ]
+        urls = [
+            reverse("member_list"),
+            reverse("add_member"),
+            reverse("edit_member", args=[member.id]),
+            reverse("login_cliente"),
+            reverse("historial_pagos", args=[member.id]),
+            reverse("recaudacion"),
+            reverse("import_members"),
+            reverse("rutina_cliente", args=[member.id]),
+            reverse("mis_rutinas", args=[member.id]),
+        ] + [reverse("editar_rutina", args=[rutina.id]) for rutina in rutinas]
+        self.client.cookies[portal.COOKIE] = portal.firmar(member)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, "/static/css/base.")
+                self.assertNotContains(response, "/static/css/base.css")
+
+    def test_sin_cdn_exige_las_librerias_locales(self):
+        from django.core.checks import run_checks
+
+        with override_settings(USE_CDN=False):
+            errores = {error.id for error in run_checks(tags=["staticfiles"])}
+        # Las librerías no están en el repositorio (ver README).
+        self.assertIn("gymapp.E001", errores)
+        with override_settings(USE_CDN=True):
+            self.assertEqual(run_checks(tags=["staticfiles"]), [])
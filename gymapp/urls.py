@@ -11,26 +11,43 @@ urlpatterns = [
     # Pagos
     path('pagar/<int:member_id>/', views.toggle_payment, name='toggle_payment'),  # POST
     path('historial/<int:member_id>/', views.historial_pagos, name='historial_pagos'),
+    path('pagos/matriz/', views.matriz_pagos_socios, name='matriz_pagos'),
+    path('pagos/marcar/', views.marcar_pagos_socios, name='marcar_pagos'),  # POST
+    path('pagos/recaudacion/', views.recaudacion, name='recaudacion'),
+    path('pagos/recaudacion/reconstruir/', views.reconstruir_recaudacion, name='reconstruir_recaudacion'),  # POST
     path('toggle_pago/<int:member_id>/<str:mes>/', views.toggle_payment_mes, name='toggle_payment_mes'),  # POST
     path('exportar_excel/', views.export_members_excel, name='export_members_excel'),
+    path('exportar/cambios/', views.export_cambios, name='export_cambios'),
+    path('importar/', views.import_members, name='import_members'),
     path('eliminar_pago/<int:pago_id>/', views.eliminar_pago, name='eliminar_pago'),
 
+    # Tareas en segundo plano
+    path('tareas/<int:tarea_id>/', views.estado_tarea, name='estado_tarea'),
+    path('tareas/<int:tarea_id>/descargar/', views.descargar_tarea, name='descargar_tarea'),
+
 
     # Cliente login
     path('login_cliente/', views.login_cliente, name='login_cliente'),
+    path('logout_cliente/', views.logout_cliente, name='logout_cliente'),  # POST
 
     # Partial para recarga con AJAX
     path('member_rows_partial/', views.member_rows_partial, name='member_rows_partial'),
+    path('estadisticas/cache-filas/', views.estadisticas_cache_filas, name='estadisticas_cache_filas'),
     path('update_member_info/<int:member_id>/', views.update_member_info, name='update_member_info'),
 
     # Rutinas
+    path('ejercicios/catalogo/', views.catalogo_ejercicios, name='catalogo_ejercicios'),
+    path('ejercicios/buscar/', views.buscar_ejercicios, name='buscar_ejercicios'),
     path('rutina/<int:member_id>/', views.rutina_cliente, name='rutina_cliente'),
     path('rutina/editar/<int:rutina_id>/', views.editar_rutina, name='editar_rutina'),
     path('rutina/eliminar/<int:rutina_id>/', views.eliminar_rutina, name='eliminar_rutina'),
+    path('rutina/restaurar/<int:archivada_id>/', views.restaurar_rutina, name='restaurar_rutina'),  # POST
     path('socio/<int:member_id>/rutina/nueva/<str:tipo>/', views.crear_rutina, name='crear_rutina'),
     path('rutina/guardar/<int:rutina_id>/', views.guardar_rutina, name='guardar_rutina'),
+    path('rutina/cambios/<int:rutina_id>/', views.aplicar_cambios_rutina, name='aplicar_cambios_rutina'),  # POST JSON
 
     # Rutinas cliente
     path('mis_rutinas/<int:member_id>/', views.mis_rutinas, name='mis_rutinas'),
+    path('mis_rutinas/<int:member_id>/rutina/<int:rutina_id>/', views.detalles_rutina_cliente, name='detalles_rutina_cliente'),
 ]
 
@@ -0,0 +1,153 @@
+"""
+Versionado de rutinas con filas compartidas.
+
+Cada guardado del editor crea una ``Rutina`` nueva (el historial se conserva),
+pero las filas (``DetalleRutina``) son inmutables y se identifican por una
+huella de su contenido.  Al guardar una versión se reutilizan las filas que
+ya existen con la misma huella y solo se insertan las que cambiaron; la
+versión queda armada con una ``FilaRutina`` (rutina, fila, orden) por fila.
+
+Cuando se borra una rutina (o un socio), las filas que ya no usa ninguna
+versión se eliminan con ``borrar_filas_huerfanas``.
+"""
+import hashlib
+
+from .models import DetalleRutina, FilaRutina, Rutina
+
+# Huellas por consulta al buscar filas existentes (límite de parámetros).
+LOTE_HUELLAS = 500
+
+# Campos que forman el contenido de una fila (y su huella).
+CAMPOS_CONTENIDO = (
+    "categoria",
+    "ejercicio_id",
+    "series",
+    "repeticiones",
+    "peso",
+    "descanso",
+    "rir",
+    "sensaciones",
+    "notas",
+    "es_calentamiento",
+)
+
+
+def _valor(fila, campo):
+    if isinstance(fila, dict):
+        if campo == "ejercicio_id" and "ejercicio_id" not in fila:
+            ejercicio = fila.get("ejercicio")
+            return getattr(ejercicio, "pk", ejercicio)
+        return fila.get(campo)
+    return getattr(fila, campo)
+
+
+def contenido_fila(fila):
+    """Normaliza una fila (dict o ``DetalleRutina``) a sus campos de contenido."""
+    contenido = {}
+    for campo in CAMPOS_CONTENIDO:
+        valor = _valor(fila, campo)
+        if campo == "es_calentamiento":
+            contenido[campo] = bool(valor)
+        elif campo == "ejercicio_id":
+            contenido[campo] = int(valor) if valor else None
+        else:
+            contenido[campo] = "" if valor is None else str(valor)
+    return contenido
+
+
+def huella_detalle(fila):
+    contenido = contenido_fila(fila)
+    digest = hashlib.sha1()
+    for campo in CAMPOS_CONTENIDO:
+        digest.update(f"{contenido[campo]}\x1f".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def guardar_filas(rutina, filas):
+    """
+    Arma ``rutina`` con ``filas`` (dicts o ``DetalleRutina`` sin guardar), en
+    orden.  Devuelve la cantidad de filas nuevas insertadas.
+    """
+    return guardar_filas_en_lote([(rutina, filas)])
+
+
+def guardar_filas_en_lote(versiones, tamanio_lote=None):
+    """
+    Como ``guardar_filas`` para varias rutinas a la vez: ``versiones`` es una
+    lista de ``(rutina, filas)``.  Las consultas no dependen de la cantidad de
+    rutinas (salvo por el corte en lotes de los ``bulk_create``).
+    """
+    armadas = []
+    contenidos = {}
+    for rutina, filas in versiones:
+        huellas = []
+        for fila in filas:
+            contenido = contenido_fila(fila)
+            huella = huella_detalle(contenido)
+            contenidos.setdefault(huella, (rutina, contenido))
+            huellas.append(huella)
+        armadas.append((rutina, huellas))
+
+    existentes, nuevas = ids_por_huella(contenidos, tamanio_lote)
+    FilaRutina.objects.bulk_create(
+        [
+            FilaRutina(rutina=rutina, detalle_id=existentes[huella], orden=orden)
+            for rutina, huellas in armadas
+            for orden, huella in enumerate(huellas)
+        ],
+        batch_size=tamanio_lote,
+    )
+    return nuevas
+
+
+def ids_por_huella(contenidos, tamanio_lote=None):
+    """
+    ``{huella: id}`` de las filas de ``contenidos`` (``{huella: (rutina,
+    contenido)}``): reutiliza las que ya existen e inserta el resto, que
+    quedan creadas en ``rutina``.  Devuelve también cuántas se insertaron.
+    """
+    existentes = {}
+    pendientes = list(contenidos)
+    for inicio in range(0, len(pendientes), LOTE_HUELLAS):
+        existentes.update(
+            DetalleRutina.objects.filter(huella__in=pendientes[inicio:inicio + LOTE_HUELLAS])
+            .values_list("huella", "id")
+        )
+    nuevas = [
+        DetalleRutina(rutina=rutina, huella=huella, **contenido)
+        for huella, (rutina, contenido) in contenidos.items()
+        if huella not in existentes
+    ]
+    # bulk_create no pasa por save(): la huella ya viene calculada y las
+    # posiciones las crea quien llama.
+    for detalle in DetalleRutina.objects.bulk_create(nuevas, batch_size=tamanio_lote):
+        existentes[detalle.huella] = detalle.id
+    return existentes, len(nuevas)
+
+
+def crear_version(base, filas, semana=None):
+    """Nueva versión de ``base`` con ``filas``; devuelve la rutina creada."""
+    nueva = Rutina.objects.create(
+        member=base.member,
+        estructura=base.estructura,
+        semana=semana or getattr(base, "semana", 1) or 1,
+    )
+    guardar_filas(nueva, filas)
+    return nueva
+
+
+def copiar_filas(origen, destino):
+    """Copia la composición de ``origen`` en ``destino`` sin duplicar filas."""
+    FilaRutina.objects.bulk_create([
+        FilaRutina(rutina=destino, detalle_id=detalle_id, orden=orden)
+        for detalle_id, orden in origen.filas.order_by("orden").values_list("detalle_id", "orden")
+    ])
+
+
+def borrar_filas_huerfanas():
+    """
+    Borra las filas que ya no pertenecen a ninguna rutina.  Solo puede pasar
+    si se borró la rutina que las creó (``rutina`` queda en NULL), así que no
+    hace falta recorrer toda la tabla.
+    """
+    return DetalleRutina.objects.filter(rutina__isnull=True, filas__isnull=True).delete()[0]
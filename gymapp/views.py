@@ -1,62 +1,115 @@
 from datetime import date, datetime
 import json
-import openpyxl
-from django.db.models import Q, Prefetch
-from django.http import HttpResponse
+from django.db.models import F
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.conf import settings
 from django.contrib import messages
 from django.db import transaction
+from django.utils import timezone
 
 from .forms import (
+    ImportarSociosForm,
     MemberForm,
     MemberInfoForm,
     DetalleRutinaFormSet,
     DetalleRutinaPayloadForm,
+    contenido_payload,
+    validar_filas_payload,
 )
-from .models import Member, Payment, Ejercicio, Rutina, DetalleRutina, ComentarioRutina
+from .models import Member, Payment, Rutina, ComentarioRutina, RutinaArchivada, Tarea
+from .busqueda import abuscar_socios, buscar_socios
+from .cambios import (
+    FORMATOS as FORMATOS_CAMBIOS,
+    TABLAS as TABLAS_CAMBIOS,
+    encabezados_cambios,
+    filas_cambios,
+    formatear_marca,
+    generar_jsonl,
+    leer_marca,
+    marca_siguiente,
+)
+from .catalogo import catalogo, indice_ejercicios, version_catalogo
+from .estructuras import CATEGORIAS as CATEGORIAS_RUTINA, estructura as estructura_rutina
+from .exportacion import (
+    FORMATOS,
+    encabezados_socios,
+    filas_socios,
+    generar_csv,
+    xlsx_en_archivo_temporal,
+)
+from .fragmentos import estadisticas as estadisticas_filas, renderizar_filas
+from .importacion import ErrorImportacion, importar_socios, leer_filas
+from .pagos import CODIGOS, leer_mes, marcar_pagos, matriz_pagos, rango_meses
+from .paginacion import apaginar_por_claves, tamanio_pagina, url_siguiente
+from .parches import ErrorParche, aplicar_parche
+from .portal import acceso_portal, aes_personal, cerrar_portal, iniciar_portal
+from .recaudacion import resumen_por_mes
+from .retencion import restaurar
+from .tareas import archivo_resultado, encolar, guardar_entrada
+from .versionado import borrar_filas_huerfanas, copiar_filas, crear_version
+
+from django.views.decorators.http import condition, require_POST
 
-from django.views.decorators.http import require_POST
+from gym.routers import solo_lectura
 
 
+# Orden estable de los listados de socios.  Coincide con el índice
+# ``member_nombre_id_idx`` para que la paginación por cursor sea barata.
+ORDEN_SOCIOS = ("nombre_apellido", "id")
+LIMITE_TYPEAHEAD = 20
+LIMITE_TYPEAHEAD_MAX = 50
+
 
 # === Socios ===
 
+@solo_lectura()
 def member_list(request):
     q = (request.GET.get('q') or '').strip()
+    cursor = request.GET.get('cursor') or ''
+    por_pagina = tamanio_pagina(request)
+
+    # Búsqueda por el índice de socios (sin acentos, por prefijo y ordenada
+    # por relevancia).  Sin búsqueda, paginación por cursor sobre
+    # (nombre_apellido, id): cada página cuesta lo mismo aunque la tabla crezca.
+    members, siguiente_cursor = buscar_socios(q, cursor, por_pagina, ORDEN_SOCIOS)
 
-    # Lista de socios (con tu búsqueda actual)
-    members = Member.objects.all().order_by('nombre_apellido')
-    if q:
-        members = members.filter(
-            Q(nombre_apellido__icontains=q) |
-            Q(dni__icontains=q) |
-            Q(telefono__icontains=q) |
-            Q(gmail__icontains=q)
+    # Solo se renderizan las filas de socios que cambiaron desde la última vez.
+    filas, aciertos, fallos = renderizar_filas(request, members, 'gymapp/partials/_member_list_row.html')
+    context = {
+        'members': members,
+        'filas': filas,
+        'cursor': cursor,
+        'siguiente_url': url_siguiente(request, siguiente_cursor),
+    }
+    # El scroll infinito pide las páginas siguientes por AJAX: solo filas.
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return _con_cache_filas(
+            render(request, 'gymapp/partials/_member_list_rows.html', context), aciertos, fallos,
         )
 
     # Mes actual (día 1)
     today = date.today()
     current_month = today.replace(day=1)
 
-    # IDs de socios con pago del mes actual (pagado=True y no anulado)
-    pagos_ids = set(
-        Payment.objects.filter(
-            mes=current_month,
-            pagado=True,
-            anulado=False
-        ).values_list('member_id', flat=True)
-    )
+    # Deudores = socios SIN pago vigente del mes actual.  Una sola consulta
+    # (NOT EXISTS sobre el índice parcial de pagos), sin listas de ids.
+    deudores = Member.objects.deudores(current_month).order_by('nombre_apellido', 'id')
+    limite = settings.DEUDORES_SIDEBAR_MAX
 
-    # Deudores = socios SIN pago del mes actual
-    deudores = Member.objects.exclude(id__in=pagos_ids).order_by('nombre_apellido')
+    context.update({
+        'deudores': deudores[:limite],
+        'deudores_restantes': max(deudores.count() - limite, 0),
+        'current_month': current_month, # <<< NUEVO (para mostrar "Octubre 2025", etc.)
+        'planes': Payment.PLAN_CHOICES,
+    })
+    return _con_cache_filas(render(request, 'gymapp/member_list.html', context), aciertos, fallos)
 
-    context = {
-        'members': members,
-        'pagos_ids': pagos_ids,        # lo mantenemos por compatibilidad si lo usás en el template
-        'deudores': deudores,          # <<< NUEVO
-        'current_month': current_month # <<< NUEVO (para mostrar "Octubre 2025", etc.)
-    }
-    return render(request, 'gymapp/member_list.html', context)
+
+def _con_cache_filas(response, aciertos, fallos):
+    response["X-Cache-Filas"] = f"aciertos={aciertos}; fallos={fallos}"
+    return response
 
 
 def add_member(request):
@@ -85,7 +138,9 @@ def edit_member(request, pk):
 def delete_member(request, pk):
     member = get_object_or_404(Member, pk=pk)
     if request.method == "POST":
-        member.delete()
+        with transaction.atomic():
+            member.delete()
+            borrar_filas_huerfanas()
         return redirect('member_list')
     return render(request, 'gymapp/confirm_delete.html', {'member': member})
 
@@ -117,6 +172,54 @@ def toggle_payment(request, member_id):
     return redirect('member_list')
 
 
+@require_POST
+def marcar_pagos_socios(request):
+    """
+    Marca (``accion=marcar``) o desmarca (``accion=desmarcar``) el mes ``mes``
+    (``MM-YYYY``, por defecto el actual) para todos los ``socios`` enviados,
+    con ``plan`` opcional, en una transacción.  Responde con los pagos
+    resultantes en JSON en lugar de redirigir.
+    """
+    accion = request.POST.get("accion", "marcar")
+    plan = request.POST.get("plan") or None
+    if accion not in ("marcar", "desmarcar"):
+        return JsonResponse({"error": "Acción inválida."}, status=400)
+    if plan is not None and plan not in Payment.PRECIOS:
+        return JsonResponse({"error": "Plan inválido."}, status=400)
+    try:
+        ids = {int(valor) for valor in request.POST.getlist("socios")}
+    except ValueError:
+        return JsonResponse({"error": "Socios inválidos."}, status=400)
+    if not ids:
+        return JsonResponse({"error": "No se seleccionó ningún socio."}, status=400)
+    if len(ids) > settings.PAGOS_MASIVOS_MAX:
+        return JsonResponse(
+            {"error": f"Se pueden marcar hasta {settings.PAGOS_MASIVOS_MAX} socios por vez."},
+            status=400,
+        )
+    mes = leer_mes(request.POST.get("mes")) or date.today().replace(day=1)
+
+    existentes = set(Member.objects.filter(id__in=ids).values_list("id", flat=True))
+    with transaction.atomic():
+        pagos = marcar_pagos(sorted(existentes), mes, pagado=(accion == "marcar"), plan=plan)
+    return JsonResponse({
+        "mes": mes.strftime("%m-%Y"),
+        "pagos": [
+            {
+                "id": pago.id,
+                "member_id": pago.member_id,
+                "pagado": pago.pagado,
+                "anulado": pago.anulado,
+                "plan": pago.plan,
+                "monto": pago.monto,
+            }
+            for pago in pagos
+        ],
+        "no_encontrados": sorted(ids - existentes),
+    })
+
+
+@solo_lectura()
 def historial_pagos(request, member_id):
     from datetime import date as _date
     member = get_object_or_404(Member, pk=member_id)
@@ -153,6 +256,93 @@ def historial_pagos(request, member_id):
     })
 
 
+@solo_lectura()
+def matriz_pagos_socios(request):
+    """
+    Grilla socios × meses en JSON: ``?desde=MM-YYYY&hasta=MM-YYYY`` (por
+    defecto los últimos 12 meses), ``q`` para filtrar socios y paginación por
+    cursor sobre los socios.  Dos consultas por página: socios y pagos.
+    """
+    meses = rango_meses(
+        leer_mes(request.GET.get("desde")),
+        leer_mes(request.GET.get("hasta")),
+        settings.MATRIZ_PAGOS_MESES_MAX,
+    )
+    por_pagina = tamanio_pagina(
+        request, settings.MATRIZ_SOCIOS_POR_PAGINA, settings.MATRIZ_SOCIOS_POR_PAGINA_MAX,
+    )
+    socios, siguiente_cursor = buscar_socios(
+        (request.GET.get("q") or "").strip(),
+        request.GET.get("cursor") or "",
+        por_pagina,
+        ORDEN_SOCIOS,
+        queryset=Member.objects.only("id", "dni", "nombre_apellido", "fecha_alta"),
+    )
+    estados = matriz_pagos(socios, meses)
+    return JsonResponse({
+        "meses": [mes.strftime("%m-%Y") for mes in meses],
+        "codigos": CODIGOS,
+        "socios": [
+            {
+                "id": socio.id,
+                "dni": socio.dni,
+                "nombre": socio.nombre_apellido,
+                "estados": estados[socio.id],
+            }
+            for socio in socios
+        ],
+        "siguiente": url_siguiente(request, siguiente_cursor),
+    })
+
+
+@solo_lectura()
+def recaudacion(request):
+    """
+    Reporte de recaudación por mes y plan (``?desde=&hasta=``, por defecto
+    los últimos 12 meses).  Lee ``ResumenRecaudacion``: unas decenas de filas
+    sin importar cuántos pagos haya.  ``?formato=json`` para tableros.
+    """
+    meses = rango_meses(
+        leer_mes(request.GET.get("desde")),
+        leer_mes(request.GET.get("hasta")),
+        settings.MATRIZ_PAGOS_MESES_MAX,
+    )
+    filas = resumen_por_mes(meses)
+    if request.GET.get("formato") == "json":
+        return JsonResponse({
+            "meses": [
+                {
+                    "mes": fila["mes"].strftime("%m-%Y"),
+                    "cantidad": fila["cantidad"],
+                    "total": fila["total"],
+                    "planes": {
+                        plan: {"cantidad": cantidad, "total": total}
+                        for plan, (cantidad, total) in fila["planes"].items()
+                    },
+                }
+                for fila in filas
+            ],
+        })
+
+    planes = [("", "Sin plan")] + list(Payment.PLAN_CHOICES)
+    for fila in filas:
+        fila["columnas"] = [fila["planes"].get(plan, (0, 0)) for plan, _ in planes]
+    return render(request, "gymapp/recaudacion.html", {
+        "filas": filas,
+        "planes": planes,
+        "desde": meses[0],
+        "hasta": meses[-1],
+        "cantidad_total": sum(fila["cantidad"] for fila in filas),
+        "total": sum(fila["total"] for fila in filas),
+    })
+
+
+@require_POST
+def reconstruir_recaudacion(request):
+    """Encola la reconstrucción del resumen de recaudación desde todos los pagos."""
+    return _respuesta_tarea(request, encolar("reconstruir_recaudacion"))
+
+
 @require_POST
 def eliminar_pago(request, pago_id):
     """
@@ -194,39 +384,157 @@ def toggle_payment_mes(request, member_id, mes):
 
 
 def export_members_excel(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Socios"
-
-    headers = [
-        "Nombre y Apellido", "DNI", "Gmail", "Teléfono", "Dirección", "Edad",
-        "Historial Deportivo", "Experiencias Gimnasios", "Historial Lesivo",
-        "Enfermedades", "Objetivos", "Frecuencia Semana"
-    ]
-    ws.append(headers)
-
-    for m in Member.objects.all():
-        ws.append([
-            m.nombre_apellido or "",
-            m.dni or "",
-            m.gmail or "",
-            m.telefono or "",
-            m.direccion or "",
-            m.edad or "",
-            m.historial_deportivo or "",
-            m.experiencias_gimnasios or "",
-            m.historial_lesivo or "",
-            m.enfermedades or "",
-            m.objetivos or "",
-            m.frecuencia_semana or ""
-        ])
-
-    response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response["Content-Disposition"] = 'attachment; filename="socios.xlsx"'
-    wb.save(response)
+    """
+    Exporta los socios sin cargar la tabla entera en memoria.
+
+    ``?formato=xlsx`` (por defecto) arma la planilla en modo write-only sobre
+    un archivo temporal y la envía por bloques; ``csv`` y ``csv.gz`` se
+    generan y envían fila a fila con ``StreamingHttpResponse``.  Con
+    ``?segundo_plano=1`` el archivo lo genera el worker (ver ``tareas.py``).
+    """
+    formato = request.GET.get("formato", "xlsx")
+    if formato not in FORMATOS:
+        formato = "xlsx"
+    if request.GET.get("segundo_plano"):
+        return _respuesta_tarea(request, encolar("exportar_socios", formato=formato))
+    content_type, nombre = FORMATOS[formato]
+
+    filas = filas_socios()
+    if formato == "xlsx":
+        archivo = xlsx_en_archivo_temporal(filas, encabezados_socios())
+        return FileResponse(
+            archivo, as_attachment=True, filename=nombre, content_type=content_type
+        )
+
+    response = StreamingHttpResponse(
+        generar_csv(filas, encabezados_socios(), comprimir=(formato == "csv.gz")),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{nombre}"'
     return response
 
 
+def export_cambios(request):
+    """
+    Socios o pagos (``?tabla=socios|pagos``) modificados o borrados desde
+    ``?desde=<marca>``, en JSONL (por defecto) o CSV (``?formato=csv``) y en
+    streaming.  La marca para la próxima exportación va en el encabezado
+    ``X-Marca-Siguiente`` (ver ``cambios.py``).
+    """
+    tabla = request.GET.get("tabla", "socios")
+    formato = request.GET.get("formato", "jsonl")
+    if tabla not in TABLAS_CAMBIOS or formato not in FORMATOS_CAMBIOS:
+        return JsonResponse({"error": "tabla: socios|pagos; formato: jsonl|csv."}, status=400)
+    desde = None
+    if request.GET.get("desde"):
+        try:
+            desde = leer_marca(request.GET["desde"])
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+
+    # Antes de leer: lo que se confirme durante la exportación entra en la próxima.
+    marca = marca_siguiente()
+    filas = filas_cambios(tabla, desde)
+    if formato == "jsonl":
+        contenido = generar_jsonl(filas)
+    else:
+        encabezados = encabezados_cambios(tabla)
+        contenido = generar_csv(([fila[c] for c in encabezados] for fila in filas), encabezados)
+    response = StreamingHttpResponse(contenido, content_type=FORMATOS_CAMBIOS[formato])
+    response["Content-Disposition"] = f'attachment; filename="{tabla}-cambios.{formato}"'
+    response["X-Marca-Siguiente"] = formatear_marca(marca)
+    return response
+
+
+def import_members(request):
+    """
+    Importa socios desde un Excel o CSV subido (ver ``importacion.py``) y
+    muestra el informe: creados, actualizados y errores por fila.  Los
+    archivos grandes se pueden dejar al worker (``segundo_plano``).
+    """
+    informe = None
+    if request.method == "POST":
+        form = ImportarSociosForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data["archivo"]
+            if form.cleaned_data["segundo_plano"]:
+                return _respuesta_tarea(request, encolar(
+                    "importar_socios",
+                    archivo=str(guardar_entrada(archivo)),
+                    nombre=archivo.name,
+                    simular=form.cleaned_data["simular"],
+                ))
+            try:
+                informe = importar_socios(
+                    leer_filas(archivo, archivo.name), simular=form.cleaned_data["simular"],
+                )
+            except ErrorImportacion as error:
+                form.add_error("archivo", str(error))
+    else:
+        form = ImportarSociosForm()
+    return render(request, "gymapp/importar_socios.html", {
+        "form": form,
+        "informe": informe,
+        "simulado": form.is_bound and form.cleaned_data.get("simular"),
+        "errores": informe.errores[:settings.IMPORT_ERRORES_VISIBLES] if informe else [],
+    })
+
+
+# === Tareas en segundo plano ===
+def _pide_json(request):
+    return (
+        request.headers.get("x-requested-with") == "XMLHttpRequest"
+        or "application/json" in request.headers.get("Accept", "")
+    )
+
+
+def _respuesta_tarea(request, tarea):
+    """
+    Respuesta de una vista que encoló ``tarea``: 202 con el id y la URL de
+    estado para AJAX/JSON; en el navegador, redirige a la página de estado.
+    """
+    url = reverse("estado_tarea", args=[tarea.id])
+    if not _pide_json(request):
+        return redirect(url)
+    response = JsonResponse({"id": tarea.id, "estado": tarea.estado, "url": url}, status=202)
+    response["Location"] = url
+    return response
+
+
+def estado_tarea(request, tarea_id):
+    """
+    Estado de una tarea y, cuando terminó, su informe y el enlace de
+    descarga.  La página se recarga sola mientras la tarea espera;
+    ``?formato=json`` (o un pedido AJAX) devuelve lo mismo en JSON.
+    """
+    tarea = get_object_or_404(Tarea, id=tarea_id)
+    descarga = None
+    if tarea.estado == Tarea.LISTA and tarea.archivo:
+        descarga = reverse("descargar_tarea", args=[tarea.id])
+    if request.GET.get("formato") == "json" or _pide_json(request):
+        return JsonResponse({
+            "id": tarea.id,
+            "tipo": tarea.tipo,
+            "estado": tarea.estado,
+            "creada": tarea.creada,
+            "iniciada": tarea.iniciada,
+            "terminada": tarea.terminada,
+            "resultado": tarea.resultado,
+            "error": tarea.error,
+            "descarga": descarga,
+        })
+    return render(request, "gymapp/tarea.html", {"tarea": tarea, "descarga": descarga})
+
+
+def descargar_tarea(request, tarea_id):
+    tarea = get_object_or_404(Tarea.objects.exclude(archivo=""), id=tarea_id, estado=Tarea.LISTA)
+    try:
+        archivo = archivo_resultado(tarea).open("rb")
+    except FileNotFoundError:
+        raise Http404("El archivo de la tarea ya no está.")
+    return FileResponse(archivo, as_attachment=True, filename=tarea.nombre_archivo)
+
+
 def login_cliente(request):
     if request.method == "POST":
         dni = request.POST.get("dni", "").strip()
@@ -235,38 +543,52 @@ def login_cliente(request):
             return redirect("login_cliente")
         try:
             member = Member.objects.get(dni=dni)
-            request.session["cliente_id"] = member.id
-            messages.success(request, f"Bienvenido, {member.nombre_apellido}.")
-            return redirect("mis_rutinas", member.id)
         except Member.DoesNotExist:
             messages.error(request, "DNI no registrado. Verificá los datos.")
             return redirect("login_cliente")
+        # Cookie firmada en lugar de sesión: el portal no escribe en la base.
+        messages.success(request, f"Bienvenido, {member.nombre_apellido}.")
+        return iniciar_portal(redirect("mis_rutinas", member.id), member)
     return render(request, "gymapp/login_cliente.html")
 
 
-def member_rows_partial(request):
-    q = request.GET.get("q") or ""
-    members = Member.objects.filter(
-        Q(nombre_apellido__icontains=q) |
-        Q(gmail__icontains=q) |
-        Q(telefono__icontains=q) |
-        Q(dni__icontains=q)
-    ).order_by("nombre_apellido")
+@require_POST
+def logout_cliente(request):
+    return cerrar_portal(redirect("login_cliente"))
+
 
+@solo_lectura()
+async def member_rows_partial(request):
+    # Async: la búsqueda en vivo es la vista más pedida en horas pico y bajo
+    # ASGI no retiene un hilo del servidor mientras espera a la base.
+    q = request.GET.get("q") or ""
+    cursor = request.GET.get("cursor") or ""
     current_month = date.today().replace(day=1)
-    pagos_ids = set(
-        p.member_id for p in Payment.objects.filter(
-            anulado=False,
-            pagado=True,
-            mes=current_month,
-        )
+    # Cada socio trae su estado de pago del mes como anotación (EXISTS).
+    members, siguiente_cursor = await abuscar_socios(
+        q, cursor, tamanio_pagina(request), ORDEN_SOCIOS,
+        queryset=Member.objects.con_estado_pago(current_month),
     )
 
-    return render(request, "gymapp/partials/_member_rows.html", {
+    # El estado de pago del mes no se cachea: con una caché por proceso, los
+    # otros procesos mostrarían el estado viejo hasta que venza la fila.
+    filas, aciertos, fallos = renderizar_filas(
+        request, members, "gymapp/partials/_member_row.html",
+        {"current_month": current_month}, variable="gymapp/partials/_member_row_pago.html",
+    )
+    response = render(request, "gymapp/partials/_member_rows.html", {
         "members": members,
-        "pagos_ids": pagos_ids,
+        "filas": filas,
         "current_month": current_month,
+        "cursor": cursor,
+        "siguiente_url": url_siguiente(request, siguiente_cursor),
     })
+    return _con_cache_filas(response, aciertos, fallos)
+
+
+def estadisticas_cache_filas(request):
+    """Aciertos y fallos de la caché de filas de socios (ver ``fragmentos.py``)."""
+    return JsonResponse(estadisticas_filas())
 
 
 def update_member_info(request, member_id):
@@ -280,12 +602,52 @@ def update_member_info(request, member_id):
 
 # === Rutinas ===
 
+def _etag_catalogo(request):
+    return version_catalogo()
+
+
+@solo_lectura()
+@condition(etag_func=_etag_catalogo)
+def catalogo_ejercicios(request):
+    """
+    Catálogo de ejercicios en JSON para los editores de rutinas.
+
+    Pedido con ``?v=<version>`` vigente se puede cachear por un año (la URL
+    cambia cuando cambia el catálogo); sin versión o con una vieja, el
+    navegador revalida con ETag y recibe 304 si no hubo cambios.
+    """
+    version, ejercicios = catalogo()
+    response = JsonResponse({"version": version, "ejercicios": ejercicios})
+    if request.GET.get("v") == version:
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response["Cache-Control"] = "no-cache"
+    return response
+
+
+@solo_lectura()
+def buscar_ejercicios(request):
+    """
+    Typeahead de ejercicios: ``?q=<texto>&limite=<n>`` devuelve los mejores
+    ``n`` resultados del índice en memoria (ver ``catalogo.IndiceEjercicios``).
+    """
+    try:
+        limite = int(request.GET.get("limite", LIMITE_TYPEAHEAD))
+    except (TypeError, ValueError):
+        limite = LIMITE_TYPEAHEAD
+    limite = max(1, min(limite, LIMITE_TYPEAHEAD_MAX))
+    indice = indice_ejercicios()
+    resultados = indice.buscar(request.GET.get("q", ""), limite)
+    return JsonResponse({"version": indice.version, "resultados": resultados})
+
+
+def _url_catalogo():
+    return f"{reverse('catalogo_ejercicios')}?v={version_catalogo()}"
+
+
 def rutina_cliente(request, member_id):
     member = get_object_or_404(Member, pk=member_id)
-    rutinas = member.rutinas.order_by("-fecha_creacion").prefetch_related(
-        "detalles__ejercicio",
-        "comentario",
-    )
+    rutinas = member.rutinas.order_by("-fecha_creacion").select_related("comentario")
 
     if request.method == "POST":
         ultima = rutinas.first()
@@ -295,13 +657,8 @@ def rutina_cliente(request, member_id):
                 estructura=ultima.estructura,
                 semana=ultima.semana,
             )
-            detalles = ultima.detalles.select_related("ejercicio").values(
-                "categoria", "ejercicio_id", "series", "repeticiones", "peso",
-                "descanso", "rir", "sensaciones", "notas", "es_calentamiento",
-            )
-            DetalleRutina.objects.bulk_create(
-                [DetalleRutina(rutina=nueva, **d) for d in detalles]
-            )
+            # La copia comparte las filas de la última versión.
+            copiar_filas(ultima, nueva)
             if hasattr(ultima, "comentario"):
                 ComentarioRutina.objects.create(rutina=nueva, texto=ultima.comentario.texto)
         else:
@@ -311,7 +668,10 @@ def rutina_cliente(request, member_id):
 
     return render(request, "gymapp/rutina_cliente.html", {
         "member": member,
-        "rutinas": rutinas
+        "rutinas": rutinas,
+        # Versiones sacadas del historial por ``compactar_rutinas``; el
+        # contenido solo se lee al restaurar.
+        "archivadas": member.rutinas_archivadas.order_by("-fecha_creacion").defer("datos"),
     })
 
 
@@ -341,13 +701,7 @@ def editar_rutina(request, rutina_id):
     Render de edición. Mantiene compatibilidad con POST por formset (flujo viejo)
     y en GET arma 'filas' para el nuevo template con tabla editable.
     """
-    rutina = get_object_or_404(Rutina, pk=rutina_id)
-    ejercicios = Ejercicio.objects.all().order_by("nombre")
-    categorias = [
-        "Pectorales", "Espalda", "Deltoides", "Bíceps", "Tríceps",
-        "Cuádriceps", "Isquiotibiales", "Pantorrilla", "Abdomen",
-        "Trapecios", "Antebrazos"
-    ]
+    rutina = get_object_or_404(Rutina.objects.select_related("member", "comentario"), pk=rutina_id)
 
     # === Flujo viejo (formset) ===
     if request.method == "POST":
@@ -395,19 +749,10 @@ def editar_rutina(request, rutina_id):
                 # Al crear una nueva versión, preservamos la semana de la rutina
                 # original para que la información de semana no se pierda al
                 # versionar mediante el flujo antiguo (formset).
-                nueva = Rutina.objects.create(
-                    member=rutina.member,
-                    estructura=rutina.estructura,
-                    semana=getattr(rutina, "semana", 1),
+                nueva = crear_version(
+                    rutina,
+                    [form.cleaned_data for form in formset.forms if form.cleaned_data],
                 )
-                nuevos = []
-                for form in formset.forms:
-                    if form.cleaned_data:
-                        data = form.cleaned_data.copy()
-                        data.pop("rutina", None)
-                        nuevos.append(DetalleRutina(rutina=nueva, **data))
-                if nuevos:
-                    DetalleRutina.objects.bulk_create(nuevos)
 
                 texto = request.POST.get("comentario", "")
                 if not texto and hasattr(rutina, "comentario"):
@@ -421,18 +766,10 @@ def editar_rutina(request, rutina_id):
             messages.error(request, "Revisá los datos: hay campos inválidos o incompletos.")
 
     # === GET: armar contexto para el template nuevo ===
-    filas_ctx = []
-    for d in rutina.detalles.filter(es_calentamiento=False).select_related("ejercicio"):
-        filas_ctx.append({
-            "id": d.id,
-            "ejercicio_id": d.ejercicio_id or "",
-            "series": d.series or "",
-            "reps": d.repeticiones or "",
-            "kilos": d.peso or "",
-            # Incluir campo RIR (Rate of Perceived Exertion inverso) en el contexto
-            "rir": d.rir or "",
-            "notas": d.notas or "",
-        })
+    # Una sola consulta de filas, repartidas entre las secciones de la
+    # estructura (ver ``estructuras.py``).
+    editor = estructura_rutina(rutina.estructura)
+    detalles = list(rutina.detalles_en_orden().select_related("ejercicio"))
 
     # Construcción de la lista de semanas (por defecto 1..8).  El valor
     # seleccionado por defecto se obtiene de la propia rutina si posee la
@@ -440,258 +777,20 @@ def editar_rutina(request, rutina_id):
     # experiencia al mantener la semana elegida al crear nuevas versiones.
     semanas = [{"id": i, "numero": i} for i in range(1, 9)]  # 1..8
     semana_activa_id = getattr(rutina, "semana", 1) or 1
-    vista_por_semanas = False
 
     contexto = {
         "rutina": rutina,
-        "ejercicios": ejercicios,
-        "categorias": categorias,
-        # compat con template viejo
-        "detalles": rutina.detalles.filter(es_calentamiento=False),
-        "calentamiento": rutina.detalles.filter(es_calentamiento=True),
+        # El catálogo de ejercicios se descarga una vez desde esta URL
+        # versionada; las filas solo traen el ejercicio elegido.
+        "catalogo_url": _url_catalogo(),
+        "categorias": CATEGORIAS_RUTINA,
         "comentario": getattr(rutina, "comentario", None),
-        # usado por el template nuevo
-        "filas": filas_ctx,
         "semanas": semanas,
         "semana_activa_id": semana_activa_id,
-        "vista_por_semanas": vista_por_semanas,
+        "vista_por_semanas": False,
+        **editor.contexto(detalles),
     }
-
-    # --- Soporte para estructura "Fuerza base" ---
-    # Si la rutina es de tipo fuerza_base, armamos un contexto adicional con
-    # 2 secciones: "Parte Inicial" (calentamiento) y "Parte Principal" (4
-    # grupos musculares predefinidos).  Cada detalle de la rutina se
-    # clasifica como calentamiento (es_calentamiento=True) o principal.
-    if rutina.estructura == "fuerza_base":
-        # Construir filas para el calentamiento: un dict por fila con las
-        # mismas claves que el nuevo front.  Si no hay registros, se
-        # devuelve una lista vacía para que el front genere 3 filas por
-        # defecto.
-        filas_cal = []
-        for d in rutina.detalles.filter(es_calentamiento=True).select_related("ejercicio"):
-            filas_cal.append({
-                "id": d.id,
-                "ejercicio_id": d.ejercicio_id or "",
-                "series": d.series or "",
-                "reps": d.repeticiones or "",
-                "kilos": d.peso or "",
-                "rir": d.rir or "",
-                "notas": d.notas or "",
-            })
-
-        # Definir las categorías predeterminadas para la parte principal.
-        categorias_fb = [
-            "Cadena anterior",
-            "Tracciones",
-            "Cadena posterior",
-            "Empujes",
-        ]
-        filas_principal = []
-        # Creamos un mapa para acceder rápidamente al primer detalle por
-        # categoría.  Esto asegura que si existen múltiples ejercicios bajo
-        # la misma categoría (caso excepcional), solo se considere el
-        # primero.
-        detalles_por_cat = {}
-        for d in rutina.detalles.filter(es_calentamiento=False).select_related("ejercicio"):
-            cat = d.categoria or ""
-            # Normalizar categoría: se compara de forma insensible a mayúsculas
-            # para evitar duplicados causados por diferencias de capitalización.
-            cat_key = cat.strip().lower()
-            if cat_key and cat_key not in detalles_por_cat:
-                detalles_por_cat[cat_key] = d
-
-        for cat in categorias_fb:
-            key = cat.strip().lower()
-            det = detalles_por_cat.get(key)
-            filas_principal.append({
-                "categoria": cat,
-                "ejercicio_id": det.ejercicio_id or "" if det else "",
-                "series": det.series or "" if det else "",
-                "reps": det.repeticiones or "" if det else "",
-                "kilos": det.peso or "" if det else "",
-                "rir": det.rir or "" if det else "",
-                "notas": det.notas or "" if det else "",
-            })
-
-        contexto.update({
-            "filas_calentamiento": filas_cal,
-            "filas_principal": filas_principal,
-        })
-        return render(request, "gymapp/editar_rutina_fuerza_base.html", contexto)
-
-    elif rutina.estructura == "acondicionamiento":
-        # Estructura similar a Fuerza base, pero sin columna RIR
-        # y con un grupo adicional en la parte principal: "Variabilidad de movimiento".
-        # Calentamiento
-        filas_cal = []
-        for d in rutina.detalles.filter(es_calentamiento=True).select_related("ejercicio"):
-            filas_cal.append({
-                "id": d.id,
-                "ejercicio_id": d.ejercicio_id or "",
-                "series": d.series or "",
-                "reps": d.repeticiones or "",
-                "kilos": d.peso or "",
-                # "rir" intencionalmente omitido en UI; igual si viene se ignora
-                "notas": d.notas or "",
-            })
-        if not filas_cal:
-            filas_cal = [{"id": None, "ejercicio_id": "", "series": "", "reps": "", "kilos": "", "notas": ""} for _ in range(3)]
-
-        # Parte principal con categorías sugeridas
-        categorias_ac = [
-            "Cadena anterior",
-            "Tracciones",
-            "Cadena posterior",
-            "Empujes",
-            "Variabilidad de movimiento",
-        ]
-
-        filas_principal = []
-        detalles_por_cat = {}
-        for d in rutina.detalles.filter(es_calentamiento=False).select_related("ejercicio"):
-            cat = (d.categoria or "").strip()
-            key = cat.lower()
-            if key and key not in detalles_por_cat:
-                detalles_por_cat[key] = d
-
-        for cat in categorias_ac:
-            key = cat.strip().lower()
-            det = detalles_por_cat.get(key)
-            if det:
-                filas_principal.append({
-                    "id": det.id,
-                    "categoria": cat,
-                    "ejercicio_id": det.ejercicio_id or "",
-                    "series": det.series or "",
-                    "reps": det.repeticiones or "",
-                    "kilos": det.peso or "",
-                    "notas": det.notas or "",
-                })
-            else:
-                filas_principal.append({
-                    "id": None,
-                    "categoria": cat,
-                    "ejercicio_id": "",
-                    "series": "",
-                    "reps": "",
-                    "kilos": "",
-                    "notas": "",
-                })
-
-        contexto.update({
-            "filas_calentamiento": filas_cal,
-            "filas_principal": filas_principal,
-        })
-        return render(request, "gymapp/editar_rutina_acondicionamiento.html", contexto)
-    
-    elif rutina.estructura == "iniciacion":
-        # Iniciación: igual a acondicionamiento pero con:
-        # - Parte inicial: exactamente 5 ejercicios
-        # - Parte principal: exactamente 2 ejercicios (sin columna de categoría/grupo)
-        filas_cal = []
-        for d in rutina.detalles.filter(es_calentamiento=True).select_related("ejercicio"):
-            filas_cal.append({
-                "id": d.id,
-                "ejercicio_id": d.ejercicio_id or "",
-                "series": d.series or "",
-                "reps": d.repeticiones or "",
-                "kilos": d.peso or "",
-                "rir": d.rir or "",
-                "notas": d.notas or "",
-            })
-        # Forzar 5 filas
-        if len(filas_cal) < 5:
-            for _ in range(5 - len(filas_cal)):
-                filas_cal.append({"id": None, "ejercicio_id": "", "series": "", "reps": "", "kilos": "", "rir": "", "notas": ""})
-        else:
-            filas_cal = filas_cal[:5]
-
-        filas_principal = []
-        existentes = list(rutina.detalles.filter(es_calentamiento=False).select_related("ejercicio"))[:2]
-        for d in existentes:
-            filas_principal.append({
-                "id": d.id,
-                "ejercicio_id": d.ejercicio_id or "",
-                "series": d.series or "",
-                "reps": d.repeticiones or "",
-                "kilos": d.peso or "",
-                "rir": d.rir or "",
-                "notas": d.notas or "",
-            })
-        # Completar hasta 2
-        while len(filas_principal) < 2:
-            filas_principal.append({"id": None, "ejercicio_id": "", "series": "", "reps": "", "kilos": "", "rir": "", "notas": ""})
-
-        contexto.update({
-            "filas_calentamiento": filas_cal,
-            "filas_principal": filas_principal,
-        })
-        return render(request, "gymapp/editar_rutina_iniciacion.html", contexto)
-    elif rutina.estructura == "deportista":
-        # Parte inicial: siempre 3 ejercicios
-        filas_cal = []
-        for d in rutina.detalles.filter(es_calentamiento=True).select_related("ejercicio"):
-            filas_cal.append({
-                "id": d.id,
-                "ejercicio_id": d.ejercicio_id or "",
-                "series": d.series or "",
-                "reps": d.repeticiones or "",
-                "kilos": d.peso or "",
-                "notas": d.notas or "",
-            })
-        while len(filas_cal) < 3:
-            filas_cal.append({"id": None, "ejercicio_id": "", "series": "", "reps": "", "kilos": "", "notas": ""})
-
-        # Bloque 1 — Fuerza: 1 ejercicio por grupo fijo
-        grupos_fuerza = ["Cadena anterior", "Cadena posterior", "Empujes o Tracciones"]
-        filas_fuerza = []
-        existentes = {}
-        for d in rutina.detalles.filter(es_calentamiento=False).select_related("ejercicio"):
-            key = (d.categoria or "").strip().lower()
-            existentes.setdefault(key, []).append(d)
-        for cat in grupos_fuerza:
-            key = cat.strip().lower()
-            det = existentes.get(key, [None])[0]
-            if det:
-                filas_fuerza.append({
-                    "id": det.id,
-                    "categoria": cat,
-                    "ejercicio_id": det.ejercicio_id or "",
-                    "series": det.series or "",
-                    "reps": det.repeticiones or "",
-                    "kilos": det.peso or "",
-                    "notas": det.notas or "",
-                })
-            else:
-                filas_fuerza.append({
-                    "id": None,
-                    "categoria": cat,
-                    "ejercicio_id": "",
-                    "series": "",
-                    "reps": "",
-                    "kilos": "",
-                    "notas": "",
-                })
-
-        # Bloque 2 — Potencia: 3..6 (arranca con 3)
-        filas_potencia = []
-        while len(filas_potencia) < 3:
-            filas_potencia.append({"id": None, "ejercicio_id": "", "series": "", "reps": "", "kilos": "", "notas": ""})
-
-        # Bloque 3 — Accesorios: 3..6 (arranca con 3)
-        filas_accesorios = []
-        while len(filas_accesorios) < 3:
-            filas_accesorios.append({"id": None, "ejercicio_id": "", "series": "", "reps": "", "kilos": "", "notas": ""})
-
-        contexto.update({
-            "filas_calentamiento": filas_cal,
-            "filas_fuerza": filas_fuerza,
-            "filas_potencia": filas_potencia,
-            "filas_accesorios": filas_accesorios,
-        })
-        return render(request, "gymapp/editar_rutina_deportista.html", contexto)
-
-    return render(request, "gymapp/editar_rutina.html", contexto)
+    return render(request, editor.plantilla, contexto)
 
 @require_POST
 def guardar_rutina(request, rutina_id):
@@ -721,36 +820,8 @@ def guardar_rutina(request, rutina_id):
         messages.error(request, "El formato recibido es inválido: se esperaba una lista de filas.")
         return redirect("editar_rutina", rutina_id)
 
-    filas_limpias = []
-    errores = []
-
-    for idx, fila in enumerate(filas, start=1):
-        if not isinstance(fila, dict):
-            errores.append(f"Fila {idx}: formato inválido.")
-            continue
-
-        valores = [
-            fila.get("categoria"),
-            fila.get("ejercicio_id") or fila.get("ejercicio"),
-            fila.get("series"),
-            fila.get("reps"),
-            fila.get("kilos"),
-            fila.get("descanso"),
-            fila.get("rir"),
-            fila.get("sensaciones"),
-            fila.get("notas"),
-        ]
-        if all((valor is None or str(valor).strip() == "") for valor in valores):
-            continue
-
-        form = DetalleRutinaPayloadForm(fila)
-        if form.is_valid():
-            filas_limpias.append(form.cleaned_data)
-        else:
-            mensajes = []
-            for field_errors in form.errors.values():
-                mensajes.extend(field_errors)
-            errores.append(f"Fila {idx}: {' | '.join(mensajes)}")
+    # Una sola consulta de ejercicios para todas las filas.
+    filas_limpias, errores, ejercicios_map = validar_filas_payload(filas)
 
     if errores:
         for error in errores:
@@ -764,13 +835,6 @@ def guardar_rutina(request, rutina_id):
         )
         return redirect("editar_rutina", rutina_id)
 
-    ejercicio_ids = {
-        fila.get("ejercicio_id")
-        for fila in filas_limpias
-        if fila.get("ejercicio_id")
-    }
-    ejercicios_map = Ejercicio.objects.in_bulk(ejercicio_ids)
-
     with transaction.atomic():
         # versionado: nueva rutina.  Se preserva o actualiza el número de semana
         # que viene desde el front (payload) para que la información sea
@@ -782,32 +846,18 @@ def guardar_rutina(request, rutina_id):
         except (TypeError, ValueError):
             semana_id = getattr(rutina, "semana", 1)
 
-        nueva = Rutina.objects.create(
-            member=rutina.member,
-            estructura=rutina.estructura,
-            semana=semana_id or 1,
-        )
-
-        nuevos = []
+        # Las filas sin categoría de bloques con etiqueta (Potencia,
+        # Accesorios) se guardan con ella para volver a su bloque.
+        editor = estructura_rutina(rutina.estructura)
+        filas_nuevas = []
         for f in filas_limpias:
-            ej_id = f.get("ejercicio_id")
-            ej = ejercicios_map.get(ej_id) if ej_id else None
-            nuevos.append(DetalleRutina(
-                rutina=nueva,
-                categoria=f.get("categoria", "") or "",
-                ejercicio=ej,
-                series=f.get("series", "") or "",
-                repeticiones=f.get("reps", "") or "",
-                peso=f.get("kilos", "") or "",
-                descanso=f.get("descanso", "") or "",
-                rir=f.get("rir", "") or "",
-                sensaciones=f.get("sensaciones", "") or "",
-                notas=f.get("notas", "") or "",
-                es_calentamiento=f.get("es_calentamiento", False),
-            ))
-
-        if nuevos:
-            DetalleRutina.objects.bulk_create(nuevos)
+            contenido = contenido_payload(f, editor.etiqueta(f.get("bloque")))
+            if contenido["ejercicio_id"] not in ejercicios_map:
+                contenido["ejercicio_id"] = None
+            filas_nuevas.append(contenido)
+        # Solo se insertan las filas que no existían; el resto se comparte
+        # con las versiones anteriores.
+        nueva = crear_version(rutina, filas_nuevas, semana=semana_id or 1)
 
         # copiar comentario previo si existía
         if hasattr(rutina, "comentario") and rutina.comentario and rutina.comentario.texto:
@@ -817,22 +867,116 @@ def guardar_rutina(request, rutina_id):
     return redirect("rutina_cliente", rutina.member.id)
 
 
+@require_POST
+def aplicar_cambios_rutina(request, rutina_id):
+    """
+    Guardado parcial del editor, en JSON: ``{"ops": [...], "semana_id": n}``
+    con las filas agregadas, cambiadas o borradas respecto de la versión
+    ``rutina_id`` (ver ``parches.py``).  Responde 201 con el id de la versión
+    nueva, o 400 con los errores de cada operación (y no guarda nada).
+    """
+    base = get_object_or_404(Rutina.objects.select_related("comentario"), pk=rutina_id)
+    try:
+        datos = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "El cuerpo debe ser JSON."}, status=400)
+    if not isinstance(datos, dict):
+        return JsonResponse({"error": "Se esperaba un objeto con ops."}, status=400)
+    try:
+        semana = int(datos.get("semana_id") or base.semana)
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "semana_id inválido."}, status=400)
+
+    try:
+        nueva, insertadas, errores = aplicar_parche(base, datos.get("ops"), semana=semana)
+    except ErrorParche as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    if errores:
+        return JsonResponse({"base": base.id, "errores": errores}, status=400)
+    if nueva.id != base.id:
+        # El editor vuelve a las rutinas del socio, como con ``guardar_rutina``.
+        messages.success(request, "Se creó una nueva versión de la rutina.")
+    return JsonResponse({
+        "id": nueva.id,
+        "base": base.id,
+        "filas_nuevas": insertadas,
+        "url": reverse("editar_rutina", args=[nueva.id]),
+    }, status=201 if nueva.id != base.id else 200)
+
+
 def eliminar_rutina(request, rutina_id):
     rutina = get_object_or_404(Rutina, id=rutina_id)
     member_id = rutina.member.id
     nombre = rutina.get_estructura_display()
-    rutina.delete()
+    with transaction.atomic():
+        rutina.delete()
+        # Las filas compartidas con otras versiones se conservan.
+        borrar_filas_huerfanas()
     messages.success(request, f"La rutina '{nombre}' fue eliminada con éxito ✅")
     return redirect('rutina_cliente', member_id=member_id)
 
 
-def mis_rutinas(request, member_id):
-    member = get_object_or_404(Member, pk=member_id)
-    detalles_prefetch = Prefetch(
-        "detalles",
-        queryset=DetalleRutina.objects.select_related("ejercicio").only(
-            "id",
-            "rutina_id",
+@require_POST
+def restaurar_rutina(request, archivada_id):
+    """Devuelve al historial una versión archivada por la política de retención."""
+    archivada = get_object_or_404(RutinaArchivada, id=archivada_id)
+    rutina = restaurar(archivada)
+    messages.success(
+        request,
+        f"La rutina '{rutina.get_estructura_display()}' del {timezone.localtime(rutina.fecha_creacion):%d/%m/%Y} fue restaurada ✅",
+    )
+    return redirect('rutina_cliente', member_id=rutina.member_id)
+
+
+ORDEN_RUTINAS = ("-fecha_creacion", "-id")
+
+
+@solo_lectura()
+@acceso_portal
+async def mis_rutinas(request, member_id):
+    """
+    Historial de rutinas del cliente: solo los encabezados, paginados por
+    cursor.  Los ejercicios de cada rutina se piden aparte a
+    ``detalles_rutina_cliente`` cuando se abre la tarjeta.  Async, como
+    la búsqueda en vivo: el portal es de solo lectura y muy concurrido.
+    """
+    try:
+        member = await Member.objects.aget(pk=member_id)
+    except Member.DoesNotExist:
+        raise Http404("No existe el socio.")
+    rutinas, siguiente_cursor = await apaginar_por_claves(
+        member.rutinas.select_related("comentario"),
+        ORDEN_RUTINAS,
+        request.GET.get("cursor"),
+        tamanio_pagina(
+            request,
+            getattr(settings, "RUTINAS_POR_PAGINA", 5),
+            getattr(settings, "RUTINAS_POR_PAGINA_MAX", 20),
+        ),
+    )
+    context = {
+        "member": member,
+        "rutinas": rutinas,
+        "es_personal": await aes_personal(request),
+        "cursor": request.GET.get("cursor"),
+        "siguiente_url": url_siguiente(request, siguiente_cursor),
+    }
+    if request.headers.get("x-requested-with") == "XMLHttpRequest":
+        return render(request, "gymapp/partials/_rutinas_cliente.html", context)
+    return render(request, "gymapp/mis_rutinas.html", context)
+
+
+@solo_lectura()
+@acceso_portal
+async def detalles_rutina_cliente(request, member_id, rutina_id):
+    """Ejercicios de una rutina del socio, en JSON para el portal."""
+    try:
+        rutina = await Rutina.objects.aget(pk=rutina_id, member_id=member_id)
+    except Rutina.DoesNotExist:
+        raise Http404("No existe la rutina.")
+    detalles = (
+        rutina.detalles_en_orden()
+        .values(
             "categoria",
             "series",
             "repeticiones",
@@ -841,41 +985,13 @@ def mis_rutinas(request, member_id):
             "rir",
             "sensaciones",
             "notas",
-            "ejercicio__nombre",
-        ),
-    )
-    rutinas = member.rutinas.order_by("-fecha_creacion").prefetch_related(
-        detalles_prefetch,
-        "comentario",
+            ejercicio_nombre=F("ejercicio__nombre"),
+        )
     )
-
-    rutina_data = {}
-    for rutina in rutinas:
-        detalles = [
-            {
-                "categoria": detalle.categoria,
-                "series": detalle.series,
-                "repeticiones": detalle.repeticiones,
-                "peso": detalle.peso,
-                "descanso": detalle.descanso,
-                "rir": detalle.rir,
-                "sensaciones": detalle.sensaciones,
-                "notas": detalle.notas,
-                "ejercicio": detalle.ejercicio.nombre if detalle.ejercicio else "",
-            }
-            for detalle in rutina.detalles.all()
-        ]
-        rutina_data[str(rutina.id)] = detalles
-
-    rutina_data = json.dumps(rutina_data)
-
-    # TODO: Considerar paginar las rutinas o cargar los datos detallados mediante
-    # peticiones AJAX para reducir la carga inicial cuando existen muchas rutinas.
-
-    return render(request, "gymapp/mis_rutinas.html", {
-        "member": member,
-        "rutinas": rutinas,
-        "rutina_data": rutina_data,
-    })
+    filas = []
+    async for detalle in detalles:
+        detalle["ejercicio"] = detalle.pop("ejercicio_nombre") or ""
+        filas.append(detalle)
+    return JsonResponse({"detalles": filas})
 
 
@@ -0,0 +1,99 @@
+// buscador_ejercicios.js — buscador nativo de ejercicios para los editores.
+// Reemplaza cada <select name="ejercicio"> por un input con resultados del
+// servidor (window.buscarEjercicios, ver catalogo_ejercicios.js).  El valor
+// elegido se sincroniza con el <select> oculto, que es el que se guarda.
+// Antes cada plantilla de editor traía su propia copia de este código.
+
+(function() {
+  // Convertir un <select> en un componente de búsqueda
+  function makeSearchable(selectEl) {
+    if (!selectEl || selectEl.dataset.searchified) return;
+    selectEl.dataset.searchified = '1';
+    var wrapper = document.createElement('div');
+    wrapper.className = 'search-select';
+    var input = document.createElement('input');
+    input.type = 'text';
+    input.className = 'search-input';
+    input.setAttribute('autocomplete', 'off');
+    input.setAttribute('placeholder', 'Buscar ejercicio');
+    // data-selected y no selectEl.value: en una fila nueva el select
+    // devolvería el primer ejercicio y el input aparecería prellenado.
+    var currentId = selectEl.getAttribute('data-selected') || '';
+    if (currentId) {
+      var elegido = selectEl.querySelector('option[value="' + CSS.escape(currentId) + '"]');
+      if (elegido) input.value = elegido.textContent.trim();
+    }
+    // Los resultados se agregan al body para mostrarlos encima de la tabla
+    var results = document.createElement('div');
+    results.className = 'search-results-overlay';
+    document.body.appendChild(results);
+    wrapper.appendChild(input);
+    selectEl.style.display = 'none';
+    selectEl.parentNode.insertBefore(wrapper, selectEl.nextSibling);
+
+    function positionResults() {
+      var rect = input.getBoundingClientRect();
+      results.style.width = rect.width + 'px';
+      results.style.left = rect.left + window.pageXOffset + 'px';
+      results.style.top = rect.bottom + window.pageYOffset + 'px';
+    }
+    // Los resultados los arma el servidor (typeahead); si una respuesta
+    // llega tarde y ya se pidió otra, se descarta.
+    var ultimaBusqueda = 0;
+    function renderResults(term) {
+      var pedido = ++ultimaBusqueda;
+      window.buscarEjercicios(term).then(function(list) {
+        if (pedido === ultimaBusqueda) showResults(list);
+      });
+    }
+    function showResults(list) {
+      results.innerHTML = '';
+      list.forEach(function(e) {
+        var item = document.createElement('div');
+        item.textContent = e.text;
+        item.dataset.id = e.id;
+        results.appendChild(item);
+      });
+      positionResults();
+      results.classList.add('active');
+    }
+    function hideResults() {
+      results.classList.remove('active');
+    }
+    function choose(id, text) {
+      // El resultado puede no estar entre las opciones si el catálogo
+      // todavía no llegó.
+      if (!selectEl.querySelector('option[value="' + CSS.escape(id) + '"]')) {
+        selectEl.appendChild(new Option(text, id, false, false));
+      }
+      selectEl.value = id;
+      selectEl.setAttribute('data-selected', id);
+      input.value = text;
+      hideResults();
+    }
+    function buscar() { renderResults(input.value); }
+    input.addEventListener('focus', buscar);
+    input.addEventListener('input', buscar);
+    input.addEventListener('click', buscar);
+    // Retrasar el cierre para permitir el click en un resultado
+    input.addEventListener('blur', function() { setTimeout(hideResults, 200); });
+    window.addEventListener('scroll', positionResults, true);
+    window.addEventListener('resize', positionResults);
+    results.addEventListener('mousedown', function(evt) {
+      var target = evt.target.closest('div[data-id]');
+      if (target) choose(target.dataset.id, target.textContent);
+    });
+  }
+
+  // Completar las opciones y agregar el buscador a los selects de ``scope``
+  window.initSearch = function(scope) {
+    (scope || document).querySelectorAll('select[name="ejercicio"]').forEach(function(selectEl) {
+      try {
+        if ((window.__EJERCICIOS__ || []).length) window.poblarSelectEjercicios(selectEl);
+        makeSearchable(selectEl);
+      } catch (e) {
+        /* Silenciar para no bloquear otros scripts */
+      }
+    });
+  };
+})();
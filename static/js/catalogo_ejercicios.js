@@ -0,0 +1,94 @@
+// catalogo_ejercicios.js — carga única del catálogo de ejercicios.
+// Los editores ya no traen un <option> por ejercicio en cada fila: el
+// catálogo se pide una sola vez a la URL versionada indicada en
+// <meta name="catalogo-ejercicios"> (el navegador la cachea mientras la
+// versión no cambie) y queda en window.__EJERCICIOS__ como [{id, text}].
+
+(function() {
+  var promesa = null;
+
+  function urlCatalogo() {
+    var meta = document.querySelector('meta[name="catalogo-ejercicios"]');
+    return meta ? meta.getAttribute('content') : '';
+  }
+
+  // Devuelve una promesa que se resuelve con el catálogo.  Llamarla varias
+  // veces no repite el pedido.
+  window.cargarEjercicios = function() {
+    if (promesa) return promesa;
+    var url = urlCatalogo();
+    if (!url) {
+      window.__EJERCICIOS__ = window.__EJERCICIOS__ || [];
+      promesa = Promise.resolve(window.__EJERCICIOS__);
+      return promesa;
+    }
+    promesa = fetch(url, { credentials: 'same-origin' })
+      .then(function(resp) {
+        if (!resp.ok) throw new Error('HTTP ' + resp.status);
+        return resp.json();
+      })
+      .then(function(data) {
+        window.__EJERCICIOS__ = (data.ejercicios || []).map(function(e) {
+          return { id: String(e.id), text: String(e.text || '').trim() };
+        }).filter(function(e) { return e.id && e.text; });
+        return window.__EJERCICIOS__;
+      })
+      .catch(function() {
+        window.__EJERCICIOS__ = window.__EJERCICIOS__ || [];
+        return window.__EJERCICIOS__;
+      });
+    return promesa;
+  };
+
+  // Typeahead: pide los mejores resultados a la URL de
+  // <meta name="buscar-ejercicios">.  Si no hay URL o el pedido falla,
+  // filtra el catálogo ya cargado.
+  function filtrarLocal(term, limite) {
+    var needle = String(term || '').trim().toLowerCase();
+    return (window.__EJERCICIOS__ || []).filter(function(e) {
+      return e.text.toLowerCase().indexOf(needle) !== -1;
+    }).slice(0, limite);
+  }
+
+  window.buscarEjercicios = function(term, limite) {
+    limite = limite || 20;
+    var meta = document.querySelector('meta[name="buscar-ejercicios"]');
+    var url = meta ? meta.getAttribute('content') : '';
+    if (!url) return Promise.resolve(filtrarLocal(term, limite));
+    var params = new URLSearchParams({ q: term || '', limite: limite });
+    return fetch(url + '?' + params.toString(), { credentials: 'same-origin' })
+      .then(function(resp) {
+        if (!resp.ok) throw new Error('HTTP ' + resp.status);
+        return resp.json();
+      })
+      .then(function(data) {
+        return (data.resultados || []).map(function(e) {
+          return { id: String(e.id), text: String(e.text || '').trim() };
+        });
+      })
+      .catch(function() { return filtrarLocal(term, limite); });
+  };
+
+  // Completa un <select> con el catálogo conservando el valor elegido.
+  window.poblarSelectEjercicios = function(selectEl) {
+    if (!selectEl) return;
+    var actual = selectEl.getAttribute('data-selected') || selectEl.value || '';
+    var frag = document.createDocumentFragment();
+    frag.appendChild(new Option('', '', false, false));
+    (window.__EJERCICIOS__ || []).forEach(function(e) {
+      frag.appendChild(new Option(e.text, e.id, false, false));
+    });
+    selectEl.innerHTML = '';
+    selectEl.appendChild(frag);
+    if (actual) selectEl.value = actual;
+  };
+
+  // Los editores sin buscador propio usan <select> nativos: los completamos
+  // apenas llega el catálogo.
+  document.addEventListener('DOMContentLoaded', function() {
+    window.cargarEjercicios().then(function() {
+      document.querySelectorAll('select[name="ejercicio"]:not([data-searchified])')
+        .forEach(window.poblarSelectEjercicios);
+    });
+  });
+})();
@@ -1,89 +1,320 @@
-
-// editar_rutinas.js — unifica guardado para múltiples bloques (cal/fuerza/potencia/accesorios)
-// Mantiene compatibilidad con plantillas anteriores (Fuerza base, Acondicionamiento).
+// editar_rutinas.js — comportamiento común de los editores de rutina
+// (general, fuerza base, acondicionamiento, iniciación y deportista):
+// filas nuevas, duplicar/eliminar/reordenar, buscador de ejercicios
+// (buscador_ejercicios.js) y guardado.
+//
+// Al guardar se mandan solo los cambios respecto de la versión cargada
+// ({ops, semana_id} a aplicar_cambios_rutina, ver parches.py): cada fila
+// de la versión trae su posición en data-pos y al cargar se guarda una copia
+// de sus valores.  Si el guardado parcial falla (errores de validación, red)
+// se manda el payload completo {semana_id, filas} a guardar_rutina, que
+// muestra los errores como siempre.
+//
+// Cada tabla del editor se declara con atributos:
+//   data-columnas="categoria ejercicio series reps kilos rir notas"
+//   data-bloque="calentamiento"   bloque de sus filas (se envía en el payload)
+//   data-calentamiento            sus filas son de la parte inicial
+//   data-acciones="fila|orden"    duplicar/eliminar o subir/bajar
+//   data-minimo="3"               filas vacías a crear si llega sin filas
+// y los botones con data-agregar="<id de tabla>" / data-vaciar="<id de tabla>".
 
 (function() {
-  function readTableRows(tableId, opts) {
-    var table = document.getElementById(tableId);
-    if (!table) return [];
-    var rows = table.querySelectorAll('tbody tr');
-    var out = [];
-    rows.forEach(function(tr) {
-      var data = {
-        id: tr.getAttribute('data-id') || null,
-        categoria: tr.getAttribute('data-categoria') || '',
-        bloque: tr.getAttribute('data-bloque') || (opts && opts.bloque) || '',
-        es_calentamiento: tr.hasAttribute('data-cal')
-      };
-      var sel = tr.querySelector('select[name="ejercicio"]');
-      var series = tr.querySelector('input[name="series"]');
-      var reps = tr.querySelector('input[name="reps"]');
-      var kilos = tr.querySelector('input[name="kilos"]');
-      var notas = tr.querySelector('textarea[name="notas"]');
-
-      data.ejercicio_id = sel ? (sel.value || '') : '';
-      data.series = series ? (series.value || '') : '';
-      data.reps = reps ? (reps.value || '') : '';
-      data.kilos = kilos ? (kilos.value || '') : '';
-      data.notas = notas ? (notas.value || '') : '';
-
-      // RIR es opcional (no usado en algunas vistas)
-      var rir = tr.querySelector('input[name="rir"]');
-      data.rir = rir ? (rir.value || '') : '';
-
-      out.push(data);
+  var PLACEHOLDERS = { series: '3', reps: '8-10', kilos: '0', rir: '1-2', notas: 'Notas' };
+  var CAMPOS = ['categoria', 'ejercicio_id', 'series', 'reps', 'kilos', 'rir', 'notas'];
+  var ACCIONES = {
+    fila: [['duplicate', 'Duplicar fila', '⎘'], ['remove', 'Eliminar fila', '✕']],
+    orden: [['up', 'Subir', '↑'], ['down', 'Bajar', '↓']]
+  };
+
+  function tablasEditor() {
+    return document.querySelectorAll('table[data-columnas]');
+  }
+
+  function leerFila(tr) {
+    var get = function(sel) { return tr.querySelector(sel); };
+    var valor = function(nombre) {
+      var el = get('[name="' + nombre + '"]');
+      return el ? (el.value || '') : '';
+    };
+    return {
+      categoria: tr.getAttribute('data-categoria') || '',
+      ejercicio_id: valor('ejercicio') || null,
+      series: valor('series'),
+      reps: valor('reps'),
+      kilos: valor('kilos'),
+      rir: valor('rir'),
+      notas: valor('notas')
+    };
+  }
+
+  function celda(contenido) {
+    var td = document.createElement('td');
+    if (contenido) td.appendChild(contenido);
+    return td;
+  }
+
+  function campo(nombre, valor) {
+    var el;
+    if (nombre === 'notas') {
+      el = document.createElement('textarea');
+      el.className = 'input notas-textarea';
+      el.value = valor || '';
+    } else {
+      el = document.createElement('input');
+      el.className = 'input';
+      el.type = (nombre === 'series' || nombre === 'kilos') ? 'number' : 'text';
+      if (el.type === 'number') el.min = nombre === 'series' ? '1' : '0';
+      el.value = valor || '';
+    }
+    el.name = nombre;
+    el.placeholder = PLACEHOLDERS[nombre] || '';
+    return el;
+  }
+
+  // Fila nueva con las columnas de la tabla, vacía o con los datos de ``data``
+  function nuevaFila(tabla, data) {
+    data = data || {};
+    var tr = document.createElement('tr');
+    if (tabla.hasAttribute('data-calentamiento')) tr.setAttribute('data-cal', '1');
+    if (data.categoria) tr.setAttribute('data-categoria', data.categoria);
+    tabla.getAttribute('data-columnas').split(/\s+/).forEach(function(columna) {
+      if (columna === 'categoria') {
+        var nombre = document.createElement('span');
+        nombre.className = 'categoria-nombre';
+        nombre.textContent = data.categoria || '';
+        var td = celda(nombre);
+        td.className = 'categoria-cell';
+        tr.appendChild(td);
+      } else if (columna === 'ejercicio') {
+        var select = document.createElement('select');
+        select.name = 'ejercicio';
+        select.className = 'input select';
+        select.setAttribute('data-selected', data.ejercicio_id || '');
+        window.poblarSelectEjercicios(select);
+        tr.appendChild(celda(select));
+      } else {
+        tr.appendChild(celda(campo(columna, data[columna])));
+      }
     });
-    return out;
-  }
-
-  function buildPayload() {
-    // Compatibilidad: si existe una sola tabla estándar (e.g., fuerza_base)
-    var single = document.querySelector('#tabla-principal, #tabla-calentamiento');
-    // Nuevos IDs para Deportista Avanzado
-    var cal = readTableRows('tabla-cal', { bloque: 'calentamiento' });
-    var fuerza = readTableRows('tabla-fuerza', { bloque: 'fuerza' });
-    var potencia = readTableRows('tabla-potencia', { bloque: 'potencia' });
-    var accesorios = readTableRows('tabla-accesorios', { bloque: 'accesorios' });
-
-    // Fallback a IDs previos
-    if (cal.length === 0) cal = readTableRows('tabla-calentamiento', { bloque: 'calentamiento' });
-    if (fuerza.length === 0) fuerza = readTableRows('tabla-principal', { bloque: 'principal' });
-
-    var all = [].concat(cal, fuerza, potencia, accesorios);
-
-    // Si no hay nuevas tablas, recolectar genérico (compatibilidad)
-    if (all.length === 0 && single) {
-      all = [].concat(
-        readTableRows('tabla-calentamiento', { bloque: 'calentamiento' }),
-        readTableRows('tabla-principal', { bloque: 'principal' })
-      );
+    var acciones = ACCIONES[tabla.getAttribute('data-acciones')];
+    if (acciones) {
+      var td = celda();
+      td.className = 'acciones' + (tabla.getAttribute('data-acciones') === 'orden' ? ' reorder' : '');
+      acciones.forEach(function(accion) {
+        var btn = document.createElement('button');
+        btn.type = 'button';
+        btn.className = 'icon-btn ' + accion[0];
+        btn.title = accion[1];
+        btn.textContent = accion[2];
+        td.appendChild(btn);
+      });
+      tr.appendChild(td);
     }
+    return tr;
+  }
 
-    return { detalles: all };
+  function agregarFila(tabla, data, despuesDe) {
+    var tr = nuevaFila(tabla, data);
+    if (despuesDe) despuesDe.after(tr);
+    else tabla.tBodies[0].appendChild(tr);
+    window.initSearch(tr);
+    return tr;
   }
 
-  function onGuardarClick(e) {
-    e && e.preventDefault();
-    var payloadInput = document.getElementById('payload_input');
-    if (!payloadInput) {
-      alert('No se encontró el input oculto payload_input');
-      return;
+  function onClickFila(e) {
+    var btn = e.target.closest('.icon-btn');
+    if (!btn) return;
+    e.preventDefault();
+    var tr = btn.closest('tr');
+    var tabla = tr.closest('table');
+    if (btn.classList.contains('remove')) {
+      tr.remove();
+    } else if (btn.classList.contains('duplicate')) {
+      var copia = agregarFila(tabla, leerFila(tr), tr);
+      var foco = copia.querySelector('.search-input, input');
+      if (foco) foco.focus();
+    } else if (btn.classList.contains('up')) {
+      if (tr.previousElementSibling) tr.previousElementSibling.before(tr);
+    } else if (btn.classList.contains('down')) {
+      if (tr.nextElementSibling) tr.nextElementSibling.after(tr);
     }
-    var data = buildPayload();
-    payloadInput.value = JSON.stringify(data);
-    var form = document.getElementById('form-guardar');
-    if (!form) {
-      alert('No se encontró el form de guardado');
-      return;
+  }
+
+  function posicion(tr) {
+    var pos = tr.getAttribute('data-pos');
+    return pos === null || pos === '' ? null : parseInt(pos, 10);
+  }
+
+  // Filas de todas las tablas en orden: {pos, data} (pos null si es nueva)
+  function filasEditor() {
+    var filas = [];
+    tablasEditor().forEach(function(tabla) {
+      var bloque = tabla.getAttribute('data-bloque') || '';
+      var calentamiento = tabla.hasAttribute('data-calentamiento');
+      tabla.querySelectorAll('tbody tr').forEach(function(tr) {
+        var data = leerFila(tr);
+        data.bloque = tr.getAttribute('data-bloque') || bloque;
+        data.es_calentamiento = calentamiento || tr.hasAttribute('data-cal');
+        filas.push({ pos: posicion(tr), data: data });
+      });
+    });
+    return filas;
+  }
+
+  function semanaElegida() {
+    var semana = document.getElementById('semana-select');
+    return semana ? (semana.value || null) : null;
+  }
+
+  // Valores de las filas de la versión tal como se cargaron, por posición
+  var originales = {};
+
+  function recordarOriginales() {
+    filasEditor().forEach(function(fila) {
+      if (fila.pos !== null) originales[fila.pos] = fila.data;
+    });
+  }
+
+  // Igual que _fila_vacia de forms.py: guardar_rutina las descarta
+  function filaVacia(data) {
+    return CAMPOS.every(function(campo) { return !String(data[campo] || '').trim(); });
+  }
+
+  function diferencias(antes, ahora) {
+    var cambios = null;
+    CAMPOS.forEach(function(campo) {
+      if (String(antes[campo] || '') !== String(ahora[campo] || '')) {
+        cambios = cambios || {};
+        cambios[campo] = ahora[campo];
+      }
+    });
+    return cambios;
+  }
+
+  // Posiciones que se conservan: la subsecuencia creciente más larga de las
+  // filas de la versión que siguen en el editor (el resto se reordenó).
+  function conservar(posiciones) {
+    var colas = [];     // colas[k]: índice del final más chico de largo k + 1
+    var previo = [];
+    posiciones.forEach(function(pos, i) {
+      var lo = 0, hi = colas.length;
+      while (lo < hi) {
+        var medio = (lo + hi) >> 1;
+        if (posiciones[colas[medio]] < pos) lo = medio + 1; else hi = medio;
+      }
+      previo[i] = lo > 0 ? colas[lo - 1] : -1;
+      colas[lo] = i;
+    });
+    var conservadas = {};
+    for (var i = colas.length ? colas[colas.length - 1] : -1; i >= 0; i = previo[i]) {
+      conservadas[posiciones[i]] = true;
+    }
+    return conservadas;
+  }
+
+  // Operaciones que llevan la versión cargada al contenido del editor.  Una
+  // fila de la versión que se movió se borra y se agrega donde quedó; las
+  // que el editor no muestra también se borran, como en el guardado completo.
+  function calcularOps(filas, filasBase) {
+    filas = filas.filter(function(fila) { return !filaVacia(fila.data); });
+    var conservadas = conservar(filas.filter(function(fila) {
+      return fila.pos !== null && originales[fila.pos];
+    }).map(function(fila) { return fila.pos; }));
+    var ops = [];
+    var ultima = -1;
+    filas.forEach(function(fila) {
+      if (fila.pos !== null && conservadas[fila.pos] && fila.pos > ultima) {
+        ultima = fila.pos;
+        var cambios = diferencias(originales[fila.pos], fila.data);
+        if (cambios) ops.push({ op: 'update', pos: fila.pos, fila: cambios });
+      } else {
+        ops.push({ op: 'add', despues_de: ultima, fila: fila.data });
+      }
+    });
+    for (var pos = 0; pos < filasBase; pos++) {
+      if (!conservadas[pos]) ops.push({ op: 'remove', pos: pos });
     }
+    return ops;
+  }
+
+  function guardarCompleto(form, filas, semana) {
+    var payloadInput = document.getElementById('payload_input');
+    payloadInput.value = JSON.stringify({
+      semana_id: semana,
+      filas: filas.map(function(fila) { return fila.data; })
+    });
+    var semanaInput = document.getElementById('semana_id_input');
+    if (semanaInput && semana) semanaInput.value = semana;
     form.submit();
   }
 
-  function wireButtons() {
-    var btns = [document.getElementById('btn-guardar'), document.getElementById('btn-guardar-bottom')];
-    btns.forEach(function(b) { if (b) b.addEventListener('click', onGuardarClick); });
+  var guardando = false;
+
+  function onGuardar(e) {
+    if (e) e.preventDefault();
+    var form = document.getElementById('form-guardar');
+    if (!form || !document.getElementById('payload_input') || guardando) return;
+    guardando = true;
+    var filas = filasEditor();
+    var semana = semanaElegida();
+    var url = form.getAttribute('data-cambios');
+    if (!url || !window.fetch) {
+      guardarCompleto(form, filas, semana);
+      return;
+    }
+    var token = form.querySelector('[name="csrfmiddlewaretoken"]');
+    var ops = calcularOps(filas, parseInt(form.getAttribute('data-filas-base') || '0', 10));
+    fetch(url, {
+      method: 'POST',
+      credentials: 'same-origin',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json',
+        'X-CSRFToken': token ? token.value : ''
+      },
+      body: JSON.stringify({ ops: ops, semana_id: semana })
+    }).then(function(respuesta) {
+      if (!respuesta.ok) throw new Error('HTTP ' + respuesta.status);
+      return respuesta.json();
+    }).then(function(datos) {
+      window.location.href = form.getAttribute('data-volver') || datos.url;
+    }).catch(function() {
+      guardarCompleto(form, filas, semana);
+    });
   }
 
-  // Inicializar
-  document.addEventListener('DOMContentLoaded', wireButtons);
+  document.addEventListener('DOMContentLoaded', function() {
+    // Antes de que el buscador toque los selects.
+    recordarOriginales();
+    tablasEditor().forEach(function(tabla) {
+      if (!tabla.tBodies[0].rows.length) {
+        var minimo = parseInt(tabla.getAttribute('data-minimo') || '0', 10);
+        for (var i = 0; i < minimo; i++) agregarFila(tabla);
+      }
+      tabla.tBodies[0].addEventListener('click', onClickFila);
+    });
+    document.querySelectorAll('[data-agregar]').forEach(function(btn) {
+      btn.addEventListener('click', function(e) {
+        e.preventDefault();
+        var tabla = document.getElementById(btn.getAttribute('data-agregar'));
+        var foco = agregarFila(tabla).querySelector('.search-input, input');
+        if (foco) foco.focus();
+      });
+    });
+    document.querySelectorAll('[data-vaciar]').forEach(function(btn) {
+      btn.addEventListener('click', function(e) {
+        e.preventDefault();
+        var tabla = document.getElementById(btn.getAttribute('data-vaciar'));
+        tabla.tBodies[0].innerHTML = '';
+        agregarFila(tabla);
+      });
+    });
+    ['btn-guardar', 'btn-guardar-bottom'].forEach(function(id) {
+      var btn = document.getElementById(id);
+      if (btn) btn.addEventListener('click', onGuardar);
+    });
+    // Las filas ya funcionan; el buscador se completa cuando llega el catálogo.
+    window.initSearch(document);
+    window.cargarEjercicios().then(function() { window.initSearch(document); });
+  });
 })();
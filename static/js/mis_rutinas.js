@@ -0,0 +1,81 @@
+// mis_rutinas.js — historial de rutinas del portal del cliente.
+// La página trae solo los encabezados de las rutinas.  Los ejercicios de
+// cada una se piden (una sola vez) al abrir su tarjeta, y "Ver rutinas
+// anteriores" agrega la página siguiente sin recargar.
+
+(function() {
+  var COLUMNAS = [
+    {title: "Categoría", field: "categoria"},
+    {title: "Ejercicio", field: "ejercicio"},
+    {title: "Series", field: "series", hozAlign: "center"},
+    {title: "Reps", field: "repeticiones", hozAlign: "center"},
+    {title: "Peso", field: "peso", hozAlign: "center"},
+    {title: "Descanso", field: "descanso"},
+    {title: "RIR", field: "rir", hozAlign: "center"},
+    {title: "Sensaciones", field: "sensaciones"},
+    {title: "Notas", field: "notas"}
+  ];
+
+  function abrir(card) {
+    var boton = card.querySelector('.ver-ejercicios');
+    var tabla = card.querySelector('.tabla-detalles');
+    if (card.dataset.cargada) {
+      var oculta = tabla.style.display === 'none';
+      tabla.style.display = oculta ? '' : 'none';
+      if (boton) boton.textContent = oculta ? 'Ocultar ejercicios' : 'Ver ejercicios';
+      return;
+    }
+    if (card.dataset.cargando) return;
+    card.dataset.cargando = '1';
+    if (boton) boton.textContent = 'Cargando…';
+    fetch(card.dataset.detallesUrl, { credentials: 'same-origin', headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+      .then(function(resp) {
+        if (!resp.ok) throw new Error('HTTP ' + resp.status);
+        return resp.json();
+      })
+      .then(function(data) {
+        new Tabulator(tabla, { data: data.detalles || [], layout: "fitDataFill", columns: COLUMNAS });
+        card.dataset.cargada = '1';
+        if (boton) boton.textContent = 'Ocultar ejercicios';
+      })
+      .catch(function() {
+        if (boton) boton.textContent = 'Reintentar';
+      })
+      .finally(function() { delete card.dataset.cargando; });
+  }
+
+  function cargarMas(centinela) {
+    var url = centinela.getAttribute('data-url');
+    if (!url || centinela.dataset.cargando) return;
+    centinela.dataset.cargando = '1';
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+      .then(function(resp) {
+        if (!resp.ok) throw new Error('HTTP ' + resp.status);
+        return resp.text();
+      })
+      .then(function(html) {
+        centinela.insertAdjacentHTML('afterend', html);
+        centinela.remove();
+      })
+      .catch(function() { delete centinela.dataset.cargando; });
+  }
+
+  document.addEventListener('DOMContentLoaded', function() {
+    var contenedor = document.getElementById('rutinas-cliente');
+    if (!contenedor) return;
+    contenedor.addEventListener('click', function(evt) {
+      var boton = evt.target.closest('.ver-ejercicios');
+      if (boton) {
+        abrir(boton.closest('.rutina-cliente'));
+        return;
+      }
+      var centinela = evt.target.closest('.cargar-mas');
+      if (centinela) {
+        evt.preventDefault();
+        cargarMas(centinela);
+      }
+    });
+    // La rutina más reciente se muestra abierta.
+    contenedor.querySelectorAll('.rutina-cliente[data-abrir]').forEach(abrir);
+  });
+})();
@@ -0,0 +1,97 @@
+// pagos_masivos.js — marcar o desmarcar el pago de un mes para varios
+// socios a la vez desde el listado.  Los socios se eligen con los checkboxes
+// de cada fila (también las que agrega el scroll infinito); el formulario
+// #pagos-masivos se envía por fetch y la vista responde con los pagos
+// actualizados en JSON, que se reflejan en la tabla sin recargar la página.
+
+(function() {
+  function seleccionados() {
+    return Array.prototype.map.call(
+      document.querySelectorAll('input.seleccion-socio:checked'),
+      function(input) { return input.value; }
+    );
+  }
+
+  function actualizarBotones(form) {
+    var cantidad = seleccionados().length;
+    form.querySelector('.cantidad-seleccion').textContent = cantidad;
+    form.querySelectorAll('button[name="accion"]').forEach(function(boton) {
+      boton.disabled = cantidad === 0;
+    });
+  }
+
+  function mostrarEstado(pago) {
+    var fila = document.querySelector('tr[data-member-id="' + pago.member_id + '"]');
+    if (!fila) return;
+    var vigente = pago.pagado && !pago.anulado;
+    var badge = fila.querySelector('.estado-pago');
+    badge.className = 'estado-pago badge ' + (vigente ? 'bg-success' : 'bg-danger');
+    badge.textContent = vigente ? 'Pagado' : 'Debe';
+    fila.querySelector('input.seleccion-socio').checked = false;
+  }
+
+  function actualizarDeudores(form, pagos) {
+    // La barra lateral muestra los deudores del mes actual.
+    if (form.elements.mes.value !== form.elements.mes.defaultValue) return;
+    pagos.forEach(function(pago) {
+      if (!pago.pagado || pago.anulado) return;
+      var item = document.querySelector('.deudores-sidebar [data-member-id="' + pago.member_id + '"]');
+      if (item) item.remove();
+    });
+  }
+
+  function enviar(form, accion) {
+    var datos = new FormData(form);
+    datos.set('accion', accion);
+    seleccionados().forEach(function(id) { datos.append('socios', id); });
+    var mensaje = form.querySelector('.mensaje-pagos');
+    mensaje.textContent = 'Guardando…';
+
+    fetch(form.action, {
+      method: 'POST',
+      body: datos,
+      headers: { 'X-Requested-With': 'XMLHttpRequest' }
+    })
+      .then(function(resp) {
+        return resp.json().then(function(json) {
+          if (!resp.ok) throw new Error(json.error || ('HTTP ' + resp.status));
+          return json;
+        });
+      })
+      .then(function(json) {
+        json.pagos.forEach(mostrarEstado);
+        actualizarDeudores(form, json.pagos);
+        mensaje.textContent = json.pagos.length + ' socio(s) actualizados para ' + json.mes + '.';
+        var todos = document.querySelector('input.seleccionar-todos');
+        if (todos) todos.checked = false;
+        actualizarBotones(form);
+      })
+      .catch(function(error) {
+        mensaje.textContent = 'No se pudo guardar: ' + error.message;
+      });
+  }
+
+  document.addEventListener('DOMContentLoaded', function() {
+    var form = document.getElementById('pagos-masivos');
+    if (!form) return;
+
+    document.addEventListener('change', function(event) {
+      var objetivo = event.target;
+      if (objetivo.classList.contains('seleccionar-todos')) {
+        document.querySelectorAll('input.seleccion-socio').forEach(function(input) {
+          input.checked = objetivo.checked;
+        });
+      }
+      if (objetivo.classList.contains('seleccionar-todos') ||
+          objetivo.classList.contains('seleccion-socio')) {
+        actualizarBotones(form);
+      }
+    });
+
+    form.addEventListener('submit', function(event) {
+      event.preventDefault();
+      var accion = event.submitter ? event.submitter.value : 'marcar';
+      enviar(form, accion);
+    });
+  });
+})();
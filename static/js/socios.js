@@ -0,0 +1,51 @@
+// socios.js — scroll infinito para los listados de socios.
+// Las vistas paginan por cursor y dejan al final de la tabla una fila
+// centinela <tr class="cargar-mas" data-url="...">.  Cuando el centinela
+// entra en pantalla pedimos la página siguiente (solo filas) y lo
+// reemplazamos por el HTML recibido, que trae su propio centinela si quedan
+// más socios.
+
+(function() {
+  var cargando = false;
+
+  function cargarSiguiente(centinela, observer) {
+    if (cargando) return;
+    var url = centinela.getAttribute('data-url');
+    if (!url) return;
+    cargando = true;
+    observer.unobserve(centinela);
+
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+      .then(function(resp) {
+        if (!resp.ok) throw new Error('HTTP ' + resp.status);
+        return resp.text();
+      })
+      .then(function(html) {
+        centinela.insertAdjacentHTML('afterend', html);
+        var tbody = centinela.parentNode;
+        centinela.remove();
+        observarCentinelas(tbody, observer);
+      })
+      .catch(function() {
+        // Si falla, dejamos el centinela para reintentar al volver a verlo.
+        observer.observe(centinela);
+      })
+      .finally(function() { cargando = false; });
+  }
+
+  function observarCentinelas(scope, observer) {
+    (scope || document).querySelectorAll('tr.cargar-mas').forEach(function(tr) {
+      observer.observe(tr);
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function() {
+    if (!('IntersectionObserver' in window)) return;  // queda el link "Cargar más"
+    var observer = new IntersectionObserver(function(entries) {
+      entries.forEach(function(entry) {
+        if (entry.isIntersecting) cargarSiguiente(entry.target, observer);
+      });
+    }, { rootMargin: '400px 0px' });
+    observarCentinelas(document, observer);
+  });
+})();